@@ -0,0 +1 @@
+"""Benchmarks for manga_manager."""
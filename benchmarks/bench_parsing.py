@@ -0,0 +1,74 @@
+"""Compares HTML parser backends on recorded Mangakakalot pages.
+
+Usage:
+    python -m benchmarks.bench_parsing [-n NUMBER]
+"""
+
+import argparse
+import timeit
+from pathlib import Path
+
+from manga_manager.provider import mangakakalot, parsing
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures" / "mangakakalot"
+PAGES = {
+    "search": "search.html",
+    "chapter_list": "manga.html",
+    "chapter": "chapter.html",
+}
+OPERATIONS = {
+    "search": lambda provider: provider.search("attack on titan"),
+    "chapter_list": lambda provider: provider.chapter_list("manga"),
+    "image_links": lambda provider: provider.image_links("chapter"),
+}
+
+
+def _full_page_parse(html, *strainer_args, parser=None, **strainer_kwargs):
+    """BeautifulSoup over the whole page, as providers parsed before backends"""
+
+    return parsing.parse(html, parser="html.parser")
+
+
+def run(number=20):
+    """Times search, chapter_list and image_links with every parser backend.
+
+    Args:
+        number (int): Optional; Number of parses per measurement. Default is 20.
+
+    Returns:
+        results (List(Tuple)): (backend, operation, milliseconds per parse) tuples.
+    """
+
+    pages = {kind: (FIXTURES / name).read_text() for kind, name in PAGES.items()}
+    provider = mangakakalot.Mangakakalot()
+    provider._get_text = lambda url, kind: pages[kind]
+
+    backends = [(parser, parsing.parse) for parser in parsing.available_parsers()]
+    backends.append(("html.parser (full page)", _full_page_parse))
+    default_parser = parsing.PARSER
+    results = []
+    try:
+        for backend, parse in backends:
+            parsing.PARSER = backend.split()[0]
+            mangakakalot.parse = parse
+            for name, operation in OPERATIONS.items():
+                seconds = timeit.timeit(lambda: operation(provider), number=number)
+                results.append((backend, name, seconds / number * 1000))
+    finally:
+        parsing.PARSER = default_parser
+        mangakakalot.parse = parsing.parse
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'backend':<26}{'operation':<16}{'ms/parse':>10}")
+    for backend, operation, ms in run(args.number):
+        print(f"{backend:<26}{operation:<16}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Local stand-in for a provider's site and image CDN.
+
+`FakeSite` serves the recorded Mangakakalot pages from tests/fixtures and
+synthetic JPEG panels over HTTP on localhost, so downloads can be benchmarked
+without a network. Panel size and per-request latency are configurable.
+
+Routes:
+    /search/<query>?page=<n>    recorded search results
+    /manga/<slug>               recorded manga page with its chapter list
+    /chapter/<slug>/<chapter>   recorded chapter page, panels point at /cdn/
+    /cdn/<path>.jpg             synthetic panel image
+"""
+
+import io
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from PIL import Image
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures" / "mangakakalot"
+FIXTURE_CDN = "https://cm.blazefast.co"
+
+
+def synthetic_panel(width, height, quality=85, seed=0):
+    """Returns a JPEG of noisy line art, roughly the size of a real panel"""
+
+    rng = random.Random(seed)
+    size = (width // 4, height // 4)
+    noise = bytes(rng.getrandbits(8) for _ in range(size[0] * size[1]))
+    im = Image.frombytes("L", size, noise).resize((width, height))
+    buffer = io.BytesIO()
+    im.convert("RGB").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class FakeSite:
+    """Threaded HTTP server imitating Mangakakalot and its image CDN"""
+
+    def __init__(self, image_size=(800, 1200), latency=0.0, pages=None):
+        """
+        Args:
+            image_size (Tuple(int, int)): Optional; Width and height of the
+                served panels. Default is (800, 1200).
+            latency (float): Optional; Seconds every request waits before it is
+                answered. Default is 0.
+            pages (int): Optional; Number of panels per chapter. Default is the
+                number of panels in the recorded chapter page.
+        """
+
+        self.latency = latency
+        self.image = synthetic_panel(*image_size)
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._fixtures = {
+            name: (FIXTURES / f"{name}.html").read_text()
+            for name in ("search", "manga", "chapter")
+        }
+        self._pages = pages
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL of the site"""
+
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _chapter_page(self):
+        html = self._fixtures["chapter"].replace(FIXTURE_CDN, f"{self.url}/cdn")
+        if self._pages is None:
+            return html
+        # repeat or trim the recorded panels to the requested page count
+        start = html.index("<img", html.index('id="vungdoc"'))
+        end = html.index("</div>", start)
+        panels = [line for line in html[start:end].splitlines() if "img-loading" in line]
+        panels = [
+            panels[i % len(panels)].replace(".jpg", f"-{i}.jpg")
+            for i in range(self._pages)
+        ]
+        return html[:start] + "\n".join(panels) + "\n" + html[end:]
+
+    def _route(self, path):
+        if path.startswith("/cdn/"):
+            return "image/jpeg", self.image
+        if path.startswith("/search/"):
+            return "text/html", self._fixtures["search"].encode()
+        if path.startswith("/manga/"):
+            return "text/html", self._fixtures["manga"].encode()
+        if path.startswith("/chapter/"):
+            return "text/html", self._chapter_page().encode()
+        return None, None
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                content_type, body = site._route(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                with site._lock:
+                    site.requests += 1
+                    site.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    with FakeSite() as site:
+        print(f"Serving on {site.url}, Ctrl-c to stop")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
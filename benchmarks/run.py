@@ -0,0 +1,235 @@
+"""Offline download benchmarks against a local fake site.
+
+Runs Mangakakalot.search, chapter_list, download (threads and asyncio engines)
+and manga2pdf against `benchmarks.fakecdn.FakeSite`. Every benchmark runs in a
+fresh process so its peak RSS is measured on its own.
+
+Usage:
+    python -m benchmarks.run [--chapters N] [--pages N] [--image-size WxH]
+        [--latency SECONDS] [--save FILE] [--compare FILE] [--tolerance FRACTION]
+
+With --compare, the exit status is 1 if any benchmark's throughput dropped by
+more than the tolerance against the saved results.
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fakecdn import FakeSite
+
+BENCHMARKS = [
+    "search",
+    "chapter_list",
+    "manga2pdf",
+    "download_threads",
+    "download_asyncio",
+]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _directory_bytes(path):
+    """Returns the size of the chapter files written under a directory"""
+
+    return sum(
+        file.stat().st_size
+        for file in Path(path).rglob("*")
+        if file.is_file() and ".pages" not in file.relative_to(path).parts
+    )
+
+
+def _measure(name, url, chapters, repeat):
+    """Runs one benchmark in the current process"""
+
+    from manga_manager.provider.mangakakalot import Mangakakalot
+
+    engine = "asyncio" if name == "download_asyncio" else "threads"
+    provider = Mangakakalot(engine=engine)
+    provider.base_url = url
+    provider.cache_path = None
+    # every fake chapter shares its panel URLs; the page store would turn the
+    # download benchmarks into a handful of requests
+    provider.page_store_size = 0
+    manga_link = f"{url}/manga/manga-aa951409"
+
+    with tempfile.TemporaryDirectory() as directory:
+        provider.download_dir = directory
+        ops, chapter_count = 0, 0
+        start = time.perf_counter()
+        if name == "search":
+            for _ in range(repeat):
+                provider.search("attack on titan")
+            ops = repeat
+        elif name == "chapter_list":
+            for _ in range(repeat):
+                provider.chapter_list(manga_link)
+            ops = repeat
+        elif name == "manga2pdf":
+            image_links = provider.image_links(f"{url}/chapter/manga-aa951409/chapter-1")
+            for i in range(repeat):
+                provider.manga2pdf(image_links, "bench", f"Chapter {i}")
+            ops = chapter_count = repeat
+        else:
+            selected = [
+                {"name": chapter_name, "link": link, "path": "", "read": False}
+                for chapter_name, link in provider.chapter_list(manga_link)[:chapters]
+            ]
+            paths = provider.download("bench", selected, verbose=False)
+            ops = chapter_count = len(paths)
+        seconds = time.perf_counter() - start
+        written = _directory_bytes(directory)
+    provider.close()
+
+    return {
+        "benchmark": name,
+        "seconds": seconds,
+        "ops_per_sec": ops / seconds,
+        "chapters_per_sec": chapter_count / seconds,
+        "mb_per_sec": written / (1024 * 1024) / seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _child(queue, *args):
+    try:
+        queue.put(_measure(*args))
+    except Exception as e:  # pragma: no cover
+        queue.put({"benchmark": args[0], "error": repr(e)})
+
+
+def run(
+    benchmarks=BENCHMARKS,
+    chapters=10,
+    pages=20,
+    image_size=(800, 1200),
+    latency=0.01,
+    repeat=5,
+):
+    """Runs benchmarks against a fresh fake site.
+
+    Args:
+        benchmarks (List(str)): Optional; Names of the benchmarks to run.
+            Default is all of them.
+        chapters (int): Optional; Chapters per download benchmark. Default is 10.
+        pages (int): Optional; Panels per chapter. Default is 20.
+        image_size (Tuple(int, int)): Optional; Panel width and height. Default
+            is (800, 1200).
+        latency (float): Optional; Seconds of latency per request. Default is 0.01.
+        repeat (int): Optional; Iterations of the search, chapter_list and
+            manga2pdf benchmarks. Default is 5.
+
+    Returns:
+        results (List(Dict)): One result dict per benchmark.
+    """
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with FakeSite(image_size=image_size, latency=latency, pages=pages) as site:
+        for name in benchmarks:
+            queue = context.Queue()
+            process = context.Process(
+                target=_child, args=(queue, name, site.url, chapters, repeat)
+            )
+            process.start()
+            results.append(queue.get())
+            process.join()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns the benchmarks whose throughput regressed against a baseline.
+
+    Args:
+        results (List(Dict)): Current results.
+        baseline (List(Dict)): Saved results.
+        tolerance (float): Allowed relative drop in operations per second.
+
+    Returns:
+        regressions (List(str)): Descriptions of the regressed benchmarks.
+    """
+
+    saved = {result["benchmark"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        before = saved.get(result["benchmark"])
+        if before is None or "error" in result or "error" in before:
+            continue
+        if result["ops_per_sec"] < before["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{result['benchmark']}: {result['ops_per_sec']:.2f} ops/s, "
+                f"was {before['ops_per_sec']:.2f}"
+            )
+    return regressions
+
+
+def print_results(results):
+    print(
+        f"{'benchmark':<18}{'seconds':>9}{'ops/s':>9}{'chapters/s':>12}"
+        f"{'MB/s':>9}{'peak RSS MB':>13}"
+    )
+    for result in results:
+        if "error" in result:
+            print(f"{result['benchmark']:<18}error: {result['error']}")
+            continue
+        rss = result["peak_rss_mb"]
+        print(
+            f"{result['benchmark']:<18}{result['seconds']:>9.2f}"
+            f"{result['ops_per_sec']:>9.2f}{result['chapters_per_sec']:>12.2f}"
+            f"{result['mb_per_sec']:>9.2f}{rss if rss is None else round(rss, 1):>13}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="benchmark", help=", ".join(BENCHMARKS)
+    )
+    parser.add_argument("--chapters", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--image-size", default="800x1200")
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    results = run(
+        benchmarks=args.benchmarks or BENCHMARKS,
+        chapters=args.chapters,
+        pages=args.pages,
+        image_size=tuple(int(n) for n in args.image_size.split("x")),
+        latency=args.latency,
+        repeat=args.repeat,
+    )
+    print_results(results)
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.compare:
+        regressions = compare(
+            results, json.loads(Path(args.compare).read_text()), args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""CLI startup benchmark.
+
+Times quick `manga` commands in fresh interpreters against an empty library
+in a temporary directory, next to a bare interpreter start for reference.
+"list library" runs `list` against a populated library kept current by a
+daemon, the path users with a daemon take on every start; it reads the stored
+library and new chapter counts without touching the network.
+
+Usage:
+    python -m benchmarks.startup [--repeat N] [--series N] [--limit MS]
+
+With --limit, the exit status is 1 if any command takes more than the given
+number of milliseconds on top of the bare interpreter start.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from manga_manager.daemon import DAEMON_KEY, UPDATES_KEY
+from manga_manager.store import open_store
+
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "--version": ["-m", "manga_manager.cli", "--version"],
+    "list": ["-m", "manga_manager.cli", "list"],
+    "list library": ["-m", "manga_manager.cli", "list"],
+}
+LIBRARY_COMMANDS = {"list library"}
+
+
+def _time(args, env):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def _seed(home, series, chapters):
+    """Writes a library of `series` manga with a fresh daemon heartbeat"""
+
+    now = time.time()
+    library = {
+        "manga": {},
+        UPDATES_KEY: {},
+        DAEMON_KEY: {"heartbeat": now, "pid": os.getpid(), "next_check": now + 3600},
+    }
+    for i in range(series):
+        name = f"Series {i}"
+        library["manga"][name] = {
+            "name": name,
+            "link": f"https://example.invalid/manga/{i}",
+            "authors": "",
+            "download_mode": "none",
+            "provider": "Mangakakalot",
+            "current_chapter": chapters // 2,
+            "chapters": [
+                {
+                    "name": f"Chapter {c}",
+                    "link": f"https://example.invalid/manga/{i}/{c}",
+                    "path": "",
+                    "read": c < chapters // 2,
+                }
+                for c in range(chapters)
+            ],
+        }
+        library[UPDATES_KEY][name] = {
+            "interval": 3600,
+            "next_check": now + 3600,
+            "last_update": now,
+            "unseen": i % 3,
+        }
+    store = open_store(home)
+    store.save(library)
+    store.close()
+
+
+def run(repeat=10, series=50, chapters=200):
+    """Times every command.
+
+    Args:
+        repeat (int): Optional; Runs per command; the median is reported.
+            Default is 10.
+        series (int): Optional; Manga in the populated library. Default is 50.
+        chapters (int): Optional; Chapters per manga in the populated library.
+            Default is 200.
+
+    Returns:
+        results (List(Dict)): Median milliseconds per command, in total and on
+            top of a bare interpreter start.
+    """
+
+    with tempfile.TemporaryDirectory() as empty, tempfile.TemporaryDirectory() as home:
+        _seed(home, series, chapters)
+        medians = {}
+        for name, args in COMMANDS.items():
+            env = dict(
+                os.environ, MANGA_MANAGER_HOME=home if name in LIBRARY_COMMANDS else empty
+            )
+            env["PYTHONPATH"] = os.pathsep.join(
+                filter(None, [os.getcwd(), env.get("PYTHONPATH")])
+            )
+            medians[name] = statistics.median(_time(args, env) for _ in range(repeat)) * 1000
+    return [
+        {"command": name, "ms": ms, "overhead_ms": ms - medians["python"]}
+        for name, ms in medians.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--limit", type=float)
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat, series=args.series)
+    print(f"{'command':<14}{'ms':>9}{'overhead ms':>13}")
+    for result in results:
+        print(f"{result['command']:<14}{result['ms']:>9.1f}{result['overhead_ms']:>13.1f}")
+    if args.limit is not None:
+        slow = [r for r in results if r["overhead_ms"] > args.limit]
+        for result in slow:
+            print(f"SLOW {result['command']}: {result['overhead_ms']:.1f} ms")
+        return 1 if slow else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
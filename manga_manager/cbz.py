@@ -0,0 +1,74 @@
+"""Incremental CBZ writer for manga chapters.
+
+A CBZ is a zip archive holding one image file per page. Pages are stored
+uncompressed exactly as they were downloaded: images are never decoded, so
+writing a chapter costs little more than copying its bytes.
+"""
+
+import zipfile
+
+SIGNATURES = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+
+def image_extension(data):
+    """Returns the file extension of an image from its first bytes"""
+
+    for signature, extension in SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif"
+    return "jpg"
+
+
+class CbzWriter:
+    """Writes a CBZ to a binary file object one page at a time.
+
+    Has the same interface as `manga_manager.pdf.PdfWriter`.
+    """
+
+    def __init__(self, file):
+        """
+        Args:
+            file (BinaryIO): Writable binary file object for the CBZ.
+        """
+
+        self._zip = zipfile.ZipFile(file, "w", compression=zipfile.ZIP_STORED)
+        self._pages = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    @property
+    def page_count(self):
+        """Number of pages written so far"""
+
+        return self._pages
+
+    def add_page(self, data):
+        """Adds an image file as the next page.
+
+        Args:
+            data (bytes): Image file contents, stored unchanged.
+        """
+
+        self._pages += 1
+        self._zip.writestr(f"{self._pages:04d}.{image_extension(data)}", data)
+
+    def close(self):
+        """Writes the archive's central directory"""
+
+        if not self._pages:
+            raise ValueError("Cannot write a CBZ without pages")
+        self._zip.close()
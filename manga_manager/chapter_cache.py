@@ -0,0 +1,186 @@
+"""Library-wide bookkeeping of downloaded chapters.
+
+`ChapterCache` tracks every chapter that is on disk, across all manga, with
+its size and when it was last used. When a byte quota is set, the cache
+evicts chapters until the library fits: chapters that were already read go
+first, then unread ones, least recently used first. Every operation is O(1)
+apart from the evictions themselves.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+def parse_size(text):
+    """Parses a size such as "500M" or "2G" into bytes.
+
+    Raises:
+        ValueError: If the text is not a size or the size is negative.
+    """
+
+    text = str(text).strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    if text and text[-1] in units:
+        size = int(float(text[:-1]) * units[text[-1]])
+    else:
+        size = int(text)
+    if size < 0:
+        raise ValueError(f"negative size: {text}")
+    return size
+
+
+class ChapterCache:
+    """Tracks downloaded chapters and evicts them to stay under a quota"""
+
+    def __init__(self, quota=None):
+        """
+        Args:
+            quota (int): Optional; Maximum total size of downloaded chapters in
+                bytes. Default is no limit.
+        """
+
+        self.quota = quota
+        self.size = 0
+        self._read = OrderedDict()
+        self._unread = OrderedDict()
+        self._by_manga = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_library(cls, config, quota=None):
+        """Builds a cache from the chapters of a library that have a path.
+
+        Chapters are ordered by the last access time of their files.
+
+        Args:
+            config (Dict): Library in the form {"manga": {name: manga, ...}}.
+            quota (int): Optional; Quota of the cache in bytes.
+
+        Returns:
+            cache (ChapterCache): The cache.
+        """
+
+        resident = []
+        for manga in config["manga"].values():
+            for chapter in manga["chapters"]:
+                if chapter["path"] == "":
+                    continue
+                try:
+                    stat = os.stat(chapter["path"])
+                except OSError:
+                    chapter["path"] = ""
+                    continue
+                resident.append((stat.st_atime, manga["name"], chapter, stat.st_size))
+
+        cache = cls(quota)
+        for _, manga_name, chapter, size in sorted(resident, key=lambda r: r[0]):
+            cache.add(manga_name, chapter, size)
+        return cache
+
+    def __len__(self):
+        return len(self._read) + len(self._unread)
+
+    def __contains__(self, key):
+        return key in self._read or key in self._unread
+
+    def resident(self, manga_name):
+        """Returns the names of a manga's chapters that are on disk"""
+
+        with self._lock:
+            return list(self._by_manga.get(manga_name, ()))
+
+    def add(self, manga_name, chapter, size=None):
+        """Records a downloaded chapter as the most recently used one.
+
+        Args:
+            manga_name (str): Title of the chapter's manga.
+            chapter (Dict): Chapter dict with the chapter's path.
+            size (int): Optional; Size of the chapter in bytes. Read from the
+                file by default.
+        """
+
+        if size is None:
+            size = os.path.getsize(chapter["path"])
+        key = (manga_name, chapter["name"])
+        with self._lock:
+            self._discard(key)
+            lru = self._read if chapter["read"] else self._unread
+            lru[key] = (chapter, size)
+            self._by_manga.setdefault(manga_name, set()).add(chapter["name"])
+            self.size += size
+
+    def touch(self, manga_name, chapter):
+        """Marks a chapter as used now, moving it between the read and unread lists"""
+
+        key = (manga_name, chapter["name"])
+        with self._lock:
+            entry = self._read.pop(key, None) or self._unread.pop(key, None)
+            if entry is not None:
+                lru = self._read if chapter["read"] else self._unread
+                lru[key] = entry
+
+    def _discard(self, key):
+        entry = self._read.pop(key, None) or self._unread.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+            names = self._by_manga[key[0]]
+            names.discard(key[1])
+            if not names:
+                del self._by_manga[key[0]]
+        return entry
+
+    def discard(self, manga_name, chapter_name):
+        """Stops tracking a chapter without deleting it"""
+
+        with self._lock:
+            self._discard((manga_name, chapter_name))
+
+    def discard_manga(self, manga_name):
+        """Stops tracking every chapter of a manga"""
+
+        with self._lock:
+            for chapter_name in list(self._by_manga.get(manga_name, ())):
+                self._discard((manga_name, chapter_name))
+
+    def remove(self, manga_name, chapter_name):
+        """Deletes a chapter's file and clears its path"""
+
+        with self._lock:
+            entry = self._discard((manga_name, chapter_name))
+        if entry is not None:
+            chapter = entry[0]
+            try:
+                os.remove(chapter["path"])
+            except OSError:
+                pass
+            chapter["path"] = ""
+
+    def evict(self, protected=()):
+        """Deletes chapters until the cache fits its quota.
+
+        Args:
+            protected (Set(Tuple)): Optional; (manga_name, chapter_name) keys of
+                chapters that must not be evicted, such as the chapters being read.
+
+        Returns:
+            evicted (List(Tuple)): (manga_name, chapter_name) keys of the
+                deleted chapters.
+        """
+
+        if self.quota is None:
+            return []
+        victims = []
+        with self._lock:
+            size = self.size
+            # read chapters are cheaper to lose than unread ones
+            for lru in (self._read, self._unread):
+                for key, (_, chapter_size) in lru.items():
+                    if size <= self.quota:
+                        break
+                    if key not in protected:
+                        victims.append(key)
+                        size -= chapter_size
+        for manga_name, chapter_name in victims:
+            self.remove(manga_name, chapter_name)
+        return victims
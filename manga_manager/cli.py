@@ -2,29 +2,37 @@
 import sys
 
 from manga_manager import __version__
-import manga_manager.manga_manager as mm
-from manga_manager.util import argument_parser
-from manga_manager.provider import *
 
 
 def main():
     """Console script for manga_manager."""
-    if len(sys.argv) < 2:
-        mm.start_menu()
-    elif sys.argv[1] in ["-v", "--version"]:
+    if len(sys.argv) > 1 and sys.argv[1] in ["-v", "--version"]:
         print(__version__)
         return
+
+    # imported here so that `--version` does not pay for loading the library
+    import manga_manager.manga_manager as mm
+    from manga_manager.util import argument_parser
+
+    if len(sys.argv) < 2:
+        mm.start_menu()
     else:
         parser = argument_parser()
         mm.print_welcome()
 
         args = parser.parse_args()
         args.title = " ".join(args.title)
+        if args.action != "stats" and (
+            args.trace is not None or args.metrics_port is not None
+        ):
+            mm.instrument(args.trace, args.metrics_port)
         if args.action == "add":
             mm.add_manga(
                 title=args.title,
-                provider=eval(f"{args.provider}()"),
+                provider=mm.get_provider(args.provider),
                 download_mode=args.download_mode,
+                output_format=args.format,
+                engine=args.engine,
             )
             mm.save()
         elif args.action == "remove":
@@ -37,10 +45,31 @@ def main():
             mm.read_manga(
                 title=mm.fuzzy_find_title(args.title),
                 chapter=int(args.chapters) - 1 if args.chapters else None,
+                serve=args.serve,
+            )
+            mm.save()
+        elif args.action == "sync":
+            progress = mm.sync(
+                workers=args.workers, per_host=args.per_host, rate=args.rate
             )
             mm.save()
+            return 1 if progress.failed else 0
+        elif args.action == "config":
+            mm.edit_settings(*args.title.split()[:2])
+            mm.save()
         elif args.action == "list":
-            mm.list_manga(mm.new_chapters())
+            mm.list_manga(mm.updates())
+        elif args.action == "stats":
+            mm.stats(args.trace)
+        elif args.action == "daemon":
+            progress = mm.run_daemon(
+                interval=args.interval,
+                workers=args.workers,
+                per_host=args.per_host,
+                rate=args.rate,
+                once=args.once,
+            )
+            return 1 if progress is not None and progress.failed else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+"""Background library updates.
+
+`Daemon` keeps the library up to date without the interactive commands
+having to touch the network. It checks each tracked series for new chapters
+on its own schedule, downloads missing chapters according to each manga's
+download mode, and writes the results to the library store, where the next
+`manga` or `manga list` picks them up at once.
+
+Each series is checked again after an interval that shrinks when it had new
+chapters and grows when it had none, so series that update often are checked
+often and abandoned ones rarely. Intervals are jittered so that checks of
+many series do not line up. The schedule lives in the library under the
+"updates" key and a heartbeat under the "daemon" key, which tells the
+interactive commands whether a daemon is keeping the library current.
+"""
+
+import copy
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+UPDATES_KEY = "updates"
+DAEMON_KEY = "daemon"
+HEARTBEAT = 60
+
+
+class UpdateSchedule:
+    """Times at which each series is checked for new chapters next"""
+
+    def __init__(
+        self,
+        state,
+        interval=3600,
+        min_interval=600,
+        max_interval=7 * 24 * 60 * 60,
+        jitter=0.1,
+    ):
+        """
+        Args:
+            state (Dict): Schedule per series title, updated in place. Kept in
+                the library so it survives restarts.
+            interval (float): Optional; Seconds between checks of a series
+                that has no history yet. Default is one hour.
+            min_interval (float): Optional; Shortest interval. Default is 10
+                minutes.
+            max_interval (float): Optional; Longest interval. Default is one
+                week.
+            jitter (float): Optional; Fraction by which intervals are randomly
+                lengthened or shortened. Default is 0.1.
+        """
+
+        self.state = state
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def _entry(self, title):
+        return self.state.setdefault(
+            title,
+            {"interval": self.interval, "next_check": 0, "last_update": None, "unseen": 0},
+        )
+
+    def due(self, titles, now=None):
+        """Returns the titles that are due for a check.
+
+        Series that update most often come first.
+        """
+
+        now = time.time() if now is None else now
+        due = [title for title in titles if self._entry(title)["next_check"] <= now]
+        return sorted(due, key=lambda title: self.state[title]["interval"])
+
+    def checked(self, title, new_chapters, now=None):
+        """Schedules the next check of a series.
+
+        Args:
+            title (str): Title of the series.
+            new_chapters (int): Number of new chapters found, or None if the
+                check failed, which keeps the interval as it was.
+            now (float): Optional; Time of the check. Default is now.
+        """
+
+        now = time.time() if now is None else now
+        entry = self._entry(title)
+        interval = entry["interval"]
+        if new_chapters:
+            interval = max(self.min_interval, interval / 2)
+            entry["last_update"] = now
+            entry["unseen"] += new_chapters
+        elif new_chapters is not None:
+            interval = min(self.max_interval, interval * 1.5)
+        entry["interval"] = interval
+        spread = random.uniform(1 - self.jitter, 1 + self.jitter)
+        entry["next_check"] = now + interval * spread
+
+    def next_check(self, titles):
+        """Returns when the next series is due, or None without series"""
+
+        return min((self._entry(title)["next_check"] for title in titles), default=None)
+
+    def forget(self, titles):
+        """Drops the schedule of every series not in `titles`"""
+
+        for title in set(self.state) - set(titles):
+            del self.state[title]
+
+
+def running(library, now=None):
+    """Returns whether a daemon has recently updated a library"""
+
+    state = library.get(DAEMON_KEY) or {}
+    heartbeat = state.get("heartbeat")
+    now = time.time() if now is None else now
+    return heartbeat is not None and now - heartbeat < 3 * HEARTBEAT
+
+
+def take_unseen(library):
+    """Returns and resets the number of new chapters found per series.
+
+    Returns:
+        new_chapters (Dict): Number of new chapters per manga title, for the
+            series that have any.
+    """
+
+    unseen = {}
+    for title, entry in library.get(UPDATES_KEY, {}).items():
+        if entry.get("unseen") and title in library["manga"]:
+            unseen[title] = entry["unseen"]
+        entry["unseen"] = 0
+    return unseen
+
+
+class Daemon:
+    """Checks tracked series on a schedule and downloads their new chapters"""
+
+    def __init__(self, interval=3600, workers=8, per_host=None, rate=None, verbose=True):
+        """
+        Args:
+            interval (float): Optional; Seconds between checks of a series
+                without history. Default is one hour.
+            workers (int): Optional; Number of chapters downloaded at once.
+                Default is 8.
+            per_host (int): Optional; Number of chapters downloaded at once
+                from one provider site. Default is no limit.
+            rate (float): Optional; Most requests per second across all
+                downloads. Default is no limit.
+            verbose (bool): Optional; Prints what every cycle did. Default is
+                True.
+        """
+
+        self.interval = interval
+        self.workers = workers
+        self.per_host = per_host
+        self.rate = rate
+        self.verbose = verbose
+        self.next_check = None
+        self._lock = threading.RLock()
+
+    def _log(self, message):
+        if self.verbose:
+            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+    def _heartbeat(self, stopped=False):
+        from manga_manager import manga_manager as mm
+
+        with self._lock:
+            mm.reload()[DAEMON_KEY] = {
+                "heartbeat": None if stopped else time.time(),
+                "pid": os.getpid(),
+                "next_check": self.next_check,
+            }
+            mm.save()
+
+    def _beat(self, done):
+        """Keeps the heartbeat fresh while a cycle is running"""
+
+        while not done.wait(HEARTBEAT):
+            self._heartbeat()
+
+    def _check(self, due):
+        """Checks series for new chapters without touching the library.
+
+        Returns:
+            results (Dict): New chapter dicts per title, or None for the
+                series whose check failed.
+        """
+
+        from manga_manager import manga_manager as mm
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            checks = [(manga, executor.submit(mm._new_chapter_check, manga)) for manga in due]
+        for manga, check in checks:
+            try:
+                results[manga["name"]] = check.result()
+            except Exception as e:
+                self._log(f"{manga['name']}: check failed: {e}")
+                results[manga["name"]] = None
+        return results
+
+    def run_once(self):
+        """Checks the series that are due and downloads missing chapters.
+
+        Network checks and downloads work on copies; the library is read
+        again right before each write and the results are merged into it, so
+        changes made by other `manga` commands in the meantime are kept. The
+        heartbeat is refreshed while the cycle runs.
+
+        Returns:
+            progress (Progress): Counters of the downloaded and failed chapters.
+        """
+
+        from manga_manager import manga_manager as mm
+
+        self._heartbeat()
+        done = threading.Event()
+        beat = threading.Thread(target=self._beat, args=(done,), daemon=True)
+        beat.start()
+        try:
+            return self._cycle(mm)
+        finally:
+            done.set()
+            beat.join()
+            self._heartbeat()
+
+    def _cycle(self, mm):
+        with self._lock:
+            library = mm.reload()
+            schedule = UpdateSchedule(dict(library.get(UPDATES_KEY, {})), self.interval)
+            due = [
+                copy.deepcopy(library["manga"][title])
+                for title in schedule.due(list(library["manga"]))
+            ]
+        results = self._check(due)
+
+        found = 0
+        with self._lock:
+            library = mm.reload()
+            titles = list(library["manga"])
+            schedule = UpdateSchedule(library.setdefault(UPDATES_KEY, {}), self.interval)
+            schedule.forget(titles)
+            for title, chapters in results.items():
+                if title not in library["manga"]:
+                    continue
+                manga = library["manga"][title]
+                if chapters is not None:
+                    known = {chapter["link"] for chapter in manga["chapters"]}
+                    chapters = [c for c in chapters if c["link"] not in known]
+                    manga["chapters"].extend(chapters)
+                    found += len(chapters)
+                    if chapters:
+                        self._log(f"{title}: {len(chapters)} new chapters")
+                schedule.checked(title, None if chapters is None else len(chapters))
+            self.next_check = schedule.next_check(titles)
+            mm.save()
+            # the download works on a copy; only the paths are merged back
+            missing = copy.deepcopy(mm._missing_downloads())
+
+        progress, paths = mm._download_missing(
+            self.workers, self.per_host, self.rate, verbose=False, missing=missing
+        )
+        with self._lock:
+            library = mm.reload()
+            protected = mm._reading_chapters(library)
+            for title, chapter_paths in paths.items():
+                if title in library["manga"]:
+                    mm._update_chapter_paths(title, chapter_paths, protected)
+            mm.save()
+        self._log(
+            f"Checked {len(due)} of {len(titles)} series, {found} new chapters, "
+            f"downloaded {progress.chapters}, {progress.failed} failed"
+        )
+        return progress
+
+    def run(self, stop=None):
+        """Runs update cycles until `stop` is set or the process is interrupted.
+
+        Args:
+            stop (threading.Event): Optional; Event that ends the daemon.
+        """
+
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                self.run_once()
+                deadline = self.next_check or time.time() + self.interval
+                while not stop.is_set() and time.time() < deadline:
+                    stop.wait(min(deadline - time.time(), HEARTBEAT))
+                    self._heartbeat()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._heartbeat(stopped=True)
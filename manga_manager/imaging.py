@@ -0,0 +1,172 @@
+"""Page post-processing and the encoder process pool.
+
+Manga can be configured to shrink their pages before they are written:
+
+* "max_width": Pages wider than this many pixels are scaled down.
+* "grayscale": Pages are converted to grayscale.
+* "quality": JPEG/WebP/AVIF quality of re-encoded pages.
+* "image_format": "jpeg", "webp" or "avif". PDFs can only embed JPEGs, so
+  this only applies to CBZ chapters.
+
+Post-processing decodes every page, so it runs in a shared pool of worker
+processes that only receive page file paths.
+"""
+
+import collections
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from PIL import Image
+
+try:
+    import pillow_avif  # noqa: F401 registers AVIF support on Pillow < 11.2
+except ImportError:  # pragma: no cover
+    pass
+
+FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "avif": "AVIF"}
+DEFAULT_QUALITY = 85
+OPTIONS = ("max_width", "grayscale", "quality", "image_format")
+LOOKAHEAD = 8
+
+
+def active(options):
+    """Returns whether post-processing options change the pages at all"""
+
+    if not options:
+        return False
+    return bool(
+        options.get("max_width")
+        or options.get("grayscale")
+        or options.get("quality")
+        or options.get("image_format", "jpeg") != "jpeg"
+    )
+
+
+def postprocess(data, max_width=None, grayscale=False, quality=None, image_format=None):
+    """Downscales and re-encodes a page.
+
+    Args:
+        data (bytes): Image file contents.
+        max_width (int): Optional; Largest width in pixels. Default is no limit.
+        grayscale (bool): Optional; Converts the page to grayscale. Default is False.
+        quality (int): Optional; Encoder quality from 1 to 100. Default is 85.
+        image_format (str): Optional; "jpeg", "webp" or "avif". Default is "jpeg".
+
+    Returns:
+        data (bytes): The processed image file.
+    """
+
+    im = Image.open(io.BytesIO(data))
+    if grayscale:
+        im = im.convert("L")
+    elif im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")
+    if max_width and im.width > int(max_width):
+        height = round(im.height * int(max_width) / im.width)
+        im = im.resize((int(max_width), max(height, 1)), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    im.save(
+        buffer,
+        format=FORMATS[image_format or "jpeg"],
+        quality=int(quality or DEFAULT_QUALITY),
+    )
+    return buffer.getvalue()
+
+
+def postprocess_file(path, options):
+    """`postprocess` for an image file, run in encoder processes"""
+
+    with open(path, "rb") as file:
+        return postprocess(file.read(), **options)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def encoder_pool(processes):
+    """Returns a process pool for encoding pages, shared per pool size.
+
+    Decoding and encoding images holds the GIL, so pages are transcoded in
+    worker processes to use every core. The pool is started on first use.
+
+    Args:
+        processes (int): Number of worker processes.
+
+    Returns:
+        pool (concurrent.futures.ProcessPoolExecutor): The pool.
+    """
+
+    with _pools_lock:
+        if processes not in _pools:
+            _pools[processes] = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pools[processes]
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def pipelined(pages, processes):
+    """Yields pages in order, keeping a few pool jobs ahead of the consumer.
+
+    Only futures are queued ahead. A finished page, such as a JPEG passed
+    through unchanged, is yielded as soon as the jobs before it are done, so
+    no more than `LOOKAHEAD` pages are held per chapter however many
+    processes the pool has.
+
+    Args:
+        pages (Iterable): Finished pages or `concurrent.futures.Future`s of pages.
+        processes (int): Size of the pool the futures run in.
+    """
+
+    ahead = min(2 * max(processes, 1), LOOKAHEAD)
+    pending = collections.deque()
+    for page in pages:
+        if not isinstance(page, Future):
+            while pending:
+                yield pending.popleft().result()
+            yield page
+            continue
+        pending.append(page)
+        while len(pending) > ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def processed_pages(paths, processes=None, options=None):
+    """Yields the contents of image files after post-processing, in order.
+
+    Args:
+        paths (Iterable(pathlib.Path)): Image files of the pages.
+        processes (int): Optional; Number of encoder processes. 0 processes
+            pages on the calling thread. Default is the number of CPUs.
+        options (Dict): Optional; Post-processing options. Pages are read
+            unchanged if no option applies.
+
+    Yields:
+        data (bytes): Contents of each page.
+    """
+
+    if processes is None:
+        processes = cpu_count()
+    options = {key: value for key, value in (options or {}).items() if key in OPTIONS}
+
+    def pages():
+        for path in paths:
+            if not active(options):
+                with open(path, "rb") as file:
+                    yield file.read()
+            elif processes == 0:
+                yield postprocess_file(path, options)
+            else:
+                yield encoder_pool(processes).submit(postprocess_file, str(path), options)
+
+    return pipelined(pages(), processes)
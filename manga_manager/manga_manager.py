@@ -10,54 +10,156 @@ import warnings
 
 warnings.filterwarnings("ignore")
 
-import itertools
-import json
 import os
 import shutil
-import webbrowser
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from fuzzywuzzy import fuzz
-
-from manga_manager.provider import *
-from manga_manager.util import argument_parser
+from manga_manager.chapter_cache import ChapterCache, parse_size
+from manga_manager.prefetch import Prefetcher
+from manga_manager.provider.progress import Progress
+from manga_manager.provider.registry import get_provider
+from manga_manager.scheduler import Scheduler
+from manga_manager.store import open_store
+from manga_manager.util import argument_parser, library_dir
 
 DYNAMIC_DL_SIZE = 2
+SETTINGS = {"chapter_cache_quota": None}
+MANGA_DEFAULTS = {
+    "output_format": "pdf",
+    "max_width": None,
+    "grayscale": False,
+    "quality": None,
+    "image_format": "jpeg",
+}
+
+_store = None
+_library = None
+_chapter_cache = None
+_title_index = None
+
+
+def _config():
+    """Returns the library config, loading it from the store on first use"""
+    global _store, _library
+    if _library is None:
+        _store = open_store(library_dir())
+        _library = _load()
+    return _library
+
+
+def __getattr__(name):
+    # the library is only opened once something needs it, so that importing
+    # this module (e.g. for `manga --version`) stays cheap
+    if name == "config":
+        return _config()
+    if name == "store":
+        _config()
+        return _store
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _load():
-    """Loads config from file"""
-    path = Path(__file__).parent
-    config = None
-    if "config.json" not in os.listdir(path):
-        open(path / "config.json", "w").close()
-        return {"manga": {}}
-    else:
-        with open(path / "config.json", "r") as file:
-            config = json.loads(file.read())
-        return config
+    """Loads config from the library store, filling in missing manga keys"""
+    library = _store.load()
+    for manga in library["manga"].values():
+        for key, value in MANGA_DEFAULTS.items():
+            manga.setdefault(key, value)
+    return library
+
+
+def _image_options(manga):
+    """Returns the image post-processing options of a manga"""
+    from manga_manager.imaging import OPTIONS
+
+    return {key: manga[key] for key in OPTIONS}
+
+
+def _download_options(manga):
+    """Returns the per-manga keyword arguments for `Provider.download`"""
+    return {
+        "output_format": manga["output_format"],
+        "image_options": _image_options(manga),
+    }
 
 
 def save():
-    """Saves config to file"""
-    path = Path(__file__).parent
+    """Saves config to the library store"""
+    if _library is None:
+        return
     try:
-        data = json.dumps(config)
-        with open(path / "config.json", "w") as file:
-            file.write(data)
+        _store.save(_library)
     except Exception as e:
         print(e)
 
 
-def _update_chapter_paths(manga_name, paths):
-    """Updates paths in a manga's chapters"""
-    for chapter in config["manga"][manga_name]["chapters"]:
+def reload():
+    """Loads the library from the store again, replacing the in-memory copy
+
+    Long-running processes use this to pick up changes written by other
+    `manga` commands.
+
+    Returns:
+        config (Dict): The reloaded library.
+    """
+    global _library, _chapter_cache, _title_index
+    if _library is None:
+        return _config()
+    _library = _load()
+    _chapter_cache = None
+    _title_index = None
+    return _library
+
+
+def settings():
+    """Returns the library-wide settings, filling in defaults"""
+    library_settings = _config().setdefault("settings", {})
+    for key, value in SETTINGS.items():
+        library_settings.setdefault(key, value)
+    return library_settings
+
+
+def chapter_cache():
+    """Returns the cache of downloaded chapters, building it on first use"""
+    global _chapter_cache
+    if _chapter_cache is None:
+        _chapter_cache = ChapterCache.from_library(
+            _config(), quota=settings()["chapter_cache_quota"]
+        )
+    return _chapter_cache
+
+
+def title_index():
+    """Returns the index of tracked titles, building it on first use"""
+    global _title_index
+    if _title_index is None:
+        from manga_manager.title_index import TitleIndex
+
+        _title_index = TitleIndex(_config()["manga"])
+    return _title_index
+
+
+def _update_chapter_paths(manga_name, paths, protected=()):
+    """Updates paths in a manga's chapters and evicts chapters over the quota
+
+    Args:
+        manga_name (str): Title of the manga.
+        paths (Dict): Paths of downloaded chapters by chapter name.
+        protected (Set(Tuple)): Optional; (manga_name, chapter_name) keys of
+            chapters that must stay on disk.
+    """
+    cache = chapter_cache()
+    for chapter in _config()["manga"][manga_name]["chapters"]:
         if chapter["name"] in paths:
             chapter["path"] = paths[chapter["name"]]
+            cache.add(manga_name, chapter)
+    cache.evict(protected)
 
 
-def add_manga(title, provider=Mangakakalot(), download_mode="dynamic"):
+def add_manga(
+    title, provider=None, download_mode="dynamic", output_format="pdf", engine=None
+):
     """Adds a manga to track
 
     Args:
@@ -69,8 +171,15 @@ def add_manga(title, provider=Mangakakalot(), download_mode="dynamic"):
             delete chapters as the user reads. "all" will download all chapters of
             the manga at once. "none" will not download any manga at this time. Default
             is "dynamic".
+        output_format (str): Optional; File format of the manga's chapters, "pdf"
+            or "cbz". Default is "pdf".
+        engine (str): Optional; Engine the first chapters are downloaded with,
+            "threads" or "asyncio". Default is the provider's engine.
     """
 
+    if provider is None:
+        provider = get_provider("Mangakakalot")
+    config = _config()
     page = 1
     manga_url, manga_name, manga_authors, manga_chapters = None, None, None, None
     while True:
@@ -109,18 +218,23 @@ def add_manga(title, provider=Mangakakalot(), download_mode="dynamic"):
             "authors": manga_authors,
             "download_mode": download_mode,
             "provider": provider.name,
+            **MANGA_DEFAULTS,
+            "output_format": output_format,
             "current_chapter": 0,
             "chapters": [
                 {"name": chapter[0], "link": chapter[1], "path": "", "read": False}
                 for chapter in manga_chapters
             ],
         }
+        title_index().add(manga_name)
     if download_mode in ["dynamic", "all"]:
         paths = provider.download(
             manga_name,
             config["manga"][manga_name]["chapters"][
                 : (DYNAMIC_DL_SIZE if download_mode == "dynamic" else -1)
             ],
+            engine=engine,
+            **_download_options(config["manga"][manga_name]),
         )
         _update_chapter_paths(manga_name, paths)
 
@@ -138,8 +252,14 @@ def remove_manga(title, delete_files=True):
     if confirmation == "n":
         return
     if delete_files:
-        shutil.rmtree(Path(__file__).parent / "manga" / title)
-    config["manga"].pop(title)
+        provider = get_provider(_config()["manga"][title]["provider"])
+        shutil.rmtree(Path(provider.download_dir) / title, ignore_errors=True)
+        page_store = provider.page_store
+        if page_store is not None:
+            page_store.remove_manifests(title)
+    chapter_cache().discard_manga(title)
+    title_index().remove(title)
+    _config()["manga"].pop(title)
     print(f"{title} was successfully deleted\n")
 
 
@@ -150,7 +270,13 @@ def edit_manga(title):
         title (str): Title of the manga to be edited.
     """
 
-    manga = config["manga"][title]
+    from manga_manager.imaging import FORMATS
+    from manga_manager.provider.provider import WRITERS
+
+    choices = {"output_format": WRITERS, "image_format": FORMATS}
+    ranges = {"max_width": (1, None), "quality": (1, 95)}
+    manga = _config()["manga"][title]
+    options = _download_options(manga)
 
     while True:
         for key, value in manga.items():
@@ -164,81 +290,205 @@ def edit_manga(title):
         else:
             value = input(f"What should `{key}` be? ").lower()
             if value in ["true", "false"]:
-                value = bool(value.title())
+                value = value == "true"
+            elif value == "none":
+                value = None
+            elif value.isdigit():
+                value = int(value)
+            if key in choices and value not in choices[key]:
+                print(f"`{key}` must be one of: {', '.join(choices[key])}")
+                continue
+            if key in ranges and value is not None:
+                low, high = ranges[key]
+                # bools are ints too, but "true" is never a valid width
+                if (
+                    type(value) is not int
+                    or value < low
+                    or (high is not None and value > high)
+                ):
+                    bounds = f"from {low} to {high}" if high else f"of at least {low}"
+                    print(f"`{key}` must be none or a whole number {bounds}")
+                    continue
             manga[key] = value
 
+    if _download_options(manga) != options:
+        _repackage(title, manga)
+
+
+def _repackage(title, manga):
+    """Rewrites downloaded chapters with the manga's current format and options.
+
+    Chapters are rebuilt from the provider's page store without downloading;
+    chapters whose pages are no longer stored are kept as they are.
+    """
+    provider = get_provider(manga["provider"])
+    options = _download_options(manga)
+    cache = chapter_cache()
+    downloaded = [chapter for chapter in manga["chapters"] if chapter["path"] != ""]
+    repackaged = 0
+    for chapter in downloaded:
+        path = provider.repackage(title, chapter["name"], **options)
+        if path is None:
+            continue
+        if str(path) != chapter["path"] and os.path.exists(chapter["path"]):
+            os.remove(chapter["path"])
+        chapter["path"] = str(path)
+        cache.add(title, chapter)
+        repackaged += 1
+    if downloaded:
+        print(f"Re-packaged {repackaged} of {len(downloaded)} downloaded chapters")
+
+
+def edit_settings(key=None, value=None):
+    """Displays the library-wide settings or changes one of them
+
+    Args:
+        key (str): Optional; Setting to change. All settings are printed if
+            no key is given.
+        value (str): Optional; New value of the setting. "none" clears it.
+    """
+
+    library_settings = settings()
+    if key is None:
+        for name, current in library_settings.items():
+            print(f"{name} = {current}")
+        return
+    if key not in SETTINGS:
+        print("Invalid key")
+        return
+    if value is None or value.lower() == "none":
+        value = None
+    elif key == "chapter_cache_quota":
+        try:
+            value = parse_size(value)
+        except ValueError:
+            print("Invalid size")
+            return
+    library_settings[key] = value
+    if key == "chapter_cache_quota":
+        chapter_cache().quota = value
+        chapter_cache().evict()
+
+
+def _prune(title, manga, keep):
+    """Deletes the downloaded chapters of a manga that are not in `keep`"""
+    cache = chapter_cache()
+    names = {name for _, name in keep}
+    for name in cache.resident(title):
+        if name not in names:
+            cache.remove(title, name)
+
+
+def _serve(title, manga, chapter, provider, prefetcher, protected):
+    """Reads a manga in the browser through a local `ReaderServer`"""
+    import webbrowser
+
+    from manga_manager.reader import ReaderServer
 
-def read_manga(title, chapter=None):
+    cache = chapter_cache()
+    lock = threading.Lock()
+
+    def visit(index):
+        with lock:
+            manga["current_chapter"] = index
+            prefetcher.visit(index)
+            current_chapter = manga["chapters"][index]
+            if current_chapter["path"] == "":
+                # pages are served from the download journal as they arrive
+                threading.Thread(
+                    target=prefetcher.wait, args=(index,), daemon=True
+                ).start()
+            else:
+                cache.touch(title, current_chapter)
+            if manga["download_mode"] == "dynamic":
+                _prune(title, manga, protected())
+            save()
+
+    def finish(index):
+        with lock:
+            finished_chapter = manga["chapters"][index]
+            finished_chapter["read"] = True
+            cache.touch(title, finished_chapter)
+            save()
+
+    with ReaderServer(manga, provider, on_visit=visit, on_read=finish) as server:
+        webbrowser.get().open(server.chapter_url(chapter))
+        print(f"Name: {manga['name']}")
+        print(f"Reading at {server.url}\n")
+        while input("Action? (q - Quit): ").lower() != "q":
+            pass
+
+
+def read_manga(title, chapter=None, serve=False):
     """Opens a manga chapter for reading.
     This function opens the pdf of a manga chapter in the user's browser.
     Whenever a user moves to the next chapter, the current chapter is marked
     as read. If any chapter is not locally downloaded, the system will
     automatically download it (while the user is reading the current chapter
-    if possible). If the manga's download mode is "dynamic", the system
-    will also delete previous chapters as the user reads.
+    if possible). Chapters the user is likely to read next are downloaded in
+    the background by a `Prefetcher`. If the manga's download mode is
+    "dynamic", the system will also delete chapters outside of the
+    prefetcher's window as the user reads. Whatever the download mode,
+    downloads that push the library over its chapter cache quota evict the
+    least recently used chapters, read ones first.
+
+    With `serve`, chapters are read through a local web reader instead. It
+    shows the pages of a chapter as they are downloaded, moves between
+    chapters in the browser and records reading progress as it happens.
 
     Args:
         title (str): Title of the manga that will be read.
         chapter (int): Optional; Chapter to start reading. Default value
             is the manga's last saved current chapter.
+        serve (bool): Optional; Reads in the local web reader. Default is False.
     """
 
-    manga = config["manga"][title]
-    provider = eval(f"{manga['provider']}()")
+    import webbrowser
+
+    manga = _config()["manga"][title]
+    provider = get_provider(manga["provider"])
     if not chapter:
         chapter = manga["current_chapter"]
     else:
         manga["current_chapter"] = chapter
 
+    cache = chapter_cache()
+
+    def protected():
+        return {(title, manga["chapters"][c]["name"]) for c in prefetcher.keep()}
+
+    prefetcher = Prefetcher(
+        provider,
+        manga,
+        on_download=lambda paths: _update_chapter_paths(title, paths, protected()),
+        download_options=_download_options(manga),
+        window=DYNAMIC_DL_SIZE,
+    ).start()
     try:
+        if serve:
+            _serve(title, manga, chapter, provider, prefetcher, protected)
+            return
         while True:
-            offset = DYNAMIC_DL_SIZE
             current_chapter = manga["chapters"][chapter]
             print(f"Name: {manga['name']}")
             print(f"Chapter: {current_chapter['name']}\n")
 
+            # queue the chapters around the current one for background download
+            prefetcher.visit(chapter)
+
             # check if current chapter is downloaded. if not, download it.
             if current_chapter["path"] == "":
                 print("Downloading current chapter...")
-                paths = provider.download(
-                    manga["name"], [current_chapter], verbose=False
-                )
-                _update_chapter_paths(manga["name"], paths)
+                if not prefetcher.wait(chapter):
+                    print("Could not download chapter")
 
             # open current chapter
             webbrowser.get().open(f"file:///{current_chapter['path']}")
+            cache.touch(title, current_chapter)
 
-            # delete chapters outside of offset
+            # delete chapters the prefetcher no longer needs
             if manga["download_mode"] == "dynamic":
-                # range for chapters outside of offset
-                pre_offset = range(max(0, chapter - offset))
-                post_offset = range(
-                    min(len(manga["chapters"]), chapter + offset + 1),
-                    len(manga["chapters"]),
-                )
-                offset_range = itertools.chain(pre_offset, post_offset)
-                # print(list(offset_range))
-                for c in offset_range:
-                    try:
-                        os.remove(manga["chapters"][c]["path"])
-                    except Exception:
-                        """do nothing"""
-                    finally:
-                        manga["chapters"][c]["path"] = ""
-                # download chapters in offset
-                chapter_downloads = [
-                    c
-                    for c in manga["chapters"][
-                        max(0, chapter - offset) : min(
-                            chapter + offset + 1, len(manga["chapters"])
-                        )
-                    ]
-                    if c["path"] == ""
-                ]
-                paths = provider.download(
-                    manga["name"], chapter_downloads, verbose=False
-                )
-                _update_chapter_paths(manga["name"], paths)
+                _prune(title, manga, protected())
             selection = input("\nAction? ([n - Next]/p - Previous/q - Quit): ").lower()
             if selection == "q":
                 manga["current_chapter"] = chapter
@@ -247,14 +497,18 @@ def read_manga(title, chapter=None):
                 chapter = max(chapter - 1, 0)
             else:
                 current_chapter["read"] = True
+                cache.touch(title, current_chapter)
                 chapter = min(len(manga["chapters"]), chapter + 1)
     except KeyboardInterrupt:
         return
+    finally:
+        prefetcher.stop()
 
 
 def list_manga(new_chapters={}):
     """Lists the manga currently being tracked by manga_manager"""
 
+    config = _config()
     if len(config["manga"].items()) == 0:
         return
     for i, (name, manga) in enumerate(config["manga"].items()):
@@ -273,31 +527,203 @@ def list_manga(new_chapters={}):
     print("\n")
 
 
-def _new_chapter_check(manga, new_chapters):
-    """Checks manga for newly released chapters"""
+def _new_chapter_check(manga):
+    """Returns the newly released chapters of a manga
 
-    provider = eval(f"{manga['provider']}()")
-    chapters = provider.chapter_list(manga["link"])
-    chapter_names = [chapter["name"] for chapter in manga["chapters"]]
-    for chapter in chapters:
-        if chapter[0] not in chapter_names:
-            manga["chapters"].append(
-                {"name": chapter[0], "link": chapter[1], "path": "", "read": False}
-            )
-            if manga["name"] in new_chapters:
-                new_chapters[manga["name"]] += 1
-            else:
-                new_chapters[manga["name"]] = 1
+    Args:
+        manga (Dict): Config of the manga to check.
+
+    Returns:
+        chapters (List(Dict)): Chapter dicts of the chapters that are not
+            tracked yet, oldest first.
+    """
+
+    provider = get_provider(manga["provider"])
+    known_links = {chapter["link"] for chapter in manga["chapters"]}
+    return [
+        {"name": name, "link": link, "path": "", "read": False}
+        for name, link in provider.new_chapters(manga["link"], known_links)
+    ]
 
 
-def new_chapters():
+def new_chapters(max_workers=10):
+    """Checks every tracked manga for newly released chapters.
+
+    The checks run concurrently; new chapters are added to the config once
+    all of them have finished. Manga that fail to update are skipped.
+
+    Args:
+        max_workers (int): Optional; Number of manga checked at once. Default is 10.
+
+    Returns:
+        new_chapters (Dict): Number of new chapters per manga title.
+    """
+
     new_chapters = {}
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        for manga in config["manga"].values():
-            executor.submit(_new_chapter_check, manga, new_chapters)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        checks = [
+            (manga, executor.submit(_new_chapter_check, manga))
+            for manga in _config()["manga"].values()
+        ]
+    for manga, check in checks:
+        try:
+            chapters = check.result()
+        except Exception:
+            continue
+        if chapters:
+            manga["chapters"].extend(chapters)
+            new_chapters[manga["name"]] = len(chapters)
     return new_chapters
 
 
+def _missing_chapters(manga):
+    """Returns the chapters of a manga that a sync should download
+
+    "all" manga get every chapter that is not downloaded, "dynamic" manga the
+    ones in the download window after the current chapter and "none" manga
+    nothing.
+    """
+
+    if manga["download_mode"] == "all":
+        chapters = manga["chapters"]
+    elif manga["download_mode"] == "dynamic":
+        start = manga["current_chapter"]
+        chapters = manga["chapters"][start : start + DYNAMIC_DL_SIZE]
+    else:
+        chapters = []
+    return [chapter for chapter in chapters if chapter["path"] == ""]
+
+
+def _print_sync_event(event, progress, chapter_name=None, error=None, **details):
+    if event == "chapter":
+        print(f"[{progress.finished}/{progress.chapters_total}] {chapter_name}")
+    elif event == "failed":
+        print(f"[{progress.finished}/{progress.chapters_total}] {chapter_name} failed: {error}")
+
+
+def _missing_downloads():
+    """Returns (manga, chapters) pairs of the chapters a sync should download"""
+    missing = []
+    for manga in _config()["manga"].values():
+        chapters = _missing_chapters(manga)
+        if chapters:
+            missing.append((manga, chapters))
+    return missing
+
+
+def _reading_chapters(library):
+    """Returns the (manga_name, chapter_name) keys around each current chapter
+
+    These are the chapters a reader, possibly in another process, is about to
+    open, so cache evictions must leave them alone.
+    """
+    keys = set()
+    for name, manga in library["manga"].items():
+        current = manga["current_chapter"]
+        for chapter in manga["chapters"][max(0, current - 1) : current + DYNAMIC_DL_SIZE + 1]:
+            keys.add((name, chapter["name"]))
+    return keys
+
+
+def _download_missing(workers=8, per_host=None, rate=None, verbose=True, missing=None):
+    """Downloads the chapters `_missing_chapters` picks for every manga
+
+    Args:
+        missing (List(Tuple)): Optional; (manga, chapters) pairs to download.
+            Default is `_missing_downloads()`.
+
+    Returns:
+        progress (Progress): Counters of the downloaded and failed chapters.
+        paths (Dict): Downloaded chapter paths in the form
+            {manga_name: {chapter_name: chapter_path}}.
+    """
+    scheduler = Scheduler(workers=workers, per_host=per_host, rate=rate)
+    for manga, chapters in _missing_downloads() if missing is None else missing:
+        scheduler.add(
+            get_provider(manga["provider"]),
+            manga["name"],
+            chapters,
+            **_download_options(manga),
+        )
+
+    progress = Progress()
+    if verbose:
+        progress.subscribe(_print_sync_event)
+    return progress, scheduler.run(progress)
+
+
+def sync(workers=8, per_host=None, rate=None, verbose=True):
+    """Updates every tracked manga and downloads its missing chapters.
+
+    Chapters of all manga are downloaded together by one `Scheduler`, which
+    interleaves the manga fairly and paces the requests to each host and the
+    overall request rate. Runs without any prompts, e.g. as a nightly job.
+
+    Args:
+        workers (int): Optional; Number of chapters downloaded at once. Default is 8.
+        per_host (int): Optional; Number of chapters downloaded at once from
+            one provider site. Default is no limit.
+        rate (float): Optional; Most requests per second across all downloads.
+            Default is no limit.
+        verbose (bool): Optional; Prints every finished chapter. Default is True.
+
+    Returns:
+        progress (Progress): Counters of the downloaded and failed chapters.
+    """
+
+    new_chapters()
+    progress, paths = _download_missing(workers, per_host, rate, verbose)
+    for manga_name, chapter_paths in paths.items():
+        _update_chapter_paths(manga_name, chapter_paths)
+    if verbose:
+        print(f"Downloaded {progress.chapters} chapters, {progress.failed} failed")
+    return progress
+
+
+def updates():
+    """Returns the number of new chapters per manga to show at startup
+
+    When a daemon keeps the library current, the counts it stored are
+    returned without any network access. Otherwise every manga is checked
+    now with `new_chapters`.
+
+    Returns:
+        new_chapters (Dict): Number of new chapters per manga title.
+    """
+    from manga_manager import daemon
+
+    library = _config()
+    if not daemon.running(library):
+        return new_chapters()
+    new = daemon.take_unseen(library)
+    save()
+    return new
+
+
+def run_daemon(interval=60, workers=8, per_host=None, rate=None, once=False):
+    """Keeps the library up to date in the foreground until interrupted
+
+    Args:
+        interval (float): Optional; Minutes between checks of a manga without
+            update history. Default is 60.
+        workers (int): Optional; Number of chapters downloaded at once. Default is 8.
+        per_host (int): Optional; Number of chapters downloaded at once from
+            one provider site. Default is no limit.
+        rate (float): Optional; Most requests per second across all downloads.
+            Default is no limit.
+        once (bool): Optional; Runs a single update cycle and returns.
+            Default is False.
+    """
+    from manga_manager.daemon import Daemon
+
+    daemon = Daemon(
+        interval=interval * 60, workers=workers, per_host=per_host, rate=rate
+    )
+    if once:
+        return daemon.run_once()
+    daemon.run()
+
+
 def print_separator():
     """Prints a separator line"""
 
@@ -307,7 +733,10 @@ def print_separator():
 def fuzzy_find_title(title):
     """Returns the title of the manga closest to the submitted title"""
 
-    return max(config["manga"].keys(), key=lambda x: fuzz.ratio(title, x))
+    match = title_index().best(title)
+    if match is None:
+        raise ValueError("No manga are being tracked")
+    return match
 
 
 def print_welcome():
@@ -319,11 +748,57 @@ def print_welcome():
     print("-" * len(welcome_message) + "\n")
 
 
+def trace_path():
+    """Returns the default path of the download trace"""
+    return library_dir() / "trace.jsonl"
+
+
+def instrument(trace=None, port=None):
+    """Turns on download metrics for the rest of the process
+
+    Args:
+        trace (str): Optional; JSONL file spans are appended to. An empty
+            string uses `trace_path()`; None writes no trace.
+        port (int): Optional; Port of a local Prometheus endpoint serving the
+            metrics at /metrics.
+    """
+    from manga_manager import metrics
+
+    if trace is not None:
+        trace = trace or trace_path()
+    metrics.enable(trace_path=trace, port=port)
+    if port is not None:
+        print(f"Serving metrics at http://127.0.0.1:{port}/metrics")
+
+
+def stats(trace=None):
+    """Prints latency percentiles of the spans in a download trace
+
+    Args:
+        trace (str): Optional; Trace file to summarize. Default is
+            `trace_path()`.
+    """
+    from manga_manager import metrics
+
+    path = Path(trace or trace_path())
+    if not path.exists():
+        print(f"No trace at {path}; download with --trace to record one\n")
+        return
+    rows = metrics.summary(path)
+    print(f"{'span':<10}{'host':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for row in rows:
+        print(
+            f"{row['span']:<10}{row['host'][:27]:<28}{row['count']:>8}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['total_s']:>10.1f}"
+        )
+    print("\n")
+
+
 def start_menu():
     """Menu for using manga_manager"""
 
     try:
-        new = new_chapters()
+        new = updates()
         while True:
             print_welcome()
             list_manga(new)
@@ -332,11 +807,17 @@ def start_menu():
             parser = argument_parser()
             args = parser.parse_args(selection.split())
             args.title = " ".join(args.title)
+            if args.action != "stats" and (
+                args.trace is not None or args.metrics_port is not None
+            ):
+                instrument(args.trace, args.metrics_port)
             if args.action == "add":
                 add_manga(
                     title=args.title,
-                    provider=eval(f"{args.provider}()"),
+                    provider=get_provider(args.provider),
                     download_mode=args.download_mode,
+                    output_format=args.format,
+                    engine=args.engine,
                 )
                 save()
             elif args.action == "remove":
@@ -349,8 +830,17 @@ def start_menu():
                 read_manga(
                     title=fuzzy_find_title(args.title),
                     chapter=int(args.chapters) - 1 if args.chapters else None,
+                    serve=args.serve,
                 )
                 save()
+            elif args.action == "sync":
+                sync(workers=args.workers, per_host=args.per_host, rate=args.rate)
+                save()
+            elif args.action == "config":
+                edit_settings(*args.title.split()[:2])
+                save()
+            elif args.action == "stats":
+                stats(args.trace)
             elif args.action == "quit":
                 break
     except KeyboardInterrupt:
@@ -359,6 +849,3 @@ def start_menu():
         print(e)
     finally:
         save()
-
-
-config = _load()
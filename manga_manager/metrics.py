@@ -0,0 +1,340 @@
+"""Opt-in timing and counters for the download pipeline.
+
+Instrumentation is off until `enable` is called, and the hooks in the
+download code cost one global lookup while it is off. Once enabled, the
+pipeline records these spans:
+
+* "request": time to the first byte of a response, including DNS and
+  connecting when a new connection is opened, labelled with the host.
+* "transfer": time spent reading the body of a response, labelled with
+  the host.
+* "page": downloading and storing one page, labelled with the chapter.
+* "download": downloading every page of a chapter.
+* "encode": decoding and transcoding a chapter's pages.
+* "assemble": writing a chapter's PDF or CBZ, including "encode".
+
+Counters are kept for requests per host and status, bytes per host and pages
+found in the page store. Spans can be appended to a JSONL trace file, one
+JSON object per line, and both spans and counters are exported in the
+Prometheus text format on a local HTTP endpoint. `summary` turns a trace file
+into per-span latency percentiles.
+"""
+
+import atexit
+import contextlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+RESERVOIR = 10000
+QUANTILES = (0.5, 0.95, 0.99)
+
+_recorder = None
+_null = contextlib.nullcontext()
+
+
+def percentile(values, q):
+    """Returns the nearest-rank percentile of sorted values.
+
+    Args:
+        values (List(float)): Sorted values.
+        q (float): Percentile as a fraction, e.g. 0.95.
+    """
+
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, int(q * len(values) + 0.999999) - 1))
+    return values[rank]
+
+
+def _number(value):
+    """Formats a sample value without rounding it"""
+
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in sorted(labels.items())
+    )
+    return "{" + pairs + "}"
+
+
+class Recorder:
+    """Collects spans and counters and exports them"""
+
+    def __init__(self, trace_path=None):
+        """
+        Args:
+            trace_path (pathlib.Path): Optional; JSONL file spans are appended
+                to. Default is not to write a trace.
+        """
+
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: deque(maxlen=RESERVOIR))
+        self._totals = defaultdict(lambda: [0, 0.0])
+        self._counters = defaultdict(float)
+        self._trace = open(trace_path, "a") if trace_path else None
+        self._server = None
+
+    def record(self, name, seconds, **labels):
+        """Records a finished span.
+
+        Args:
+            name (str): Name of the span.
+            seconds (float): Duration of the span.
+            **labels: Optional; Labels of the span. Only "host" is kept in the
+                Prometheus export; every label is written to the trace.
+        """
+
+        key = (name, labels.get("host"))
+        line = None
+        if self._trace is not None:
+            line = json.dumps(
+                {"ts": round(time.time(), 6), "span": name, "ms": seconds * 1000, **labels},
+                default=str,
+            )
+        with self._lock:
+            self._durations[key].append(seconds)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += seconds
+            if line is not None and self._trace is not None:
+                self._trace.write(line + "\n")
+
+    def count(self, name, value=1, **labels):
+        """Adds to a counter"""
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def prometheus(self):
+        """Returns every metric in the Prometheus text format"""
+
+        lines = []
+        with self._lock:
+            spans = {
+                key: (sorted(values), self._totals[key])
+                for key, values in self._durations.items()
+            }
+            counters = dict(self._counters)
+
+        metric = "manga_manager_span_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for (name, host), (values, (count, total)) in sorted(
+            spans.items(), key=lambda item: (item[0][0], item[0][1] or "")
+        ):
+            labels = {"span": name}
+            if host:
+                labels["host"] = host
+            for q in QUANTILES:
+                value = percentile(values, q)
+                lines.append(f"{metric}{_labels({**labels, 'quantile': q})} {value}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"manga_manager_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(dict(labels))} {_number(value)}")
+
+        from manga_manager.provider.ratelimit import shared_limiter
+
+        hosts = shared_limiter().metrics()
+        if hosts:
+            lines.append("# TYPE manga_manager_host_rate gauge")
+            lines.append("# TYPE manga_manager_host_paused gauge")
+        for host, state in sorted(hosts.items()):
+            labels = _labels({"host": host})
+            lines.append(f"manga_manager_host_rate{labels} {state['rate']}")
+            paused = int(state["state"] != "closed")
+            lines.append(f"manga_manager_host_paused{labels} {paused}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=0, host="127.0.0.1"):
+        """Serves the Prometheus metrics at /metrics on a background thread.
+
+        Args:
+            port (int): Optional; Port to listen on. Default is any free port.
+            host (str): Optional; Address to listen on. Default is 127.0.0.1.
+
+        Returns:
+            port (int): Port the endpoint listens on.
+        """
+
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_port
+
+    def close(self):
+        """Stops the endpoint and closes the trace file"""
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+
+def enable(trace_path=None, port=None):
+    """Turns instrumentation on for the rest of the process.
+
+    Args:
+        trace_path (pathlib.Path): Optional; JSONL file spans are appended to.
+        port (int): Optional; Port of a Prometheus endpoint to start on
+            127.0.0.1. Default is not to start one.
+
+    Returns:
+        recorder (Recorder): The active recorder.
+    """
+
+    global _recorder
+    disable()
+    atexit.register(disable)
+    recorder = Recorder(trace_path)
+    if port is not None:
+        recorder.serve(port)
+    _recorder = recorder
+    return recorder
+
+
+def disable():
+    """Turns instrumentation off and closes the active recorder"""
+
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def enabled():
+    """Returns whether instrumentation is on"""
+
+    return _recorder is not None
+
+
+@contextlib.contextmanager
+def _span(recorder, name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        labels["error"] = type(e).__name__
+        raise
+    finally:
+        recorder.record(name, time.perf_counter() - start, **labels)
+
+
+def span(name, **labels):
+    """Returns a context manager that records the time spent in it"""
+
+    recorder = _recorder
+    if recorder is None:
+        return _null
+    return _span(recorder, name, labels)
+
+
+def record(name, seconds, **labels):
+    """Records a span that was timed elsewhere"""
+
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(name, seconds, **labels)
+
+
+def count(name, value=1, **labels):
+    """Adds to a counter"""
+
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, value, **labels)
+
+
+def timed(iterable, name, **labels):
+    """Yields from an iterable, recording the time spent waiting for items"""
+
+    if _recorder is None:
+        yield from iterable
+        return
+    waited = 0.0
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            waited += time.perf_counter() - start
+        yield item
+    record(name, waited, **labels)
+
+
+def summary(trace_path):
+    """Summarizes the spans of a JSONL trace file.
+
+    Args:
+        trace_path (pathlib.Path): Trace written by `Recorder`.
+
+    Returns:
+        rows (List(Dict)): One row per span name and host, with "span",
+            "host", "count", "p50_ms", "p95_ms" and "total_s" keys, sorted by
+            span name and host.
+    """
+
+    durations = defaultdict(list)
+    with open(trace_path) as file:
+        for line in file:
+            try:
+                event = json.loads(line)
+                key = (event["span"], event.get("host") or "")
+                durations[key].append(float(event["ms"]))
+            except (ValueError, KeyError, TypeError):
+                continue
+    rows = []
+    for (name, host), values in sorted(durations.items()):
+        values.sort()
+        rows.append(
+            {
+                "span": name,
+                "host": host,
+                "count": len(values),
+                "p50_ms": percentile(values, 0.5),
+                "p95_ms": percentile(values, 0.95),
+                "total_s": sum(values) / 1000,
+            }
+        )
+    return rows
@@ -0,0 +1,264 @@
+"""Incremental PDF writer for manga chapters.
+
+Pages are written to the output file as soon as they are added, so a chapter
+never has to be held in memory as a list of decoded images. JPEG panels are
+embedded as-is (DCTDecode) without being decoded or re-encoded; every other
+image format, and every page of a manga with post-processing options, is
+converted to a JPEG first, in a pool of worker processes when going through
+`encoded_pages`.
+"""
+
+import io
+import re
+
+from PIL import Image
+
+from manga_manager import imaging
+
+PASSTHROUGH_MODES = {"RGB": b"/DeviceRGB", "L": b"/DeviceGray"}
+IMAGE_STREAM = re.compile(
+    rb"/Subtype /Image [^>]*/Filter /DCTDecode /Length (\d+) >>\nstream\n"
+)
+
+
+def jpeg_info(data):
+    """Returns the size and colorspace of a JPEG that can be embedded as-is.
+
+    Only the image header is parsed.
+
+    Args:
+        data (bytes): Image file contents.
+
+    Returns:
+        info (Tuple): (width, height, colorspace), or None if the image must
+            be transcoded with `page_image`.
+    """
+
+    im = Image.open(io.BytesIO(data))
+    if im.format == "JPEG" and im.mode in PASSTHROUGH_MODES:
+        return im.width, im.height, PASSTHROUGH_MODES[im.mode]
+    return None
+
+
+def _jpeg_options(options):
+    """Returns the post-processing options of PDF pages, or None if pages are kept.
+
+    PDFs only embed JPEGs, so the "image_format" option is ignored.
+    """
+
+    if not options:
+        return None
+    options = {key: options.get(key) for key in imaging.OPTIONS}
+    options["image_format"] = "jpeg"
+    return options if imaging.active(options) else None
+
+
+def page_image(data, options=None):
+    """Prepares raw image bytes for embedding in a PDF page.
+
+    Args:
+        data (bytes): Image file contents.
+        options (Dict): Optional; Post-processing options for
+            `manga_manager.imaging.postprocess`. The page is always encoded as
+            a JPEG, whatever its "image_format".
+
+    Returns:
+        jpeg (bytes): JPEG data for the page.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+        colorspace (bytes): PDF colorspace name of the JPEG data.
+    """
+
+    options = _jpeg_options(options)
+    if options is not None:
+        data = imaging.postprocess(data, **options)
+
+    info = jpeg_info(data)
+    if info is not None:
+        return (data,) + info
+
+    im = Image.open(io.BytesIO(data))
+    if im.mode not in PASSTHROUGH_MODES:
+        im = im.convert("RGB")
+    buffer = io.BytesIO()
+    im.save(buffer, format="JPEG", quality=100)
+    return buffer.getvalue(), im.width, im.height, PASSTHROUGH_MODES[im.mode]
+
+
+def page_image_file(path, options=None):
+    """`page_image` for an image file, run in encoder processes"""
+
+    with open(path, "rb") as file:
+        return page_image(file.read(), options)
+
+
+def encoded_pages(paths, processes=None, options=None):
+    """Yields `page_image` results for image files, in order.
+
+    JPEGs that can be embedded as-is are read on the calling thread; every
+    other page, and every page when post-processing `options` apply, is
+    transcoded by `manga_manager.imaging.encoder_pool`, a few pages ahead of
+    the page being yielded. Only file paths are sent to the worker processes.
+
+    Args:
+        paths (Iterable(pathlib.Path)): Image files of the pages.
+        processes (int): Optional; Number of encoder processes. 0 transcodes
+            on the calling thread. Default is the number of CPUs.
+        options (Dict): Optional; Post-processing options of the pages.
+
+    Yields:
+        page (Tuple): (jpeg, width, height, colorspace) of each page.
+    """
+
+    if processes is None:
+        processes = imaging.cpu_count()
+    options = _jpeg_options(options)
+    process = options is not None
+
+    def pages():
+        for path in paths:
+            info = None
+            if not process:
+                with open(path, "rb") as file:
+                    data = file.read()
+                info = jpeg_info(data)
+            if info is not None:
+                yield (data,) + info
+            elif processes == 0:
+                yield page_image_file(path, options)
+            else:
+                pool = imaging.encoder_pool(processes)
+                yield pool.submit(page_image_file, str(path), options)
+
+    return imaging.pipelined(pages(), processes)
+
+
+def page_images(data):
+    """Locates the page images of a PDF written by `PdfWriter`.
+
+    Args:
+        data (bytes): Contents of the PDF, or a memory map of it.
+
+    Returns:
+        images (List(Tuple)): (offset, length) of each page's JPEG data, in
+            page order.
+    """
+
+    return [(m.end(), int(m.group(1))) for m in IMAGE_STREAM.finditer(data)]
+
+
+class PdfWriter:
+    """Writes a PDF to a binary file object one page at a time.
+
+    Each page holds a single full-page image. Pages are flushed to the file as
+    they are added; only the object offsets are kept in memory until `close`
+    writes the page tree and cross-reference table.
+    """
+
+    CATALOG = 1
+    PAGES = 2
+
+    def __init__(self, file):
+        """
+        Args:
+            file (BinaryIO): Writable binary file object for the PDF.
+        """
+
+        self._file = file
+        self._offsets = {}
+        self._pages = []
+        self._next_id = 3
+        self._position = 0
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    @property
+    def page_count(self):
+        """Number of pages written so far"""
+
+        return len(self._pages)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def _object(self, body, stream=None, object_id=None):
+        """Writes an indirect object and returns its id"""
+
+        if object_id is None:
+            object_id = self._next_id
+            self._next_id += 1
+        self._offsets[object_id] = self._position
+        self._write(b"%d 0 obj\n" % object_id + body)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+        return object_id
+
+    def add_page(self, data):
+        """Appends a page holding a single image.
+
+        Args:
+            data (bytes): Image file contents.
+        """
+
+        self.add_jpeg(*page_image(data))
+
+    def add_jpeg(self, jpeg, width, height, colorspace=b"/DeviceRGB"):
+        """Appends a page holding a JPEG image without decoding it.
+
+        Args:
+            jpeg (bytes): JPEG data.
+            width (int): Image width in pixels.
+            height (int): Image height in pixels.
+            colorspace (bytes): Optional; PDF colorspace of the JPEG. Default
+                is /DeviceRGB.
+        """
+
+        image = self._object(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace %s /BitsPerComponent 8 /Filter /DCTDecode /Length %d >>"
+            % (width, height, colorspace, len(jpeg)),
+            stream=jpeg,
+        )
+        # one pixel per point, matching PIL's default 72 dpi PDF output
+        content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (width, height)
+        contents = self._object(b"<< /Length %d >>" % len(content), stream=content)
+        page = self._object(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+            % (self.PAGES, width, height, image, contents)
+        )
+        self._pages.append(page)
+
+    def close(self):
+        """Writes the page tree, cross-reference table and trailer"""
+
+        if not self._pages:
+            raise ValueError("Cannot write a PDF without pages")
+        kids = b" ".join(b"%d 0 R" % page for page in self._pages)
+        self._object(
+            b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)),
+            object_id=self.PAGES,
+        )
+        self._object(
+            b"<< /Type /Catalog /Pages %d 0 R >>" % self.PAGES, object_id=self.CATALOG
+        )
+
+        xref = self._position
+        size = self._next_id
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for object_id in range(1, size):
+            self._write(b"%010d 00000 n \n" % self._offsets[object_id])
+        self._write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (size, self.CATALOG, xref)
+        )
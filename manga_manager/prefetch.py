@@ -0,0 +1,253 @@
+"""Background read-ahead for `read_manga`.
+
+The `Prefetcher` downloads chapters around the one being read on background
+threads. It learns how long the user spends on a chapter, which direction
+they are reading in and how long a chapter takes to download, and sizes its
+window so the next chapter is normally on disk before the user asks for it.
+"""
+
+import math
+import threading
+import time
+
+
+class Prefetcher:
+    """Downloads the chapters a reader is likely to open next"""
+
+    def __init__(
+        self,
+        provider,
+        manga,
+        on_download=None,
+        download_options=None,
+        window=2,
+        min_window=1,
+        max_window=8,
+        workers=2,
+        smoothing=0.3,
+    ):
+        """
+        Args:
+            provider (Provider): Provider the manga is downloaded from.
+            manga (Dict): Config of the manga being read.
+            on_download (func): Optional; Called with the {chapter_name: path}
+                dict returned by every finished download, after the chapter's
+                path has been recorded in `manga`.
+            download_options (Dict): Optional; Extra keyword arguments for
+                `provider.download`, such as the manga's output format.
+            window (int): Optional; Initial number of chapters fetched ahead.
+                Default is 2.
+            min_window (int): Optional; Smallest window. Default is 1.
+            max_window (int): Optional; Largest window. Default is 8.
+            workers (int): Optional; Number of chapters downloaded at once.
+                Default is 2.
+            smoothing (float): Optional; Weight of the newest sample in the
+                moving averages of reading and download times. Default is 0.3.
+        """
+
+        self.provider = provider
+        self.manga = manga
+        self.on_download = on_download
+        self.download_options = download_options or {}
+        self.window = window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.workers = workers
+        self.smoothing = smoothing
+
+        self.read_time = None
+        self.download_time = None
+        self.direction = 1.0
+        self._current = None
+        self._visited_at = None
+
+        self._cond = threading.Condition()
+        self._wanted = {}
+        self._in_flight = set()
+        self._failed = set()
+        self._stopped = False
+        self._threads = []
+
+    def start(self):
+        """Starts the download threads"""
+
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stops the download threads without waiting for them.
+
+        Queued chapters are dropped. Downloads that are already running finish
+        in the background and are still recorded, and their threads exit
+        afterwards; they are daemon threads, so they never keep the process
+        alive.
+        """
+
+        with self._cond:
+            self._stopped = True
+            self._wanted.clear()
+            self._cond.notify_all()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _average(self, average, sample):
+        if average is None:
+            return sample
+        return (1 - self.smoothing) * average + self.smoothing * sample
+
+    def _downloaded(self, index):
+        return self.manga["chapters"][index]["path"] != ""
+
+    def visit(self, index):
+        """Tells the prefetcher which chapter the user just opened.
+
+        Updates the reading time, direction and window estimates, queues the
+        chapters the user is likely to read next and cancels queued downloads
+        that fell out of the window.
+
+        Args:
+            index (int): Index of the opened chapter.
+        """
+
+        now = time.monotonic()
+        with self._cond:
+            if self._current is not None and index != self._current:
+                step = 1 if index > self._current else -1
+                self.direction = self._average(self.direction, step)
+                self.read_time = self._average(self.read_time, now - self._visited_at)
+            self._current, self._visited_at = index, now
+            self._resize()
+            self._wanted = self._plan(index)
+            self._cond.notify_all()
+
+    def _resize(self):
+        """Fits the window to the ratio of download time to reading time"""
+
+        if self.read_time and self.download_time:
+            # enough chapters in flight to finish one per chapter read, plus one spare
+            needed = math.ceil(self.download_time / max(self.read_time, 1e-3)) + 1
+            self.window = max(self.min_window, min(self.max_window, needed))
+
+    def _plan(self, index):
+        """Returns {chapter_index: priority} for the chapters to prefetch"""
+
+        count = len(self.manga["chapters"])
+        forward = 1 if self.direction >= 0 else -1
+        wanted = {}
+        for distance in range(1, self.window + 1):
+            ahead = index + forward * distance
+            if 0 <= ahead < count:
+                wanted[ahead] = distance
+        # keep one chapter ready in the other direction, behind the main window
+        behind = index - forward
+        if 0 <= behind < count:
+            wanted.setdefault(behind, self.window + 1)
+        return wanted
+
+    @property
+    def wanted(self):
+        """Chapters queued or downloading, ordered by priority"""
+
+        with self._cond:
+            queued = sorted(self._wanted, key=self._wanted.get)
+            return [i for i in queued if not self._downloaded(i)]
+
+    def keep(self):
+        """Returns the chapter indices that should stay on disk"""
+
+        with self._cond:
+            indices = set(self._wanted) | self._in_flight
+            if self._current is not None:
+                indices.add(self._current)
+            return indices
+
+    def wait(self, index, timeout=None):
+        """Blocks until a chapter is downloaded.
+
+        A chapter that is not being downloaded yet is downloaded on the calling
+        thread instead of waiting for a free worker.
+
+        Args:
+            index (int): Index of the chapter.
+            timeout (float): Optional; Maximum number of seconds to wait for a
+                download that is already running.
+
+        Returns:
+            downloaded (bool): Whether the chapter is on disk.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._failed.discard(index)
+            fetch = not self._downloaded(index) and index not in self._in_flight
+            if fetch:
+                self._in_flight.add(index)
+        if fetch:
+            self._download(index)
+
+        with self._cond:
+            while not self._downloaded(index) and index not in self._failed:
+                if self._stopped:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._downloaded(index)
+
+    def _next(self):
+        """Returns the highest-priority chapter that still needs downloading"""
+
+        candidates = [
+            (priority, index)
+            for index, priority in self._wanted.items()
+            if index not in self._in_flight
+            and index not in self._failed
+            and not self._downloaded(index)
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                index = self._next()
+                while index is None and not self._stopped:
+                    self._cond.wait()
+                    index = self._next()
+                if self._stopped:
+                    return
+                self._in_flight.add(index)
+            self._download(index)
+
+    def _download(self, index):
+        """Downloads a chapter that was added to the in-flight set"""
+
+        chapter = self.manga["chapters"][index]
+        start = time.monotonic()
+        try:
+            paths = self.provider.download(
+                self.manga["name"], [chapter], verbose=False, **self.download_options
+            )
+        except Exception:
+            paths = {}
+        elapsed = time.monotonic() - start
+
+        with self._cond:
+            self._in_flight.discard(index)
+            if chapter["name"] in paths:
+                chapter["path"] = paths[chapter["name"]]
+                self.download_time = self._average(self.download_time, elapsed)
+            else:
+                self._failed.add(index)
+            if paths and self.on_download is not None:
+                self.on_download(paths)
+            self._resize()
+            self._cond.notify_all()
@@ -1 +1,18 @@
-from manga_manager.provider.mangakakalot import Mangakakalot
\ No newline at end of file
+"""Manga providers.
+
+Provider classes are imported the first time they are accessed, so importing
+this package does not load the HTTP and parsing libraries they depend on. See
+`manga_manager.provider.registry` for providers installed by other packages.
+"""
+
+from manga_manager.provider.registry import BUILTIN
+
+__all__ = list(BUILTIN)
+
+
+def __getattr__(name):
+    if name in BUILTIN:
+        from manga_manager.provider.registry import provider_class
+
+        return provider_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,149 @@
+"""On-disk cache for provider HTTP responses.
+
+Responses are kept in an SQLite database together with their ETag and
+Last-Modified validators so stale entries can be revalidated with a
+conditional request. The cache is bounded in bytes; when it grows past its
+limit the least recently used responses are evicted.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    kind TEXT,
+    body BLOB,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL,
+    accessed_at REAL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+CacheEntry = namedtuple("CacheEntry", ["body", "etag", "last_modified", "fetched_at"])
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_cache(path, max_bytes):
+    """Returns the process-wide cache stored at `path`, opening it if needed"""
+
+    path = Path(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path, max_bytes)
+        return _caches[path]
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of HTTP response bodies"""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            path (pathlib.Path): Path to the cache database.
+            max_bytes (int): Optional; Maximum total size of cached bodies.
+                Default is 64 MiB.
+        """
+
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._connection as connection:
+            connection.executescript(SCHEMA)
+            self._size = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    @property
+    def size(self):
+        """Total size of the cached bodies in bytes"""
+
+        return self._size
+
+    def get(self, url):
+        """Returns the cached response for a URL.
+
+        Args:
+            url (str): Requested URL.
+
+        Returns:
+            entry (CacheEntry): The cached response, or None if it is not cached.
+        """
+
+        with self._lock, self._connection as connection:
+            row = connection.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url)
+            )
+            return CacheEntry(*row)
+
+    def put(self, url, kind, body, etag=None, last_modified=None):
+        """Stores a response, evicting old responses if the cache is full.
+
+        Args:
+            url (str): Requested URL.
+            kind (str): Kind of page, used to pick the entry's time to live.
+            body (bytes): Response body.
+            etag (str): Optional; ETag header of the response.
+            last_modified (str): Optional; Last-Modified header of the response.
+        """
+
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._connection as connection:
+            old = connection.execute(
+                "SELECT size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, kind, body, etag, last_modified, now, now, len(body)),
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict(connection)
+
+    def refresh(self, url):
+        """Marks a cached response as fresh after a successful revalidation"""
+
+        now = time.time()
+        with self._lock, self._connection as connection:
+            connection.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+
+    def clear(self):
+        """Removes every cached response"""
+
+        with self._lock, self._connection as connection:
+            connection.execute("DELETE FROM responses")
+            self._size = 0
+
+    def _evict(self, connection):
+        """Deletes least recently used responses until the cache fits"""
+
+        if self._size <= self.max_bytes:
+            return
+        evicted = []
+        for url, size in connection.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at"
+        ):
+            if self._size <= self.max_bytes:
+                break
+            evicted.append((url,))
+            self._size -= size
+        connection.executemany("DELETE FROM responses WHERE url = ?", evicted)
@@ -0,0 +1,268 @@
+"""asyncio download engine for providers.
+
+A single event loop drives every chapter page and image request of a download.
+Requests are limited globally and per host, chapter pages are resolved while
+earlier chapters are still downloading images, and PDF encoding runs in a small
+thread pool so it never blocks the loop.
+
+If aiohttp is installed it is used for HTTP; otherwise requests are sent through
+the provider's pooled session on a thread pool bounded by the global limit.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from manga_manager import metrics
+from manga_manager.provider.journal import IncompleteChapterError
+from manga_manager.provider.progress import Progress
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class AsyncDownloader:
+    """Downloads chapters for a provider on one asyncio event loop"""
+
+    def __init__(
+        self,
+        provider,
+        max_connections=20,
+        per_host=8,
+        max_chapters=10,
+        encode_workers=2,
+        output_format=None,
+        image_options=None,
+    ):
+        """
+        Args:
+            provider (Provider): Provider the chapters belong to.
+            max_connections (int): Optional; Maximum number of requests in
+                flight at once. Default is 20.
+            per_host (int): Optional; Maximum number of requests in flight to a
+                single host. Default is 8.
+            max_chapters (int): Optional; Maximum number of chapters downloading
+                images at once. Default is 10.
+            encode_workers (int): Optional; Number of threads used for PDF
+                encoding. Default is 2.
+            output_format (str): Optional; "pdf" or "cbz". Default is the
+                provider's `output_format`.
+            image_options (Dict): Optional; Page post-processing options.
+                Default is the provider's `image_options`.
+        """
+
+        self.provider = provider
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.max_chapters = max_chapters
+        self.encode_workers = encode_workers
+        self.output_format = output_format
+        self.image_options = image_options
+
+    def run(self, manga_name, chapters, verbose=True, progress=None):
+        """Runs a download to completion on a new event loop.
+
+        Args:
+            manga_name (str): Title of manga to be downloaded.
+            chapters (List(Dict)): List of chapter dicts.
+            verbose (bool): Optional; Determines if the download should be
+                loud. Default is True.
+            progress (Progress): Optional; Progress that pages and chapters are
+                reported to. A new one is created by default.
+
+        Returns:
+            paths (Dict): Dictionary of downloaded chapter paths in the form
+                {chapter_name: chapter_path}.
+        """
+
+        return asyncio.run(self.download(manga_name, chapters, verbose, progress))
+
+    async def download(self, manga_name, chapters, verbose=True, progress=None):
+        """Coroutine version of `run`"""
+
+        if progress is None:
+            progress = Progress()
+        progress.add_chapters(len(chapters))
+        self._progress = progress
+        thread, event = None, None
+        if verbose:
+            print("\n" + manga_name.upper())
+            print(len(manga_name) * "-")
+            thread, event = self.provider.downloading_animation(progress)
+
+        self._connections = asyncio.Semaphore(self.max_connections)
+        self._chapters = asyncio.Semaphore(self.max_chapters)
+        self._hosts = {}
+        self._links = {}
+        self._encoder = ThreadPoolExecutor(max_workers=self.encode_workers)
+        # journal and page store I/O, kept apart from encoding so finished
+        # downloads never wait behind chapters being assembled
+        self._storage = ThreadPoolExecutor(max_workers=self.max_connections)
+        # blocking requests: chapter pages, which go through the provider's
+        # response cache, and every request when aiohttp is missing
+        self._io = ThreadPoolExecutor(max_workers=self.max_connections)
+        self._http = None
+        if aiohttp is not None:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections, limit_per_host=self.per_host
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.provider.timeout),
+            )
+
+        paths = {}
+        try:
+            results = await asyncio.gather(
+                *[self._download_chapter(manga_name, c, paths) for c in chapters],
+                return_exceptions=True,
+            )
+            for chapter, result in zip(chapters, results):
+                if isinstance(result, Exception):
+                    progress.chapter_failed(chapter["name"], result)
+                    if verbose:
+                        print(result)
+        finally:
+            if self._http is not None:
+                await self._http.close()
+            self._io.shutdown()
+            self._storage.shutdown()
+            self._encoder.shutdown()
+            if verbose:
+                event.set()
+                thread.join()
+        return paths
+
+    def _host_limit(self, url):
+        host = urlsplit(url).hostname
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    def _link_lock(self, url):
+        """Lock that keeps a link shared by chapters from being fetched twice"""
+
+        if url not in self._links:
+            self._links[url] = asyncio.Lock()
+        return self._links[url]
+
+    async def _fetch(self, url):
+        """Fetches the body of a URL as bytes"""
+
+        # a busy host must not take global slots that other hosts could use
+        async with self._host_limit(url), self._connections:
+            if self._http is None:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(self._io, self.provider._get, url)
+                return response.content
+
+            # mirror the retry policy and rate limits of the provider's session
+            provider = self.provider
+            limiter = provider.host_limiter
+            for attempt in range(provider.max_retries + 1):
+                if provider.rate_limiter is not None:
+                    await asyncio.sleep(provider.rate_limiter.reserve())
+                if limiter is not None:
+                    await asyncio.sleep(limiter.reserve(url))
+                try:
+                    start = time.perf_counter()
+                    async with self._http.get(url) as response:
+                        first_byte = time.perf_counter()
+                        if limiter is not None:
+                            limiter.record(
+                                url, response.status, response.headers.get("Retry-After")
+                            )
+                        host = urlsplit(url).netloc
+                        metrics.count("requests", host=host, status=response.status)
+                        response.raise_for_status()
+                        body = await response.read()
+                        if metrics.enabled():
+                            end = time.perf_counter()
+                            metrics.record("request", first_byte - start, host=host)
+                            metrics.record("transfer", end - first_byte, host=host)
+                            metrics.count("bytes", len(body), host=host)
+                        return body
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = None
+                    if isinstance(e, aiohttp.ClientResponseError):
+                        status = e.status
+                    if limiter is not None and status is None:
+                        limiter.record(url)
+                    if attempt == provider.max_retries or (
+                        status is not None and status not in provider.retry_statuses
+                    ):
+                        raise
+                await asyncio.sleep(provider.backoff_factor * 2 ** attempt)
+
+    async def _download_page(self, journal, index):
+        """Fetches a page into a chapter's journal, retrying failed pages.
+
+        Pages already in the provider's page store are linked instead.
+        """
+
+        loop = asyncio.get_running_loop()
+        provider = self.provider
+        retries = provider.page_retries
+        for attempt in range(retries + 1):
+            try:
+                link_lock = self._link_lock(journal.image_links[index])
+                async with link_lock:
+                    with metrics.span("page", chapter=journal.chapter_name):
+                        size = await loop.run_in_executor(
+                            self._storage, provider._stored_page, journal, index
+                        )
+                        if size is None:
+                            data = await self._fetch(journal.image_links[index])
+                            size = await loop.run_in_executor(
+                                self._storage, provider._store_page, journal, index, data
+                            )
+                self._progress.page_done(journal.chapter_name, index, size)
+                return
+            except Exception:
+                if attempt == retries:
+                    raise
+            await asyncio.sleep(self.provider.backoff_factor * 2 ** attempt)
+
+    async def _download_chapter(self, manga_name, chapter, paths):
+        """Resolves a chapter's images and writes them to a PDF"""
+
+        loop = asyncio.get_running_loop()
+        link = chapter["link"]
+        # through `Provider.image_links`, so chapter pages use the response
+        # cache and its revalidation like the threaded engine
+        async with self._host_limit(link), self._connections:
+            image_links = await loop.run_in_executor(
+                self._io, self.provider.image_links, link
+            )
+
+        async with self._chapters:
+            journal = await loop.run_in_executor(
+                self._storage,
+                self.provider._journal,
+                manga_name,
+                chapter["name"],
+                image_links,
+            )
+            with metrics.span("download", chapter=chapter["name"]):
+                await asyncio.gather(
+                    *[self._download_page(journal, i) for i in journal.missing()],
+                    return_exceptions=True,
+                )
+            missing = journal.missing()
+            if missing:
+                raise IncompleteChapterError(chapter["name"], missing)
+            path = await loop.run_in_executor(
+                self._encoder,
+                self.provider._assemble,
+                journal,
+                manga_name,
+                chapter["name"],
+                self.output_format,
+                self.image_options,
+            )
+
+        paths[chapter["name"]] = str(path)
+        self._progress.chapter_done(chapter["name"], path)
+        return path
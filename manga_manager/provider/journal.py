@@ -0,0 +1,114 @@
+"""Resumable chapter downloads.
+
+Every chapter is downloaded into its own staging directory next to the
+finished chapters. The directory holds a manifest with the chapter's image
+links and one file per downloaded page. A page file is written under a
+temporary name and renamed once complete, so its presence records that the
+page finished. If a download is interrupted or a page fails, the next attempt
+only fetches the pages that are still missing.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+
+class IncompleteChapterError(Exception):
+    """Raised when some pages of a chapter could not be downloaded"""
+
+    def __init__(self, chapter_name, missing):
+        self.chapter_name = chapter_name
+        self.missing = missing
+        super().__init__(
+            f"{chapter_name}: {len(missing)} page(s) failed to download "
+            f"(pages {', '.join(str(i + 1) for i in missing)})"
+        )
+
+
+class ChapterJournal:
+    """Staging directory and page manifest of one chapter download"""
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory, image_links, chapter_name=None):
+        """Opens the journal in `directory`, starting over if the links changed.
+
+        Args:
+            directory (pathlib.Path): Staging directory of the chapter.
+            image_links (List(str)): Links to the chapter's images, in order.
+            chapter_name (str): Optional; Name of the chapter.
+        """
+
+        self.directory = Path(directory)
+        self.image_links = list(image_links)
+        self.chapter_name = chapter_name
+
+        manifest = self.directory / self.MANIFEST
+        if manifest.exists():
+            try:
+                links = json.loads(manifest.read_text())["links"]
+            except (ValueError, KeyError):
+                links = None
+            if links != self.image_links:
+                self.remove()
+        if not manifest.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._write(manifest, json.dumps({"links": self.image_links}).encode())
+
+    def __len__(self):
+        return len(self.image_links)
+
+    def page_path(self, index):
+        """Returns the path of a page's file"""
+
+        return self.directory / f"{index:04d}"
+
+    def _write(self, path, data):
+        partial = path.with_name(path.name + ".part")
+        with open(partial, "wb") as file:
+            file.write(data)
+        os.replace(partial, path)
+
+    def has_page(self, index):
+        """Returns whether a page has been downloaded"""
+
+        return self.page_path(index).exists()
+
+    def missing(self):
+        """Returns the indices of the pages that are not downloaded yet"""
+
+        done = {path.name for path in self.directory.iterdir()}
+        return [i for i in range(len(self)) if f"{i:04d}" not in done]
+
+    @property
+    def complete(self):
+        """Whether every page has been downloaded"""
+
+        return not self.missing()
+
+    def store(self, index, data):
+        """Records a downloaded page.
+
+        Args:
+            index (int): Index of the page in the chapter.
+            data (bytes): Contents of the page's image file.
+        """
+
+        self._write(self.page_path(index), data)
+
+    def page(self, index):
+        """Returns the contents of a downloaded page"""
+
+        return self.page_path(index).read_bytes()
+
+    def pages(self):
+        """Yields the contents of every page in order, one at a time"""
+
+        for index in range(len(self)):
+            yield self.page(index)
+
+    def remove(self):
+        """Deletes the staging directory"""
+
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,61 +1,29 @@
+import itertools
 import re
-from concurrent.futures import ThreadPoolExecutor
-from pathlib import Path
 
 import requests
-from bs4 import BeautifulSoup
 
+from manga_manager.provider.parsing import parse
 from manga_manager.provider.provider import Provider
-from manga_manager.util import chapter_filename, clean_text
+from manga_manager.util import clean_text
 
 
 class Mangakakalot(Provider):
     name = "Mangakakalot"
+    base_url = "https://ww.mangakakalot.tv"
 
-    def download(self, manga_name, chapters, verbose=True):
-        thread, event = None, None
-        if verbose:
-            print("\n" + manga_name.upper())
-            print(len(manga_name) * "-")
-            thread, event = self.downloading_animation(
-                [chapter_filename(chapter["name"]) for chapter in chapters],
-                Path(__file__).parent.parent / "manga" / manga_name,
-                len(chapters),
-            )
-
-        paths = {}
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            for chapter in chapters:
-                try:
-                    response = requests.get(chapter["link"])
-                    soup = BeautifulSoup(response.text, "html.parser")
-                    image_links = [
-                        image["data-src"] for image in soup.select("img.img-loading")
-                    ]
-
-                    executor.submit(
-                        self.manga2pdf,
-                        image_links,
-                        manga_name,
-                        chapter["name"],
-                        paths=paths,
-                    )
-                except Exception as e:
-                    if verbose:
-                        print(e)
-                    pass
-        if verbose:
-            event.set()
-            thread.join()
-        return paths
+    def parse_image_links(self, html):
+        soup = parse(html, "img", class_="img-loading")
+        return [image["data-src"] for image in soup.select("img.img-loading")]
 
     def search(self, search_query, page=1):
-        response = requests.get(
+        html = self._get_text(
             requests.utils.requote_uri(
-                f"https://ww.mangakakalot.tv/search/{search_query}?page={page}"
-            )
+                f"{self.base_url}/search/{search_query}?page={page}"
+            ),
+            "search",
         )
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = parse(html, "div", class_=["story_item", "group_page"])
         results = soup.select("div.story_item")
         titles = [result.select_one("h3.story_name > a") for result in results]
         info = [result.select("span") for result in results]
@@ -65,9 +33,7 @@ class Mangakakalot(Provider):
             re.sub(
                 "[^0-9]",
                 "",
-                soup.select_one(
-                    "body > div.container > div.main-wrapper > div.leftCol > div.panel_page_number > div.group_page > a.page_blue.page_last"
-                ).text,
+                soup.select_one("div.group_page > a.page_blue.page_last").text,
             )
         )
 
@@ -75,7 +41,7 @@ class Mangakakalot(Provider):
             [
                 {
                     "title": clean_text(titles[i].text),
-                    "link": f"https://ww.mangakakalot.tv{titles[i]['href']}",
+                    "link": f"{self.base_url}{titles[i]['href']}",
                     "authors": authors[i],
                     "updates": updates[i],
                 }
@@ -84,11 +50,21 @@ class Mangakakalot(Provider):
             pages,
         )
 
+    def _chapters_newest_first(self, manga_link):
+        html = self._get_text(manga_link, "chapter_list")
+        soup = parse(html, "div", class_="row")
+
+        for chapter in soup.select("div.row > span > a"):
+            yield [clean_text(chapter.text), f"{self.base_url}{chapter['href']}"]
+
     def chapter_list(self, manga_link):
-        response = requests.get(manga_link)
-        soup = BeautifulSoup(response.text, "html.parser")
+        return list(self._chapters_newest_first(manga_link))[::-1]
 
-        return [
-            [clean_text(chapter.text), f"https://ww.mangakakalot.tv{chapter['href']}"]
-            for chapter in soup.select("div.row > span > a")
-        ][::-1]
+    def new_chapters(self, manga_link, known_links):
+        # the chapter list is sorted newest first, so everything after the
+        # first known chapter is known as well
+        chapters = itertools.takewhile(
+            lambda chapter: chapter[1] not in known_links,
+            self._chapters_newest_first(manga_link),
+        )
+        return list(chapters)[::-1]
@@ -0,0 +1,271 @@
+"""Content-addressed store of downloaded page images.
+
+Every downloaded image is kept once under the SHA-256 of its contents, no
+matter how many chapters or series use it, and the URLs it was downloaded from
+point at that object. Credit pages, scanlator banners and ads that come back
+in every chapter are then only downloaded and stored once. Each assembled
+chapter keeps a manifest of its pages' digests, so it can be written again in
+another format without downloading anything.
+
+The objects are files under `objects/` and the URL index and manifests live in
+an SQLite database next to them. The store is bounded in bytes; when it grows
+past its limit the least recently used objects are deleted, and manifests that
+referenced them can no longer be re-packaged.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS objects_accessed ON objects (accessed_at);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_digest ON urls (digest);
+CREATE TABLE IF NOT EXISTS manifests (
+    manga TEXT NOT NULL,
+    chapter TEXT NOT NULL,
+    digests TEXT,
+    PRIMARY KEY (manga, chapter)
+);
+"""
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def shared_store(directory, max_bytes):
+    """Returns the process-wide page store in `directory`, opening it if needed"""
+
+    directory = Path(directory)
+    with _stores_lock:
+        if directory not in _stores:
+            _stores[directory] = PageStore(directory, max_bytes)
+        return _stores[directory]
+
+
+class PageStore:
+    """Size-bounded, deduplicated store of page images"""
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024):
+        """
+        Args:
+            directory (pathlib.Path): Directory the store is kept in.
+            max_bytes (int): Optional; Maximum total size of the stored
+                images. Default is 1 GiB.
+        """
+
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._accessed = {}
+        self._connection = sqlite3.connect(
+            str(self.directory / "pages.db"), check_same_thread=False
+        )
+        with self._connection as connection:
+            connection.executescript(SCHEMA)
+            self._size = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM objects"
+            ).fetchone()[0]
+
+    @property
+    def size(self):
+        """Total size of the stored images in bytes"""
+
+        return self._size
+
+    def object_path(self, digest):
+        """Returns the path of the file holding an image"""
+
+        return self.directory / "objects" / digest[:2] / digest
+
+    def lookup(self, url):
+        """Returns the digest of the image downloaded from a URL.
+
+        The lookup only reads the index. The image's access time is updated
+        with the store's next write, so lookups never wait for a commit.
+
+        Args:
+            url (str): Link to the image.
+
+        Returns:
+            digest (str): SHA-256 of the image, or None if it is not stored.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[row[0]] = time.time()
+            return row[0]
+
+    def _write_accessed(self, connection):
+        """Writes the access times of the images looked up since the last write"""
+
+        accessed = [(at, digest) for digest, at in self._accessed.items()]
+        self._accessed.clear()
+        connection.executemany(
+            "UPDATE objects SET accessed_at = ? WHERE digest = ?", accessed
+        )
+
+    def put(self, data, url=None):
+        """Stores an image, evicting old images if the store is full.
+
+        Args:
+            data (bytes): Contents of the image file.
+            url (str): Optional; Link the image was downloaded from.
+
+        Returns:
+            digest (str): SHA-256 of the image.
+        """
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        # the file is written without the lock; only moving it into place
+        # and recording it are serialized
+        partial = None if path.exists() else self._write_partial(path, data)
+        with self._lock:
+            if partial is None and not path.exists():
+                # evicted since the check above
+                partial = self._write_partial(path, data)
+            if partial is not None:
+                os.replace(partial, path)
+            with self._connection as connection:
+                self._write_accessed(connection)
+                old = connection.execute(
+                    "SELECT size FROM objects WHERE digest = ?", (digest,)
+                ).fetchone()
+                connection.execute(
+                    "INSERT OR REPLACE INTO objects VALUES (?, ?, ?)",
+                    (digest, len(data), time.time()),
+                )
+                if url is not None:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO urls VALUES (?, ?)", (url, digest)
+                    )
+                if old is None:
+                    self._size += len(data)
+                    self._evict(connection, protected=digest)
+        return digest
+
+    def _write_partial(self, path, data):
+        """Writes an image next to its object path and returns the temporary file"""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        with open(partial, "wb") as file:
+            file.write(data)
+        return partial
+
+    def link(self, digest, path):
+        """Places a stored image at `path`.
+
+        The image is hard-linked where the file system allows it and copied
+        otherwise. `path` is replaced atomically.
+
+        Raises:
+            FileNotFoundError: The image has been evicted.
+        """
+
+        path = Path(path)
+        partial = path.with_name(path.name + ".part")
+        if partial.exists():
+            os.remove(partial)
+        try:
+            os.link(self.object_path(digest), partial)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(self.object_path(digest), partial)
+        os.replace(partial, path)
+
+    def set_manifest(self, manga, chapter, digests):
+        """Records the pages of an assembled chapter.
+
+        Args:
+            manga (str): Directory name of the manga.
+            chapter (str): Name of the chapter.
+            digests (List(str)): Digests of the chapter's images, in order.
+        """
+
+        with self._lock, self._connection as connection:
+            self._write_accessed(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO manifests VALUES (?, ?, ?)",
+                (manga, chapter, json.dumps(list(digests))),
+            )
+
+    def manifest(self, manga, chapter):
+        """Returns the image paths of a chapter's pages.
+
+        Returns:
+            paths (List(pathlib.Path)): Paths of the chapter's images, in
+                order, or None if the chapter has no manifest or some of its
+                images have been evicted.
+        """
+
+        with self._lock, self._connection as connection:
+            row = connection.execute(
+                "SELECT digests FROM manifests WHERE manga = ? AND chapter = ?",
+                (manga, chapter),
+            ).fetchone()
+            if row is None:
+                return None
+            digests = json.loads(row[0])
+            unique = set(digests)
+            marks = ",".join("?" * len(unique))
+            stored = connection.execute(
+                f"SELECT COUNT(*) FROM objects WHERE digest IN ({marks})",
+                tuple(unique),
+            ).fetchone()[0]
+            if stored != len(unique):
+                return None
+            connection.execute(
+                f"UPDATE objects SET accessed_at = ? WHERE digest IN ({marks})",
+                (time.time(), *unique),
+            )
+        return [self.object_path(digest) for digest in digests]
+
+    def remove_manifests(self, manga):
+        """Forgets the manifests of every chapter of a manga"""
+
+        with self._lock, self._connection as connection:
+            connection.execute("DELETE FROM manifests WHERE manga = ?", (manga,))
+
+    def _evict(self, connection, protected=None):
+        """Deletes least recently used images until the store fits"""
+
+        if self._size <= self.max_bytes:
+            return
+        evicted = []
+        for digest, size in connection.execute(
+            "SELECT digest, size FROM objects ORDER BY accessed_at"
+        ):
+            if self._size <= self.max_bytes:
+                break
+            if digest == protected:
+                continue
+            evicted.append((digest,))
+            self._size -= size
+        connection.executemany("DELETE FROM objects WHERE digest = ?", evicted)
+        connection.executemany("DELETE FROM urls WHERE digest = ?", evicted)
+        for (digest,) in evicted:
+            try:
+                os.remove(self.object_path(digest))
+            except FileNotFoundError:
+                pass
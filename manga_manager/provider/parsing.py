@@ -0,0 +1,136 @@
+"""HTML parsing backends for providers.
+
+Providers parse pages with `parse` and query them with CSS selectors through a
+small common interface: `select` and `select_one` on documents and nodes,
+`node.text`, `node.get(attribute)` and `node[attribute]`.
+
+Three backends are supported, fastest first:
+
+* "selectolax": the Lexbor parser from the selectolax package.
+* "lxml": lxml.html with selectors compiled by cssselect.
+* "html.parser": BeautifulSoup with Python's built-in parser. Always available.
+
+The fastest installed backend is used by default. The BeautifulSoup backend
+only builds the part of the page matching the SoupStrainer arguments given to
+`parse`; the C backends parse the whole page, which is cheaper than filtering
+it in Python.
+"""
+
+import functools
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover
+    LexborHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:  # pragma: no cover
+    lxml = None
+
+
+def available_parsers():
+    """Returns the names of the installed parser backends, fastest first"""
+
+    parsers = []
+    if LexborHTMLParser is not None:
+        parsers.append("selectolax")
+    if lxml is not None:
+        parsers.append("lxml")
+    parsers.append("html.parser")
+    return parsers
+
+
+PARSER = available_parsers()[0]
+
+
+class _LexborNode:
+    """selectolax node with the BeautifulSoup-style interface"""
+
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def text(self):
+        return self._node.text()
+
+    def get(self, attribute, default=None):
+        value = self._node.attributes.get(attribute, default)
+        return default if value is None else value
+
+    def __getitem__(self, attribute):
+        value = self.get(attribute)
+        if value is None:
+            raise KeyError(attribute)
+        return value
+
+    def select(self, selector):
+        return [_LexborNode(node) for node in self._node.css(selector)]
+
+    def select_one(self, selector):
+        node = self._node.css_first(selector)
+        return None if node is None else _LexborNode(node)
+
+
+@functools.lru_cache(maxsize=None)
+def _css_selector(selector):
+    return CSSSelector(selector)
+
+
+class _LxmlNode:
+    """lxml element with the BeautifulSoup-style interface"""
+
+    __slots__ = ("_element",)
+
+    def __init__(self, element):
+        self._element = element
+
+    @property
+    def text(self):
+        return self._element.text_content()
+
+    def get(self, attribute, default=None):
+        return self._element.get(attribute, default)
+
+    def __getitem__(self, attribute):
+        return self._element.attrib[attribute]
+
+    def select(self, selector):
+        return [_LxmlNode(element) for element in _css_selector(selector)(self._element)]
+
+    def select_one(self, selector):
+        for element in _css_selector(selector)(self._element):
+            return _LxmlNode(element)
+        return None
+
+
+def parse(html, *strainer_args, parser=None, **strainer_kwargs):
+    """Parses a page.
+
+    Args:
+        html (str): Page to parse.
+        *strainer_args: Optional; Arguments for a `bs4.SoupStrainer` matching
+            the elements the caller needs. Only the "html.parser" backend uses
+            them to skip the rest of the page.
+        parser (str): Optional; Parser backend. Default is `PARSER`.
+        **strainer_kwargs: Optional; Keyword arguments for the `bs4.SoupStrainer`.
+
+    Returns:
+        document: The parsed page, supporting `select` and `select_one`.
+    """
+
+    parser = parser or PARSER
+    if parser == "selectolax":
+        return _LexborNode(LexborHTMLParser(html).root)
+    if parser == "lxml":
+        return _LxmlNode(lxml.html.document_fromstring(html))
+
+    parse_only = None
+    if strainer_args or strainer_kwargs:
+        parse_only = SoupStrainer(*strainer_args, **strainer_kwargs)
+    return BeautifulSoup(html, "html.parser", parse_only=parse_only)
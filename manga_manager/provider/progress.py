@@ -0,0 +1,114 @@
+"""Download progress reporting.
+
+Download workers push page and chapter events into a `Progress` object. It
+keeps in-memory counters that the downloading animation and any other UI can
+read at any time, and forwards every event to subscribed observers.
+"""
+
+import threading
+
+
+class Progress:
+    """Thread-safe download counters with observer callbacks"""
+
+    def __init__(self, chapters_total=0):
+        """
+        Args:
+            chapters_total (int): Optional; Number of chapters that will be
+                downloaded. Default is 0.
+        """
+
+        self.chapters_total = chapters_total
+        self.chapters = 0
+        self.failed = 0
+        self.pages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._observers = []
+
+    def subscribe(self, callback):
+        """Registers an observer.
+
+        Args:
+            callback (func): Called as `callback(event, progress, **details)`
+                for every event, where event is "page", "chapter" or "failed".
+                Callbacks run on the download thread that caused the event and
+                should return quickly.
+        """
+
+        with self._lock:
+            self._observers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Removes an observer registered with `subscribe`"""
+
+        with self._lock:
+            self._observers.remove(callback)
+
+    def _emit(self, event, **details):
+        with self._lock:
+            observers = list(self._observers)
+        for callback in observers:
+            callback(event, self, **details)
+
+    def add_chapters(self, count):
+        """Adds chapters to the number of chapters that will be downloaded"""
+
+        with self._lock:
+            self.chapters_total += count
+
+    def page_done(self, chapter_name, index, size):
+        """Records a downloaded page.
+
+        Args:
+            chapter_name (str): Name of the page's chapter.
+            index (int): Index of the page in the chapter.
+            size (int): Size of the page in bytes.
+        """
+
+        with self._lock:
+            self.pages += 1
+            self.bytes += size
+        self._emit("page", chapter_name=chapter_name, index=index, size=size)
+
+    def chapter_done(self, chapter_name, path):
+        """Records a finished chapter.
+
+        Args:
+            chapter_name (str): Name of the chapter.
+            path (pathlib.Path): Path the chapter was saved to.
+        """
+
+        with self._lock:
+            self.chapters += 1
+        self._emit("chapter", chapter_name=chapter_name, path=path)
+
+    def chapter_failed(self, chapter_name, error):
+        """Records a chapter that could not be downloaded.
+
+        Args:
+            chapter_name (str): Name of the chapter.
+            error (Exception): Why the download failed.
+        """
+
+        with self._lock:
+            self.failed += 1
+        self._emit("failed", chapter_name=chapter_name, error=error)
+
+    @property
+    def finished(self):
+        """Number of chapters that are done, successfully or not"""
+
+        return self.chapters + self.failed
+
+    def snapshot(self):
+        """Returns the current counters as a dict"""
+
+        with self._lock:
+            return {
+                "chapters_total": self.chapters_total,
+                "chapters": self.chapters,
+                "failed": self.failed,
+                "pages": self.pages,
+                "bytes": self.bytes,
+            }
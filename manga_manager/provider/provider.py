@@ -1,51 +1,292 @@
 import itertools
 import os
+import queue
 import sys
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from manga_manager.util import chapter_filename
+from manga_manager import metrics
+from manga_manager.cbz import CbzWriter
+from manga_manager.imaging import processed_pages
+from manga_manager.pdf import PdfWriter, encoded_pages
+from manga_manager.provider.cache import shared_cache
+from manga_manager.provider.journal import ChapterJournal, IncompleteChapterError
+from manga_manager.provider.pages import shared_store
+from manga_manager.provider.progress import Progress
+from manga_manager.provider.ratelimit import shared_limiter
+from manga_manager.util import chapter_filename, library_dir
+
+WRITERS = {"pdf": PdfWriter, "cbz": CbzWriter}
+
+
+class _LibraryPath:
+    """Default path under the library directory, resolved when it is read.
+
+    Subclasses and instances override it by assigning a path.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return library_dir() / self.name
 
 
 class Provider:
     """Interface and superclass for an online manga provider"""
 
     name = "Provider"
+    pool_size = 20
+    max_retries = 3
+    retry_statuses = (500, 502, 504)
+    backoff_factor = 0.5
+    timeout = 30
+    engine = "threads"
+    output_format = "pdf"
+    page_retries = 2
+    encode_processes = None
+    image_options = None
+    rate_limiter = None
+    host_limiter = shared_limiter()
+    download_dir = _LibraryPath("manga")
+    cache_path = _LibraryPath("cache.db")
+    cache_size = 64 * 1024 * 1024
+    page_store_size = 1024 * 1024 * 1024
+    cache_ttls = {
+        "search": 60 * 60,
+        "chapter_list": 10 * 60,
+        "chapter": 7 * 24 * 60 * 60,
+    }
+
+    def __init__(
+        self,
+        pool_size=None,
+        max_retries=None,
+        backoff_factor=None,
+        engine=None,
+        output_format=None,
+        image_options=None,
+    ):
+        """
+        Args:
+            pool_size (int): Optional; Maximum number of pooled connections kept
+                open per host. Default is `Provider.pool_size`.
+            max_retries (int): Optional; Number of times a failed request is
+                retried. Default is `Provider.max_retries`.
+            backoff_factor (float): Optional; Backoff factor between retries, in
+                seconds. Default is `Provider.backoff_factor`.
+            engine (str): Optional; Download engine, "threads" or "asyncio".
+                Default is `Provider.engine`.
+            output_format (str): Optional; File format of downloaded chapters,
+                "pdf" or "cbz". Default is `Provider.output_format`.
+            image_options (Dict): Optional; Post-processing options applied to
+                every page, see `manga_manager.imaging`. Default is None,
+                which keeps pages as downloaded.
+        """
+
+        if pool_size is not None:
+            self.pool_size = pool_size
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if backoff_factor is not None:
+            self.backoff_factor = backoff_factor
+        if engine is not None:
+            self.engine = engine
+        if output_format is not None:
+            self.output_format = output_format
+        if image_options is not None:
+            self.image_options = image_options
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """requests.Session shared by every request this provider makes.
+
+        The session is created on first use. Its connection pool keeps up to
+        `pool_size` keep-alive connections per host and blocks callers when all
+        of them are busy, so the number of open sockets stays bounded no matter
+        how many threads are downloading.
+        """
+
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._make_session()
+        return self._session
+
+    def _make_session(self):
+        """Builds a pooled session with retry and backoff"""
+
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            # 429 and 503 are left to `host_limiter`, which slows down instead
+            status_forcelist=list(self.retry_statuses),
+            allowed_methods=["HEAD", "GET"],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        """Closes the provider's pooled connections"""
+
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
-    def _animate(self, event, chapter_names, dir, count):
+    def _get(self, url, rate_limiter=None, **kwargs):
+        """Sends a GET request through the provider's session.
+
+        Waits for the rate limiter and then for the host's turn in
+        `host_limiter` first, and reports the outcome to `host_limiter`.
+
+        Args:
+            url (str): URL to request.
+            rate_limiter (TokenBucket): Optional; Bucket to wait for. Default
+                is the provider's `rate_limiter`.
+            **kwargs: Extra arguments for `requests.Session.get`.
+
+        Returns:
+            response (requests.Response): The server's response.
+
+        Raises:
+            HostUnavailableError: The host has failed too often recently.
+        """
+
+        rate_limiter = rate_limiter or self.rate_limiter
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        if self.host_limiter is not None:
+            self.host_limiter.acquire(url)
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except requests.RequestException:
+            if self.host_limiter is not None:
+                self.host_limiter.record(url)
+            raise
+        if metrics.enabled():
+            self._record_response(url, response, time.perf_counter() - start)
+        if self.host_limiter is not None:
+            self.host_limiter.record(
+                url, response.status_code, response.headers.get("Retry-After")
+            )
+        response.raise_for_status()
+        return response
+
+    def _record_response(self, url, response, seconds):
+        """Records the timing and size of a response in `metrics`"""
+
+        host = urlsplit(url).netloc
+        first_byte = min(seconds, response.elapsed.total_seconds())
+        metrics.record("request", first_byte, host=host)
+        metrics.record("transfer", seconds - first_byte, host=host)
+        metrics.count("requests", host=host, status=response.status_code)
+        metrics.count("bytes", len(response.content), host=host)
+
+    @property
+    def cache(self):
+        """ResponseCache shared by every provider, or None if caching is disabled"""
+
+        if self.cache_path is None:
+            return None
+        return shared_cache(self.cache_path, self.cache_size)
+
+    @property
+    def page_store(self):
+        """PageStore in the download directory, or None if it is disabled"""
+
+        if not self.page_store_size:
+            return None
+        return shared_store(Path(self.download_dir) / ".pages", self.page_store_size)
+
+    def _get_text(self, url, kind, rate_limiter=None):
+        """Returns the text of a page, served from the response cache when possible.
+
+        Cached pages younger than `cache_ttls[kind]` are returned without a
+        request. Older pages are revalidated with a conditional request and
+        only downloaded again if they changed.
+
+        Args:
+            url (str): URL to request.
+            kind (str): Kind of page: "search", "chapter_list" or "chapter".
+            rate_limiter (TokenBucket): Optional; Bucket requests wait for.
+                Default is the provider's `rate_limiter`.
+
+        Returns:
+            text (str): The page's text.
+        """
+
+        cache = self.cache
+        if cache is None:
+            return self._get(url, rate_limiter).text
+
+        entry = cache.get(url)
+        headers = {}
+        if entry is not None:
+            if time.time() - entry.fetched_at < self.cache_ttls.get(kind, 0):
+                return entry.body.decode("utf-8")
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._get(url, rate_limiter, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            cache.refresh(url)
+            return entry.body.decode("utf-8")
+        text = response.text
+        cache.put(
+            url,
+            kind,
+            text.encode("utf-8"),
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return text
+
+    def _animate(self, event, progress):
         """Animation thread function for the downloading animation.
 
         Args:
             event (threading.Event): Event for stopping this thread.
-            downloaded (func): Function that returns the number of downloaded manga.
-            count (int): The number of manga to be downloaded
+            progress (Progress): Progress of the download being animated.
         """
 
         for c in itertools.cycle(["|", "/", "-", "\\"]):
             if event.is_set():
                 break
-            try:
-                sys.stdout.write(
-                    f"\rdownloading - {len([name for name in chapter_names if name in os.listdir(dir)])}/{count} - {c}"
-                )
-            except Exception:
-                sys.stdout.write(f"\rdownloading - {c}")
+            sys.stdout.write(
+                f"\rdownloading - {progress.finished}/{progress.chapters_total} - {c}"
+            )
             sys.stdout.flush()
             time.sleep(0.1)
         sys.stdout.write("\rDone!                              \n")
 
-    def downloading_animation(self, chapter_names, dir, count):
+    def downloading_animation(self, progress):
         """Starts a downloading animation
 
         Args:
-            chapter_names (List(str)): List of chapter filenames
-            dir (pathlib.Path): Path to download directory
-            count (int): The number of manga to be downloaded
+            progress (Progress): Progress of the download to animate.
 
         Returns:
             t (threading.Thread): Animation thread.
@@ -54,65 +295,328 @@ class Provider:
 
         e = threading.Event()
         e.clear()
-        t = threading.Thread(target=self._animate, args=(e, chapter_names, dir, count))
+        t = threading.Thread(target=self._animate, args=(e, progress))
         t.start()
         return t, e
 
-    def _download_image(self, identifier, link, images_list):
+    def _manga_dir(self, dirname):
+        """Returns the directory a manga is stored in, creating it if needed"""
+
+        path = Path(self.download_dir) / dirname
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _chapter_path(self, dirname, chapter_name, output_format=None):
+        """Returns the path of a chapter's file, creating its directory if needed"""
+
+        extension = output_format or self.output_format
+        return self._manga_dir(dirname) / chapter_filename(chapter_name, extension)
+
+    def _staging_dir(self, dirname, chapter_name):
+        """Returns the staging directory of a chapter's download journal"""
+
+        staging = self._manga_dir(dirname) / ".staging"
+        return staging / Path(chapter_filename(chapter_name)).stem
+
+    def _journal(self, dirname, chapter_name, image_links):
+        """Opens the download journal of a chapter"""
+
+        return ChapterJournal(
+            self._staging_dir(dirname, chapter_name), image_links, chapter_name
+        )
+
+    def _download_image(self, link, rate_limiter=None):
         """Thread function for downloading an image
 
         Args:
-            identifier (int): identifier for downloaded image.
             link (str): link to image
-            images_list (List(str)): list of downloaded images
+            rate_limiter (TokenBucket): Optional; Bucket the request waits for.
+
+        Returns:
+            data (bytes): contents of the image file.
+        """
+        return self._get(link, rate_limiter).content
+
+    def _stored_page(self, journal, index):
+        """Links a page that is already in the page store into a journal.
+
+        Returns:
+            size (int): Size of the page in bytes, or None if it has to be
+                downloaded.
+        """
+
+        store = self.page_store
+        digest = store and store.lookup(journal.image_links[index])
+        if not digest:
+            return None
+        try:
+            store.link(digest, journal.page_path(index))
+        except FileNotFoundError:
+            return None
+        metrics.count("page_store_hits")
+        return journal.page_path(index).stat().st_size
+
+    def _store_page(self, journal, index, data):
+        """Records a downloaded page in the page store and a journal.
+
+        Returns:
+            size (int): Size of the page in bytes.
+        """
+
+        store = self.page_store
+        if store is None:
+            journal.store(index, data)
+            return len(data)
+        digest = store.put(data, journal.image_links[index])
+        try:
+            store.link(digest, journal.page_path(index))
+        except FileNotFoundError:
+            journal.store(index, data)
+        return len(data)
+
+    def _download_page(self, journal, index, progress=None, rate_limiter=None):
+        """Thread function for downloading a page into a chapter's journal.
+
+        Pages already in the page store are linked instead of downloaded. A
+        page is retried up to `page_retries` times on top of the session's
+        own retries.
+
+        Args:
+            journal (ChapterJournal): Journal of the page's chapter.
+            index (int): Index of the page in the chapter.
+            progress (Progress): Optional; Progress the page is reported to.
+            rate_limiter (TokenBucket): Optional; Bucket the request waits for.
         """
-        im = Image.open(requests.get(link, stream=True).raw)
-        if im.mode == "RGBA":
-            im = im.convert("RGB")
-        images_list.append([identifier, im])
 
-    def manga2pdf(self, image_links, dirname, chapter_name, paths=None):
+        for attempt in range(self.page_retries + 1):
+            try:
+                size = self._fetch_page(journal, index, rate_limiter)
+                if progress is not None:
+                    progress.page_done(journal.chapter_name, index, size)
+                return
+            except Exception:
+                if attempt == self.page_retries:
+                    raise
+                time.sleep(self.backoff_factor * 2 ** attempt)
+
+    def _fetch_page(self, journal, index, rate_limiter=None):
+        """Places a page in a journal, downloading its link at most once at a time.
+
+        A link shared by chapters downloading at once is fetched by the first
+        thread asking for it; the others wait for that download and link the
+        stored image instead. Threads fetching other links are never held up.
+
+        Returns:
+            size (int): Size of the page in bytes.
+        """
+
+        link = journal.image_links[index]
+        while True:
+            with self._in_flight_lock:
+                done = self._in_flight.get(link)
+                fetching = done is None
+                if fetching:
+                    done = self._in_flight[link] = threading.Event()
+            if not fetching:
+                done.wait()
+                size = self._stored_page(journal, index)
+                if size is not None:
+                    return size
+                # the other download failed or nothing is stored; take over
+                continue
+            try:
+                with metrics.span("page", chapter=journal.chapter_name):
+                    size = self._stored_page(journal, index)
+                    if size is None:
+                        data = self._download_image(link, rate_limiter)
+                        size = self._store_page(journal, index, data)
+                return size
+            finally:
+                with self._in_flight_lock:
+                    del self._in_flight[link]
+                done.set()
+
+    def _write_chapter(
+        self, pages, dirname, chapter_name, output_format=None, image_options=None
+    ):
+        """Writes page files to a chapter's PDF or CBZ.
+
+        Pages are read one at a time. PDF pages that are not JPEGs, and every
+        page when `image_options` are set, are transcoded by
+        `encode_processes` worker processes (default: one per CPU, 0 to
+        transcode on the calling thread). The file is written to a temporary
+        file and moved into place atomically.
+
+        Returns:
+            path (pathlib.Path): path to manga PDF or CBZ.
+        """
+
+        output_format = output_format or self.output_format
+        if image_options is None:
+            image_options = self.image_options
+        path = self._chapter_path(dirname, chapter_name, output_format)
+        partial = path.with_name(path.name + ".part")
+        try:
+            with metrics.span("assemble", chapter=chapter_name), open(
+                partial, "wb"
+            ) as file, WRITERS[output_format](file) as writer:
+                options = (self.encode_processes, image_options)
+                if output_format == "pdf":
+                    encoded = encoded_pages(pages, *options)
+                    for page in metrics.timed(encoded, "encode", chapter=chapter_name):
+                        writer.add_jpeg(*page)
+                else:
+                    processed = processed_pages(pages, *options)
+                    for data in metrics.timed(processed, "encode", chapter=chapter_name):
+                        writer.add_page(data)
+            os.replace(partial, path)
+        finally:
+            if partial.exists():
+                os.remove(partial)
+        return path
+
+    def _assemble(
+        self, journal, dirname, chapter_name, output_format=None, image_options=None
+    ):
+        """Writes a completely downloaded chapter to its PDF or CBZ.
+
+        The chapter's manifest is recorded in the page store, then the journal
+        is removed.
+
+        Returns:
+            path (pathlib.Path): path to manga PDF or CBZ.
+        """
+
+        pages = (journal.page_path(i) for i in range(len(journal)))
+        path = self._write_chapter(
+            pages, dirname, chapter_name, output_format, image_options
+        )
+        store = self.page_store
+        if store is not None:
+            digests = [store.lookup(link) for link in journal.image_links]
+            if all(digests):
+                store.set_manifest(dirname, chapter_name, digests)
+        journal.remove()
+        return path
+
+    def repackage(self, dirname, chapter_name, output_format=None, image_options=None):
+        """Writes a previously downloaded chapter again from the page store.
+
+        Nothing is downloaded, so this is a cheap way to change a chapter's
+        format or post-processing.
+
+        Args:
+            dirname (str): name of directory the manga is stored in.
+            chapter_name (str): name of manga chapter.
+            output_format (str): Optional; "pdf" or "cbz". Default is the
+                provider's `output_format`.
+            image_options (Dict): Optional; Page post-processing options.
+                Default is the provider's `image_options`.
+
+        Returns:
+            path (pathlib.Path): path to the new PDF or CBZ, or None if the
+                chapter's pages are no longer in the page store.
+        """
+
+        store = self.page_store
+        pages = store and store.manifest(dirname, chapter_name)
+        if not pages:
+            return None
+        try:
+            return self._write_chapter(
+                pages, dirname, chapter_name, output_format, image_options
+            )
+        except FileNotFoundError:
+            return None
+
+    def manga2pdf(
+        self,
+        image_links,
+        dirname,
+        chapter_name,
+        paths=None,
+        workers=5,
+        progress=None,
+        output_format=None,
+        image_options=None,
+        rate_limiter=None,
+    ):
         """Turns image links into a PDF
 
+        Pages are downloaded by `workers` threads into the chapter's staging
+        journal, so an interrupted or partly failed download resumes with only
+        the missing pages. The PDF is written only once every page is
+        downloaded. With the "cbz" output format the original image files are
+        archived instead, without being decoded.
+
         Args:
             image_links (List(str)): list of links to images in a chapter.
             dirname (str): name of directory to store manga PDF in.
             chapter_name (str): name of manga chapter.
             paths (Dict): Optional; dictionary of chapter paths (used in multithreaded downloading)
+            workers (int): Optional; number of images downloaded at once. Default is 5.
+            progress (Progress): Optional; Progress that downloaded pages and the
+                finished chapter are reported to.
+            output_format (str): Optional; "pdf" or "cbz". Default is the
+                provider's `output_format`.
+            image_options (Dict): Optional; Page post-processing options.
+                Default is the provider's `image_options`.
+            rate_limiter (TokenBucket): Optional; Bucket the image requests
+                wait for. Default is the provider's `rate_limiter`.
 
         Returns:
-            path (str): path to manga PDF.
-        """
+            path (str): path to manga PDF or CBZ.
 
-        path = Path(__file__).parent.parent
-        if "manga" not in os.listdir(path):
-            os.mkdir(path / "manga")
-        path = path / "manga"
-        if dirname not in os.listdir(path):
-            os.mkdir(path / dirname)
-        path = path / dirname / chapter_filename(chapter_name)
+        Raises:
+            IncompleteChapterError: Some pages could not be downloaded.
+        """
 
-        images = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            for i, link in enumerate(image_links):
-                executor.submit(self._download_image, i, link, images)
+        journal = self._journal(dirname, chapter_name, image_links)
+        with metrics.span("download", chapter=chapter_name), ThreadPoolExecutor(
+            max_workers=workers
+        ) as executor:
+            for index in journal.missing():
+                executor.submit(
+                    self._download_page, journal, index, progress, rate_limiter
+                )
+        missing = journal.missing()
+        if missing:
+            raise IncompleteChapterError(chapter_name, missing)
 
-        images.sort(key=lambda x: x[0])
-        images = [image[1] for image in images]
-        images[0].save(path, save_all=True, quality=100, append_images=images[1:])
+        path = self._assemble(
+            journal, dirname, chapter_name, output_format, image_options
+        )
         if paths != None:
             paths[chapter_name] = str(path)
+        if progress is not None:
+            progress.chapter_done(chapter_name, path)
         return path
 
-    def download(self, manga_name, chapters, verbose=True):
+    def download(
+        self,
+        manga_name,
+        chapters,
+        verbose=True,
+        resolvers=5,
+        workers=20,
+        queue_size=10,
+        progress=None,
+        output_format=None,
+        image_options=None,
+        engine=None,
+    ):
         """Downloads a manga.
 
-        This function should download the chapters from the provider's site
-        and save them under "manga/{manga_name}/{chapter_name}". It is recommended
-        to use multithreading for downloading the chapters (but don't use more than
-        20 threads for this). To download and convert panels into a PDF,
-        use the function manga2pdf. This function should return a dictionary of paths
-        in the form {chapter_name: chapter_path}.
+        Chapters are downloaded in two pipelined stages. `resolvers` threads
+        fetch chapter pages and extract their image links with `image_links`,
+        and `workers` threads turn the resolved chapters into PDFs with
+        `manga2pdf`. The stages are connected by a queue holding at most
+        `queue_size` resolved chapters, so resolving never runs far ahead of
+        downloading. Chapters are saved under "manga/{manga_name}/{chapter_name}".
+
+        Providers normally only need to implement `parse_image_links`; override
+        this function if the provider's site needs a different download process.
+        It should return a dictionary of paths in the form {chapter_name: chapter_path}.
 
         Args:
             manga_name (str): Title of manga to be downloaded.
@@ -120,12 +624,133 @@ class Provider:
                 {"name": name, "link": link, "path": path, "read": read}.
             verbose (bool): Optional; Determines if the download should be
                 loud. Default is True.
+            resolvers (int): Optional; Number of threads resolving chapter
+                pages. Default is 5.
+            workers (int): Optional; Number of chapters downloaded at once.
+                Default is 20.
+            queue_size (int): Optional; Maximum number of resolved chapters
+                waiting to be downloaded. Default is 10.
+            progress (Progress): Optional; Progress that pages and chapters are
+                reported to. A new one is created by default.
+            output_format (str): Optional; File format of the chapters, "pdf" or
+                "cbz". CBZ chapters store the downloaded images unchanged, which
+                is much cheaper than encoding a PDF. Default is the provider's
+                `output_format`.
+            image_options (Dict): Optional; Page post-processing options, see
+                `manga_manager.imaging`. Default is the provider's `image_options`.
+            engine (str): Optional; Download engine, "threads" or "asyncio".
+                Default is the provider's `engine`.
 
         Returns:
             paths (Dict): Dictionary of downloaded chapter paths in the form
                 {chapter_name: chapter_path}.
         """
 
+        if (engine or self.engine) == "asyncio":
+            return self.download_async(
+                manga_name,
+                chapters,
+                verbose=verbose,
+                progress=progress,
+                output_format=output_format,
+                image_options=image_options,
+            )
+
+        if progress is None:
+            progress = Progress()
+        progress.add_chapters(len(chapters))
+        thread, event = None, None
+        if verbose:
+            print("\n" + manga_name.upper())
+            print(len(manga_name) * "-")
+            thread, event = self.downloading_animation(progress)
+
+        paths = {}
+        resolved = queue.Queue(maxsize=queue_size)
+
+        def resolve(chapter):
+            try:
+                resolved.put((chapter, self.image_links(chapter["link"])))
+            except Exception as e:
+                progress.chapter_failed(chapter["name"], e)
+                if verbose:
+                    print(e)
+
+        def convert():
+            for chapter, image_links in iter(resolved.get, None):
+                try:
+                    self.manga2pdf(
+                        image_links,
+                        manga_name,
+                        chapter["name"],
+                        paths=paths,
+                        progress=progress,
+                        output_format=output_format,
+                        image_options=image_options,
+                    )
+                except Exception as e:
+                    progress.chapter_failed(chapter["name"], e)
+                    if verbose:
+                        print(e)
+
+        converters = [threading.Thread(target=convert) for _ in range(workers)]
+        for converter in converters:
+            converter.start()
+        try:
+            with ThreadPoolExecutor(max_workers=resolvers) as executor:
+                for _ in executor.map(resolve, chapters):
+                    pass
+        finally:
+            for _ in converters:
+                resolved.put(None)
+            for converter in converters:
+                converter.join()
+            if verbose:
+                event.set()
+                thread.join()
+        return paths
+
+    def download_async(
+        self, manga_name, chapters, verbose=True, progress=None, **options
+    ):
+        """Downloads a manga on a single asyncio event loop.
+
+        Takes the same arguments and returns the same paths as `download`.
+        Extra keyword arguments are passed to `AsyncDownloader`.
+        """
+
+        from manga_manager.provider.engine import AsyncDownloader
+
+        return AsyncDownloader(self, **options).run(
+            manga_name, chapters, verbose, progress
+        )
+
+    def image_links(self, chapter_link, rate_limiter=None):
+        """Returns the links to a chapter's images.
+
+        Args:
+            chapter_link (str): Link to a chapter on the provider's site.
+            rate_limiter (TokenBucket): Optional; Bucket the request waits for.
+                Default is the provider's `rate_limiter`.
+
+        Returns:
+            image_links (List(str)): Links to the chapter's images, in reading order.
+        """
+
+        return self.parse_image_links(
+            self._get_text(chapter_link, "chapter", rate_limiter)
+        )
+
+    def parse_image_links(self, html):
+        """Extracts image links from a chapter page.
+
+        Args:
+            html (str): HTML of a chapter page.
+
+        Returns:
+            image_links (List(str)): Links to the chapter's images, in reading order.
+        """
+
     def search(self, search_query, page=1):
         """Searches the provider's site for manga.
 
@@ -152,3 +777,24 @@ class Provider:
         Returns:
             chapters (List(List)): List of chapters in the form[[chapter_name, chapter_link], ...]
         """
+
+    def new_chapters(self, manga_link, known_links):
+        """Returns the chapters of a manga that are not known yet.
+
+        Providers whose chapter lists are sorted can override this to stop
+        reading the list at the first known chapter.
+
+        Args:
+            manga_link (str): Link to a manga on the provider's site.
+            known_links (Set(str)): Links of the chapters that are already tracked.
+
+        Returns:
+            chapters (List(List)): List of new chapters in the form
+                [[chapter_name, chapter_link], ...], oldest first.
+        """
+
+        return [
+            chapter
+            for chapter in self.chapter_list(manga_link)
+            if chapter[1] not in known_links
+        ]
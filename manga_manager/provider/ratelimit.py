@@ -0,0 +1,358 @@
+"""Request rate limiting for providers.
+
+A `TokenBucket` assigned to `Provider.rate_limiter` is consulted before every
+request the provider sends, unless a download is given a bucket of its own.
+One bucket can be shared by several providers to cap their combined request
+rate.
+
+On top of that, every provider shares one `HostLimiter`, which paces requests
+to each host with an `AdaptiveBucket` and stops sending requests to a failing
+host with a `CircuitBreaker`. The bucket starts slow, speeds up while the host
+keeps answering, and backs off when the host answers 429 or 503, waiting out
+its Retry-After header. Pacing requests this way gets more through than
+bursts that the host throttles.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class HostUnavailableError(Exception):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+    def __init__(self, host, retry_in):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(
+            f"{host} is failing; requests are paused for {retry_in:.0f} more seconds"
+        )
+
+
+def retry_after(value):
+    """Parses a Retry-After header.
+
+    Args:
+        value (str): Header value, in seconds or as an HTTP date.
+
+    Returns:
+        seconds (float): Seconds to wait, or None if the value is missing or
+            invalid.
+    """
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second on average"""
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            burst (int): Optional; Most tokens the bucket holds, i.e. the
+                longest run of requests sent without waiting. Default is
+                `rate`, rounded up.
+        """
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate + 0.999))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self._updated:
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def reserve(self, tokens=1):
+        """Takes `tokens` tokens, borrowing them if the bucket is short.
+
+        Returns:
+            wait (float): Seconds to wait before using the tokens.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            debt = max(0.0, -self._tokens) / self.rate
+            return max(0.0, self._updated - now) + debt
+
+    def acquire(self, tokens=1):
+        """Blocks until `tokens` tokens are available and takes them"""
+
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AdaptiveBucket(TokenBucket):
+    """Token bucket whose rate follows the responses of the host it paces.
+
+    The rate grows by one request per second for every success until the host
+    first throttles, and by about one request per second every second after
+    that. Each throttled response halves it.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.5, max_rate=None):
+        """
+        Args:
+            rate (float): Initial tokens added per second.
+            burst (int): Optional; Most tokens the bucket holds. Default is
+                `rate`, rounded up.
+            min_rate (float): Optional; Lowest rate backing off goes to.
+                Default is 0.5.
+            max_rate (float): Optional; Highest rate speeding up goes to.
+                Default is no limit.
+        """
+
+        super().__init__(rate, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self._slow_start = True
+
+    def succeeded(self):
+        """Speeds up after a successful response"""
+
+        with self._lock:
+            step = 1.0 if self._slow_start else 1.0 / self.rate
+            self.rate += step
+            if self.max_rate is not None:
+                self.rate = min(self.rate, self.max_rate)
+
+    def throttled(self, wait=None):
+        """Backs off after a 429 or 503 response.
+
+        Args:
+            wait (float): Optional; Seconds the host asked to wait before the
+                next request.
+        """
+
+        with self._lock:
+            self._slow_start = False
+            self.rate = max(self.min_rate, self.rate / 2)
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            if wait:
+                self._updated = max(self._updated, now + wait)
+
+
+class CircuitBreaker:
+    """Stops requests to a host after repeated failures.
+
+    After `threshold` failures in a row the circuit opens and requests fail
+    immediately for `cooldown` seconds. Then one trial request is let through:
+    if it succeeds the circuit closes, otherwise it opens again for twice as
+    long, up to `max_cooldown`. A trial whose outcome is never recorded, e.g.
+    because the request was cancelled, is given up after the same cooldown and
+    another trial is let through.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, host, threshold=5, cooldown=30, max_cooldown=300):
+        """
+        Args:
+            host (str): Host the breaker guards.
+            threshold (int): Optional; Failures in a row that open the
+                circuit. Default is 5.
+            cooldown (float): Optional; Seconds the circuit stays open the
+                first time. Default is 30.
+            max_cooldown (float): Optional; Longest time the circuit stays
+                open. Default is 300.
+        """
+
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._open_for = cooldown
+        self._opened = 0.0
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Lets a request through or raises `HostUnavailableError`"""
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            remaining = self._opened + self._open_for - now
+            if remaining <= 0:
+                self.state = self.HALF_OPEN
+                self._opened = now
+                return
+            raise HostUnavailableError(self.host, remaining)
+
+    def succeeded(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._open_for = self.cooldown
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self._open_for = min(self.max_cooldown, self._open_for * 2)
+            elif self.failures < self.threshold:
+                return
+            self.state = self.OPEN
+            self._opened = time.monotonic()
+
+
+class _Host:
+    __slots__ = ("bucket", "breaker", "requests", "throttled", "failures", "waited")
+
+    def __init__(self, bucket, breaker):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.requests = 0
+        self.throttled = 0
+        self.failures = 0
+        self.waited = 0.0
+
+
+class HostLimiter:
+    """Adaptive rate limits and circuit breakers for every host requested"""
+
+    def __init__(
+        self,
+        rate=8,
+        burst=16,
+        max_rate=64,
+        failure_threshold=5,
+        cooldown=30,
+    ):
+        """
+        Args:
+            rate (float): Optional; Initial requests per second per host.
+                Default is 8.
+            burst (int): Optional; Requests sent to a host without waiting.
+                Default is 16.
+            max_rate (float): Optional; Highest requests per second per host.
+                Default is 64.
+            failure_threshold (int): Optional; Failures in a row that pause a
+                host. Default is 5.
+            cooldown (float): Optional; Seconds a failing host is first paused
+                for. Default is 30.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _Host(
+                    AdaptiveBucket(self.rate, self.burst, max_rate=self.max_rate),
+                    CircuitBreaker(host, self.failure_threshold, self.cooldown),
+                )
+            return self._hosts[host]
+
+    def reserve(self, url):
+        """Reserves a request to a URL's host.
+
+        Returns:
+            wait (float): Seconds to wait before sending the request.
+
+        Raises:
+            HostUnavailableError: The host's circuit is open.
+        """
+
+        host = self._host(url)
+        host.breaker.check()
+        wait = host.bucket.reserve()
+        with self._lock:
+            host.requests += 1
+            host.waited += wait
+        return wait
+
+    def acquire(self, url):
+        """Blocks until a request may be sent to a URL's host"""
+
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, url, status=None, retry_after_header=None):
+        """Adapts a host's limits to the outcome of a request.
+
+        Args:
+            url (str): Requested URL.
+            status (int): Optional; HTTP status of the response. None means
+                the request failed without a response.
+            retry_after_header (str): Optional; Retry-After header of the
+                response.
+        """
+
+        host = self._host(url)
+        failed = status is None or status >= 500
+        if status in THROTTLE_STATUSES:
+            host.bucket.throttled(retry_after(retry_after_header))
+        if failed:
+            host.breaker.failed()
+        else:
+            host.breaker.succeeded()
+            if status not in THROTTLE_STATUSES:
+                host.bucket.succeeded()
+        with self._lock:
+            host.throttled += status in THROTTLE_STATUSES
+            host.failures += failed
+
+    def metrics(self):
+        """Returns the current limits and counters of every host.
+
+        Returns:
+            metrics (Dict): In the form {host: {"rate": float, "state": str,
+                "requests": int, "throttled": int, "failures": int,
+                "waited": float}}, where "waited" is the total seconds
+                requests were held back.
+        """
+
+        with self._lock:
+            return {
+                name: {
+                    "rate": host.bucket.rate,
+                    "state": host.breaker.state,
+                    "requests": host.requests,
+                    "throttled": host.throttled,
+                    "failures": host.failures,
+                    "waited": host.waited,
+                }
+                for name, host in self._hosts.items()
+            }
+
+
+_shared = HostLimiter()
+
+
+def shared_limiter():
+    """Returns the `HostLimiter` shared by every provider in the process"""
+
+    return _shared
@@ -0,0 +1,116 @@
+"""Provider registry.
+
+Providers are looked up by name. Built-in providers are always available;
+other packages add providers by declaring an entry point in the
+"manga_manager.providers" group, e.g. in their setup.py::
+
+    entry_points={
+        "manga_manager.providers": ["MangaReader = mangareader:MangaReader"],
+    }
+
+`get_provider` keeps one instance per provider for the life of the process, so
+its connection pool, response cache and rate limiter are shared by every
+caller instead of being rebuilt for each command.
+"""
+
+import importlib
+import threading
+
+GROUP = "manga_manager.providers"
+BUILTIN = {"Mangakakalot": "manga_manager.provider.mangakakalot:Mangakakalot"}
+
+_classes = {}
+_instances = {}
+_plugins = None
+_lock = threading.RLock()
+
+
+def _entry_points():
+    """Returns the installed entry points of the provider group"""
+
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # pragma: no cover - Python < 3.8
+        try:
+            import pkg_resources
+        except ImportError:
+            return []
+        return list(pkg_resources.iter_entry_points(GROUP))
+    points = entry_points()
+    if hasattr(points, "select"):
+        return list(points.select(group=GROUP))
+    return list(points.get(GROUP, ()))  # pragma: no cover - Python < 3.10
+
+
+def _plugin_entry_points():
+    global _plugins
+    with _lock:
+        if _plugins is None:
+            _plugins = {point.name: point for point in _entry_points()}
+        return _plugins
+
+
+def _load(target):
+    module, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+def register(provider_class, name=None):
+    """Registers a provider class under its `name` without an entry point.
+
+    Args:
+        provider_class (type): Subclass of `Provider`.
+        name (str): Optional; Name of the provider. Default is
+            `provider_class.name`.
+    """
+
+    with _lock:
+        _classes[name or provider_class.name] = provider_class
+
+
+def available():
+    """Returns the names of every known provider without importing them"""
+
+    with _lock:
+        names = set(BUILTIN) | set(_classes) | set(_plugin_entry_points())
+    return sorted(names)
+
+
+def provider_class(name):
+    """Returns the provider class registered under a name.
+
+    Built-in providers are imported directly; the installed entry points are
+    only scanned for other names.
+
+    Raises:
+        KeyError: No provider has that name.
+    """
+
+    with _lock:
+        if name not in _classes:
+            if name in BUILTIN:
+                _classes[name] = _load(BUILTIN[name])
+            elif name in _plugin_entry_points():
+                _classes[name] = _plugin_entry_points()[name].load()
+            else:
+                raise KeyError(f"Unknown provider: {name}")
+        return _classes[name]
+
+
+def get_provider(name):
+    """Returns the shared instance of a provider, creating it on first use"""
+
+    with _lock:
+        if name not in _instances:
+            _instances[name] = provider_class(name)()
+        return _instances[name]
+
+
+def close_all():
+    """Closes and forgets every shared provider instance"""
+
+    with _lock:
+        instances = list(_instances.values())
+        _instances.clear()
+    for instance in instances:
+        instance.close()
@@ -0,0 +1,435 @@
+"""Local web reader for `read_manga`.
+
+`ReaderServer` serves a manga's chapters to the browser page by page. Pages
+are read from the chapter's download journal while it is still downloading,
+so the first page shows up as soon as it arrives, and from the finished PDF
+or CBZ afterwards. Page and file responses support HTTP range requests and
+ETag revalidation. The reader page preloads the pages ahead of the reader and
+the first pages of the next chapter, and tells the server when a chapter was
+opened or read to the end.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from manga_manager.cbz import image_extension
+from manga_manager.pdf import page_images
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+FILE_TYPES = {".pdf": "application/pdf", ".cbz": "application/vnd.comicbook+zip"}
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+body {{ margin: 0; background: #111; color: #ddd; font-family: sans-serif; text-align: center; }}
+img {{ display: block; max-width: 100%; margin: 0 auto; min-height: 40vh; }}
+nav {{ padding: 1em; }}
+a {{ color: #9cf; margin: 0 1em; }}
+</style>
+</head>
+<body>
+<nav>{navigation}<div>{chapter}</div></nav>
+<div id="pages"></div>
+<nav>{navigation}</nav>
+<script>
+const index = {index}, next = {next}, eager = {eager};
+const pages = document.getElementById("pages");
+let shown = 0;
+const finished = new IntersectionObserver((entries) => {{
+  if (entries.some((entry) => entry.isIntersecting)) {{
+    finished.disconnect();
+    fetch(`/progress/${{index}}`, {{method: "POST"}});
+    preloadNext();
+  }}
+}});
+function preloadNext() {{
+  if (next === null) return;
+  fetch(`/chapter/${{next}}.json`).then((r) => r.json()).then((info) => {{
+    for (let n = 0; n < Math.min(eager, info.pages || eager); n++) {{
+      new Image().src = `/page/${{next}}/${{n}}`;
+    }}
+  }});
+}}
+function show(count) {{
+  for (; shown < count; shown++) {{
+    const img = document.createElement("img");
+    img.loading = shown < eager ? "eager" : "lazy";
+    img.src = `/page/${{index}}/${{shown}}`;
+    pages.appendChild(img);
+  }}
+  if (count) {{
+    finished.disconnect();
+    finished.observe(pages.lastChild);
+  }}
+}}
+function poll() {{
+  fetch(`/chapter/${{index}}.json`).then((r) => r.json()).then((info) => {{
+    show(info.pages || 0);
+    if (!info.complete || info.pages === null) setTimeout(poll, 500);
+  }});
+}}
+poll();
+</script>
+</body>
+</html>
+"""
+
+
+class ReaderServer:
+    """HTTP server streaming the chapters of one manga to the browser"""
+
+    def __init__(
+        self,
+        manga,
+        provider,
+        on_visit=None,
+        on_read=None,
+        host="127.0.0.1",
+        port=0,
+        page_timeout=60,
+        eager_pages=4,
+    ):
+        """
+        Args:
+            manga (Dict): Config of the manga being read.
+            provider (Provider): Provider the manga is downloaded with, used to
+                find chapters that are still downloading.
+            on_visit (func): Optional; Called with a chapter index when the
+                reader opens that chapter.
+            on_read (func): Optional; Called with a chapter index when the
+                reader scrolls to the end of that chapter.
+            host (str): Optional; Address to listen on. Default is 127.0.0.1.
+            port (int): Optional; Port to listen on. Default is a free port.
+            page_timeout (float): Optional; Seconds a page request waits for
+                the page to be downloaded. Default is 60.
+            eager_pages (int): Optional; Pages loaded right away when a
+                chapter opens, and preloaded from the next chapter. Default is 4.
+        """
+
+        self.manga = manga
+        self.provider = provider
+        self.on_visit = on_visit
+        self.on_read = on_read
+        self.page_timeout = page_timeout
+        self.eager_pages = eager_pages
+        self._offsets = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def chapter_url(self, index):
+        """Returns the reader URL of a chapter"""
+
+        return f"{self.url}/read/{index}"
+
+    def start(self):
+        """Starts serving on a background thread"""
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        """Stops the server"""
+
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _chapter(self, index):
+        chapters = self.manga["chapters"]
+        if not 0 <= index < len(chapters):
+            raise KeyError(index)
+        return chapters[index]
+
+    def _staging(self, chapter):
+        return self.provider._staging_dir(self.manga["name"], chapter["name"])
+
+    def _staged_pages(self, chapter):
+        """Returns the number of pages in a chapter's journal, or None if unknown"""
+
+        try:
+            manifest = self._staging(chapter) / "manifest.json"
+            return len(json.loads(manifest.read_text())["links"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _file_pages(self, path):
+        """Returns page names (CBZ) or (offset, length) pairs (PDF) of a chapter file"""
+
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            if key not in self._offsets:
+                if path.endswith(".cbz"):
+                    with zipfile.ZipFile(path) as archive:
+                        pages = sorted(archive.namelist())
+                else:
+                    with open(path, "rb") as file, mmap.mmap(
+                        file.fileno(), 0, access=mmap.ACCESS_READ
+                    ) as data:
+                        pages = page_images(data)
+                self._offsets[key] = pages
+            return self._offsets[key]
+
+    def _file_page(self, path, number):
+        pages = self._file_pages(path)
+        if not 0 <= number < len(pages):
+            return None
+        if path.endswith(".cbz"):
+            with zipfile.ZipFile(path) as archive:
+                return archive.read(pages[number])
+        offset, length = pages[number]
+        with open(path, "rb") as file:
+            file.seek(offset)
+            return file.read(length)
+
+    def chapter_info(self, index):
+        """Returns what the reader page needs to know about a chapter.
+
+        Returns:
+            info (Dict): The chapter's name, number of pages (None while the
+                chapter's images are not known yet) and whether it is
+                completely downloaded.
+        """
+
+        chapter = self._chapter(index)
+        info = {"name": chapter["name"], "pages": None, "complete": False}
+        if chapter["path"]:
+            try:
+                info["pages"] = len(self._file_pages(chapter["path"]))
+                info["complete"] = True
+                return info
+            except OSError:
+                pass
+        info["pages"] = self._staged_pages(chapter)
+        return info
+
+    def page(self, index, number, timeout=None):
+        """Returns a page's image, waiting for it to be downloaded.
+
+        Args:
+            index (int): Index of the chapter.
+            number (int): Index of the page in the chapter.
+            timeout (float): Optional; Seconds to wait. Default is `page_timeout`.
+
+        Returns:
+            data (bytes): The image file, or None if the chapter has no such
+                page, its file was deleted, or the page did not arrive in time.
+            complete (bool): Whether the page came from the finished chapter.
+        """
+
+        chapter = self._chapter(index)
+        timeout = self.page_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            if chapter["path"]:
+                try:
+                    return self._file_page(chapter["path"], number), True
+                except OSError:
+                    # pruned or evicted; it may be downloading again
+                    pass
+            staging = self._staging(chapter)
+            try:
+                return (staging / f"{number:04d}").read_bytes(), False
+            except OSError:
+                pass
+            count = self._staged_pages(chapter)
+            if count is not None and not 0 <= number < count:
+                return None, False
+            if chapter["path"] and not staging.exists():
+                return None, False
+            if time.monotonic() >= deadline:
+                return None, False
+            time.sleep(0.05)
+
+    def render(self, index):
+        """Returns the reader page of a chapter"""
+
+        chapter = self._chapter(index)
+        count = len(self.manga["chapters"])
+        links = []
+        if index > 0:
+            links.append(f'<a href="/read/{index - 1}">Previous</a>')
+        if index + 1 < count:
+            links.append(f'<a href="/read/{index + 1}">Next</a>')
+        return PAGE.format(
+            title=_escape(self.manga["name"]),
+            chapter=_escape(chapter["name"]),
+            navigation="".join(links),
+            index=index,
+            next=index + 1 if index + 1 < count else "null",
+            eager=self.eager_pages,
+        )
+
+
+def _escape(text):
+    return (
+        str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    )
+
+
+def _byte_range(header, size):
+    """Parses a single-range Range header into (start, end), inclusive"""
+
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+def _handler(reader):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="text/plain", headers=()):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _send_data(self, data, content_type, cache_control, etag):
+            headers = [
+                ("ETag", etag),
+                ("Cache-Control", cache_control),
+                ("Accept-Ranges", "bytes"),
+            ]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+            requested = self.headers.get("Range")
+            if requested:
+                byte_range = _byte_range(requested, len(data))
+                if byte_range is None:
+                    self._send(416, headers=[("Content-Range", f"bytes */{len(data)}")])
+                    return
+                start, end = byte_range
+                headers.append(("Content-Range", f"bytes {start}-{end}/{len(data)}"))
+                self._send(206, data[start : end + 1], content_type, headers)
+                return
+            self._send(200, data, content_type, headers)
+
+        def _send_file(self, path):
+            stat = path.stat()
+            etag = '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+            content_type = FILE_TYPES.get(path.suffix, "application/octet-stream")
+            with open(path, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                self._send_data(data, content_type, "private, max-age=86400", etag)
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            try:
+                if parts == [""]:
+                    current = reader.manga["current_chapter"]
+                    self._send(302, headers=[("Location", f"/read/{current}")])
+                elif parts[0] == "read" and len(parts) == 2:
+                    index = int(parts[1])
+                    body = reader.render(index).encode()
+                    if reader.on_visit is not None:
+                        reader.on_visit(index)
+                    self._send(200, body, "text/html; charset=utf-8")
+                elif parts[0] == "chapter" and len(parts) == 2:
+                    info = reader.chapter_info(int(parts[1].replace(".json", "")))
+                    self._send(200, json.dumps(info).encode(), "application/json")
+                elif parts[0] == "page" and len(parts) == 3:
+                    data, complete = reader.page(int(parts[1]), int(parts[2]))
+                    if data is None:
+                        self._send(404, b"Page not available")
+                        return
+                    content_type = CONTENT_TYPES[image_extension(data)]
+                    cache = "private, max-age=86400" if complete else "no-cache"
+                    etag = '"%s"' % hashlib.sha1(data).hexdigest()
+                    self._send_data(data, content_type, cache, etag)
+                elif parts[0] == "file" and len(parts) == 2:
+                    path = reader._chapter(int(parts[1]))["path"]
+                    if not path:
+                        self._send(404, b"Chapter not downloaded")
+                        return
+                    self._send_file(Path(path))
+                else:
+                    self._send(404, b"Not found")
+            except ConnectionError:
+                # the browser went away
+                pass
+            except (KeyError, ValueError, OSError):
+                # OSError: a chapter file deleted by pruning or eviction
+                self._send(404, b"Not found")
+
+        def _same_origin(self):
+            # any web page can make the browser POST here; only the reader's
+            # own pages send its address as Origin, and rebound DNS names
+            # show up in Host
+            origin = self.headers.get("Origin")
+            if origin is not None and origin != reader.url:
+                return False
+            return self.headers.get("Host") == urlsplit(reader.url).netloc
+
+        def do_POST(self):
+            if not self._same_origin():
+                self._send(403, b"Forbidden")
+                return
+            parts = self.path.strip("/").split("/")
+            try:
+                if parts[0] == "progress" and len(parts) == 2:
+                    index = int(parts[1])
+                    reader._chapter(index)
+                    if reader.on_read is not None:
+                        reader.on_read(index)
+                    self._send(204)
+                else:
+                    self._send(404, b"Not found")
+            except (KeyError, ValueError):
+                self._send(404, b"Not found")
+
+    return Handler
@@ -0,0 +1,159 @@
+"""Bulk chapter downloads across many series.
+
+The `Scheduler` downloads the chapters of every series added to it with one
+pool of chapter workers. Series take turns, so a long backlog does not hold up
+the others, and when a rate is given all of the scheduler's requests share one
+`TokenBucket`. Requests to each host, including the CDNs images are
+served from, are paced by the providers' shared `HostLimiter`, so every worker
+stays busy; `per_host` additionally caps the chapters downloaded at once from
+one provider site.
+"""
+
+import threading
+from collections import deque
+from urllib.parse import urlparse
+
+from manga_manager.provider.progress import Progress
+from manga_manager.provider.ratelimit import TokenBucket
+
+
+class _Series:
+    __slots__ = ("provider", "manga_name", "chapters", "options", "host", "paths")
+
+    def __init__(self, provider, manga_name, chapters, options):
+        self.provider = provider
+        self.manga_name = manga_name
+        self.chapters = deque(chapters)
+        self.options = options
+        self.host = urlparse(getattr(provider, "base_url", "")).netloc
+        self.paths = {}
+
+
+class Scheduler:
+    """Downloads chapters of many series with fair, rate-limited workers"""
+
+    def __init__(self, workers=8, per_host=None, page_workers=5, rate=None, burst=None):
+        """
+        Args:
+            workers (int): Optional; Number of chapters downloaded at once.
+                Default is 8.
+            per_host (int): Optional; Number of chapters downloaded at once
+                from one provider site. Default is no limit.
+            page_workers (int): Optional; Number of pages downloaded at once
+                per chapter. Default is 5.
+            rate (float): Optional; Most requests per second sent by all
+                workers together. Default is no limit.
+            burst (int): Optional; Burst size of the rate limit. Default is
+                `rate`.
+        """
+
+        self.workers = workers
+        self.per_host = per_host
+        self.page_workers = page_workers
+        self.rate_limiter = TokenBucket(rate, burst) if rate else None
+
+        self._cond = threading.Condition()
+        self._series = deque()
+        self._active = {}
+
+    def add(self, provider, manga_name, chapters, **options):
+        """Queues chapters of a series for download.
+
+        Args:
+            provider (Provider): Provider the series is downloaded from.
+            manga_name (str): Title of the series.
+            chapters (List(Dict)): Chapter dicts to download, in order.
+            **options: Optional; Extra keyword arguments for
+                `provider.manga2pdf`, such as the series' output format.
+        """
+
+        with self._cond:
+            self._series.append(_Series(provider, manga_name, chapters, options))
+
+    def _next(self):
+        """Takes the next chapter in round-robin order from a host with capacity"""
+
+        for _ in range(len(self._series)):
+            series = self._series[0]
+            self._series.rotate(-1)
+            if series.chapters and (
+                self.per_host is None or self._active.get(series.host, 0) < self.per_host
+            ):
+                return series, series.chapters.popleft()
+        return None
+
+    def _pending(self):
+        return any(series.chapters for series in self._series)
+
+    def _work(self, progress):
+        while True:
+            with self._cond:
+                job = self._next()
+                while job is None and self._pending():
+                    self._cond.wait()
+                    job = self._next()
+                if job is None:
+                    return
+                series, chapter = job
+                self._active[series.host] = self._active.get(series.host, 0) + 1
+            try:
+                self._download(series, chapter, progress)
+            finally:
+                with self._cond:
+                    self._active[series.host] -= 1
+                    self._cond.notify_all()
+
+    def _download(self, series, chapter, progress):
+        provider = series.provider
+        try:
+            image_links = provider.image_links(chapter["link"], self.rate_limiter)
+            path = provider.manga2pdf(
+                image_links,
+                series.manga_name,
+                chapter["name"],
+                workers=self.page_workers,
+                progress=progress,
+                rate_limiter=self.rate_limiter,
+                **series.options,
+            )
+        except Exception as e:
+            progress.chapter_failed(chapter["name"], e)
+            return
+        with self._cond:
+            series.paths[chapter["name"]] = str(path)
+
+    def run(self, progress=None):
+        """Downloads every queued chapter.
+
+        Requests wait for the scheduler's rate limit, if any. It is passed to
+        each download rather than set on the providers, so downloads sharing
+        them outside the scheduler keep their own limits.
+
+        Args:
+            progress (Progress): Optional; Progress that pages and chapters are
+                reported to. A new one is created by default.
+
+        Returns:
+            paths (Dict): Downloaded chapter paths per series, in the form
+                {manga_name: {chapter_name: chapter_path}}.
+        """
+
+        if progress is None:
+            progress = Progress()
+        with self._cond:
+            series = list(self._series)
+        progress.add_chapters(sum(len(s.chapters) for s in series))
+
+        threads = [
+            threading.Thread(target=self._work, args=(progress,))
+            for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        paths = {}
+        for s in series:
+            paths.setdefault(s.manga_name, {}).update(s.paths)
+        return paths
@@ -0,0 +1,286 @@
+"""Storage backends for the manga library.
+
+The library is a dict in the form {"manga": {name: manga, ...}, ...} where each
+manga dict holds a list of chapter dicts. Stores load the whole library into
+that structure and write it back on `save`.
+
+`JsonStore` keeps the original single config.json file. `SqliteStore` keeps one
+row per manga and per chapter, and only writes the rows that changed since the
+last load or save, so saving after reading a chapter does not rewrite the
+whole library.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+MANGA_FIELDS = (
+    "name",
+    "link",
+    "authors",
+    "download_mode",
+    "provider",
+    "current_chapter",
+)
+CHAPTER_FIELDS = ("name", "link", "path", "read")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manga (
+    name TEXT PRIMARY KEY,
+    link TEXT,
+    authors TEXT,
+    download_mode TEXT,
+    provider TEXT,
+    current_chapter INTEGER,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    manga TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT,
+    link TEXT,
+    path TEXT,
+    read INTEGER,
+    extra TEXT,
+    PRIMARY KEY (manga, idx)
+);
+CREATE INDEX IF NOT EXISTS chapters_name ON chapters (manga, name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Store:
+    """Interface for a library storage backend"""
+
+    def load(self):
+        """Loads the library.
+
+        Returns:
+            config (Dict): Library in the form {"manga": {name: manga, ...}, ...}.
+        """
+
+    def save(self, config):
+        """Saves the library.
+
+        Args:
+            config (Dict): Library in the form {"manga": {name: manga, ...}, ...}.
+        """
+
+
+class JsonStore(Store):
+    """Stores the library in a single JSON file"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (pathlib.Path): Path to the JSON file.
+        """
+
+        self.path = Path(path)
+
+    def load(self):
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return {"manga": {}}
+        with open(self.path, "r") as file:
+            return json.loads(file.read())
+
+    def save(self, config):
+        data = json.dumps(config)
+        with open(self.path, "w") as file:
+            file.write(data)
+
+
+def _extra(record, fields):
+    """Serializes the keys of a record that have no column of their own"""
+
+    extra = {key: value for key, value in record.items() if key not in fields}
+    return json.dumps(extra, sort_keys=True) if extra else None
+
+
+def _manga_row(manga):
+    return tuple(manga.get(field) for field in MANGA_FIELDS) + (
+        _extra(manga, MANGA_FIELDS + ("chapters",)),
+    )
+
+
+def _chapter_row(chapter):
+    return (
+        chapter.get("name"),
+        chapter.get("link"),
+        chapter.get("path"),
+        int(bool(chapter.get("read"))),
+        _extra(chapter, CHAPTER_FIELDS),
+    )
+
+
+class SqliteStore(Store):
+    """Stores the library in an SQLite database with one row per chapter.
+
+    The store remembers the rows it last loaded or saved. `save` compares the
+    library against them in memory and writes only inserted, changed and
+    deleted rows in a single transaction.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (pathlib.Path): Path to the database file.
+        """
+
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._manga_rows = {}
+        self._chapter_rows = {}
+        self._meta_rows = {}
+
+    def close(self):
+        """Closes the database connection"""
+
+        self._connection.close()
+
+    def load(self):
+        with self._lock:
+            connection = self._connection
+            config = {"manga": {}}
+            self._manga_rows, self._chapter_rows, self._meta_rows = {}, {}, {}
+
+            for row in connection.execute(
+                f"SELECT {', '.join(MANGA_FIELDS)}, extra FROM manga ORDER BY rowid"
+            ):
+                manga = dict(zip(MANGA_FIELDS, row))
+                manga.update(json.loads(row[-1]) if row[-1] else {})
+                manga["chapters"] = []
+                config["manga"][manga["name"]] = manga
+                self._manga_rows[manga["name"]] = tuple(row)
+
+            for row in connection.execute(
+                "SELECT manga, idx, name, link, path, read, extra FROM chapters "
+                "ORDER BY manga, idx"
+            ):
+                manga_name, index = row[0], row[1]
+                if manga_name not in config["manga"]:
+                    # left behind by a writer that raced a removal
+                    continue
+                chapter = dict(zip(CHAPTER_FIELDS, row[2:6]))
+                chapter["read"] = bool(chapter["read"])
+                chapter.update(json.loads(row[6]) if row[6] else {})
+                config["manga"][manga_name]["chapters"].append(chapter)
+                self._chapter_rows[(manga_name, index)] = tuple(row[2:])
+
+            for key, value in connection.execute("SELECT key, value FROM meta"):
+                config[key] = json.loads(value)
+                self._meta_rows[key] = value
+            return config
+
+    def save(self, config):
+        manga_rows, chapter_rows, meta_rows = {}, {}, {}
+        for name, manga in config["manga"].items():
+            manga_rows[name] = _manga_row(manga)
+            for index, chapter in enumerate(manga["chapters"]):
+                chapter_rows[(name, index)] = _chapter_row(chapter)
+        for key, value in config.items():
+            if key != "manga":
+                meta_rows[key] = json.dumps(value, sort_keys=True)
+
+        removed = [(name,) for name in self._manga_rows.keys() - manga_rows.keys()]
+        with self._lock, self._connection as connection:
+            connection.executemany("DELETE FROM manga WHERE name = ?", removed)
+            # by name, so chapters another process added since the load go too
+            connection.executemany("DELETE FROM chapters WHERE manga = ?", removed)
+            connection.executemany(
+                "DELETE FROM chapters WHERE manga = ? AND idx = ?",
+                list(self._chapter_rows.keys() - chapter_rows.keys()),
+            )
+            connection.executemany(
+                "DELETE FROM meta WHERE key = ?",
+                [(key,) for key in self._meta_rows.keys() - meta_rows.keys()],
+            )
+            connection.executemany(
+                f"INSERT INTO manga ({', '.join(MANGA_FIELDS)}, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+                + ", ".join(f"{f} = excluded.{f}" for f in MANGA_FIELDS[1:] + ("extra",)),
+                [
+                    row
+                    for name, row in manga_rows.items()
+                    if self._manga_rows.get(name) != row
+                ],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO chapters "
+                "(manga, idx, name, link, path, read, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    key + row
+                    for key, row in chapter_rows.items()
+                    if self._chapter_rows.get(key) != row
+                ],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    (key, value)
+                    for key, value in meta_rows.items()
+                    if self._meta_rows.get(key) != value
+                ],
+            )
+            self._manga_rows = manga_rows
+            self._chapter_rows = chapter_rows
+            self._meta_rows = meta_rows
+
+
+STORES = {"json": JsonStore, "sqlite": SqliteStore}
+STORE_FILES = {"json": "config.json", "sqlite": "library.db"}
+
+
+def migrate(source, destination):
+    """Copies a library from one store into another.
+
+    Args:
+        source (Store): Store to read the library from.
+        destination (Store): Store to write the library to.
+    """
+
+    destination.save(source.load())
+
+
+def open_store(directory, backend=None):
+    """Opens the library store in a directory.
+
+    The backend is chosen with `backend`, or the MANGA_MANAGER_STORE
+    environment variable, and defaults to "sqlite". When an SQLite store is
+    opened for the first time next to an existing config.json, the JSON library
+    is migrated into it and the JSON file is kept as config.json.bak.
+
+    Args:
+        directory (pathlib.Path): Directory holding the library files.
+        backend (str): Optional; "sqlite" or "json".
+
+    Returns:
+        store (Store): The opened store.
+    """
+
+    directory = Path(directory)
+    backend = backend or os.environ.get("MANGA_MANAGER_STORE", "sqlite")
+    if backend not in STORES:
+        raise ValueError(f"Unknown store backend: {backend}")
+    path = directory / STORE_FILES[backend]
+
+    legacy = directory / STORE_FILES["json"]
+    if backend == "sqlite" and not path.exists() and legacy.exists():
+        # migrate into a temporary database so an interrupted migration is redone
+        partial = path.with_name(path.name + ".part")
+        if partial.exists():
+            os.remove(partial)
+        store = SqliteStore(partial)
+        migrate(JsonStore(legacy), store)
+        store.close()
+        os.replace(partial, path)
+        os.replace(legacy, legacy.with_name(legacy.name + ".bak"))
+    return STORES[backend](path)
@@ -0,0 +1,110 @@
+"""Fuzzy lookup of tracked manga titles.
+
+`TitleIndex` keeps a trigram index of normalized titles. A query only scores
+the titles sharing the most trigrams with it, so a lookup costs a few
+dictionary reads and a handful of `fuzz.ratio` calls however large the
+library is. rapidfuzz is used for the ratios when it is installed.
+"""
+
+import re
+from collections import Counter
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # pragma: no cover
+    from fuzzywuzzy import fuzz
+
+
+def normalize(title):
+    """Lowercases a title and reduces punctuation and whitespace to single spaces"""
+
+    return " ".join(re.sub(r"[^\w]+", " ", title.lower()).split())
+
+
+def trigrams(text):
+    """Returns the set of trigrams of normalized text, padded at both ends"""
+
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Trigram index ranking titles against fuzzy queries"""
+
+    def __init__(self, titles=(), candidates=20):
+        """
+        Args:
+            titles (Iterable(str)): Optional; Titles to index.
+            candidates (int): Optional; Number of titles sharing the most
+                trigrams with a query that are scored. Default is 20.
+        """
+
+        self.candidates = candidates
+        self._titles = {}
+        self._postings = {}
+        for title in titles:
+            self.add(title)
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __contains__(self, title):
+        return title in self._titles
+
+    def add(self, title):
+        """Adds a title to the index"""
+
+        if title in self._titles:
+            return
+        key = normalize(title)
+        self._titles[title] = key
+        for gram in trigrams(key):
+            self._postings.setdefault(gram, set()).add(title)
+
+    def remove(self, title):
+        """Removes a title from the index"""
+
+        key = self._titles.pop(title, None)
+        if key is None:
+            return
+        for gram in trigrams(key):
+            titles = self._postings[gram]
+            titles.discard(title)
+            if not titles:
+                del self._postings[gram]
+
+    def search(self, query, limit=5):
+        """Returns the titles best matching a query.
+
+        Args:
+            query (str): Fuzzy title typed by the user.
+            limit (int): Optional; Number of matches returned. Default is 5.
+
+        Returns:
+            matches (List(Tuple)): (title, score) pairs, best first. Scores are
+                `fuzz.ratio` of the normalized strings, from 0 to 100.
+        """
+
+        query = normalize(query)
+        shared = Counter()
+        for gram in trigrams(query):
+            shared.update(self._postings.get(gram, ()))
+        if shared:
+            candidates = [title for title, _ in shared.most_common(self.candidates)]
+        else:
+            candidates = list(self._titles)
+
+        scored = []
+        for title in candidates:
+            key = self._titles[title]
+            # titles the query is the start of win ties, e.g. "one" -> "One Piece"
+            score = round(fuzz.ratio(query, key))
+            scored.append((score, key.startswith(query), title))
+        scored.sort(key=lambda match: (match[0], match[1]), reverse=True)
+        return [(title, score) for score, _, title in scored[:limit]]
+
+    def best(self, query):
+        """Returns the title best matching a query, or None if the index is empty"""
+
+        matches = self.search(query, limit=1)
+        return matches[0][0] if matches else None
@@ -1,21 +1,58 @@
+import os
 import re
 from argparse import ArgumentParser
+from pathlib import Path
+
+
+def library_dir():
+    """Returns the directory holding the library files.
+
+    Set with the MANGA_MANAGER_HOME environment variable; defaults to the
+    package directory.
+    """
+    return Path(os.environ.get("MANGA_MANAGER_HOME", Path(__file__).parent))
 
 
 def argument_parser():
     parser = ArgumentParser()
-    parser.add_argument("action", choices=["add", "remove", "edit", "read", "list", "quit"])
+    parser.add_argument(
+        "action",
+        choices=[
+            "add",
+            "remove",
+            "edit",
+            "read",
+            "list",
+            "sync",
+            "config",
+            "stats",
+            "daemon",
+            "quit",
+        ],
+    )
     parser.add_argument("title", nargs="*")
     parser.add_argument("-c", "--chapters", required=False)
     parser.add_argument(
         "-dm", "--download_mode", choices=["dynamic", "all", "none"], default="dynamic"
     )
     parser.add_argument("-p", "--provider", default="Mangakakalot")
+    parser.add_argument(
+        "-e", "--engine", choices=["threads", "asyncio"], default="threads"
+    )
+    parser.add_argument("-f", "--format", choices=["pdf", "cbz"], default="pdf")
+    parser.add_argument("-s", "--serve", action="store_true")
+    parser.add_argument("-w", "--workers", type=int, default=8)
+    parser.add_argument("--per_host", type=int, required=False)
+    parser.add_argument("-r", "--rate", type=float, required=False)
+    parser.add_argument("--trace", nargs="?", const="", required=False)
+    parser.add_argument("--metrics_port", type=int, required=False)
+    parser.add_argument("-i", "--interval", type=float, default=60)
+    parser.add_argument("--once", action="store_true")
     return parser
 
 
 def clean_text(chapter_name):
     return re.sub(" +", " ", re.sub("\n", "", chapter_name)).strip()
 
-def chapter_filename(chapter_name):
-    return re.sub(' ', '-', re.sub('[^a-zA-Z0-9 ]', '', clean_text(chapter_name)))[:240] + ".pdf"
+def chapter_filename(chapter_name, extension="pdf"):
+    return re.sub(' ', '-', re.sub('[^a-zA-Z0-9 ]', '', clean_text(chapter_name)))[:240] + "." + extension
@@ -17,6 +17,12 @@ requirements = [
     'pillow'
 ]
 
+extras_requirements = {
+    'async': ['aiohttp'],
+    'fast': ['selectolax', 'rapidfuzz'],
+    'avif': ['pillow-avif-plugin'],
+}
+
 setup_requirements = [ ]
 
 test_requirements = [ ]
@@ -41,8 +47,12 @@ setup(
         'console_scripts': [
             'manga=manga_manager.cli:main',
         ],
+        'manga_manager.providers': [
+            'Mangakakalot=manga_manager.provider.mangakakalot:Mangakakalot',
+        ],
     },
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
@@ -0,0 +1,40 @@
+"""Helpers shared by the tests."""
+
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+
+def jpeg(shade):
+    """Returns a small gray JPEG image"""
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (shade, shade, shade)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that does not log requests"""
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(test, handler):
+    """Serves a request handler on a free local port until a test ends.
+
+    Args:
+        test (unittest.TestCase): Test the server is stopped after.
+        handler (type): Request handler class.
+
+    Returns:
+        base (str): URL of the server, without a trailing slash.
+    """
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return f"http://127.0.0.1:{server.server_port}"
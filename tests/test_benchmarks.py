@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+"""Smoke tests for the offline benchmark harness."""
+
+
+import unittest
+import urllib.request
+
+from benchmarks import run, startup
+from benchmarks.fakecdn import FakeSite
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Tests for `benchmarks`."""
+
+    def test_000_fake_site(self):
+        """The fake site serves chapter pages pointing at its own CDN."""
+        with FakeSite(image_size=(40, 60), pages=3) as site:
+            html = urllib.request.urlopen(f"{site.url}/chapter/x/1").read().decode()
+            self.assertEqual(html.count(f"{site.url}/cdn/"), 3)
+            image = urllib.request.urlopen(f"{site.url}/cdn/a.jpg").read()
+            self.assertEqual(image, site.image)
+
+    def test_001_run(self):
+        """Every benchmark completes against the fake site."""
+        results = run.run(chapters=2, pages=2, image_size=(40, 60), latency=0, repeat=1)
+        self.assertEqual([r["benchmark"] for r in results], run.BENCHMARKS)
+        for result in results:
+            self.assertNotIn("error", result)
+        self.assertEqual(run.compare(results, results, 0.25), [])
+
+    def test_002_startup(self):
+        """Quick CLI commands start without errors."""
+        results = startup.run(repeat=1, series=5, chapters=10)
+        self.assertEqual([r["command"] for r in results], list(startup.COMMANDS))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.cbz` module."""
+
+
+import io
+import unittest
+import zipfile
+
+from manga_manager.cbz import CbzWriter, image_extension
+
+
+class TestCbz(unittest.TestCase):
+    """Tests for `CbzWriter`."""
+
+    def test_000_image_extension(self):
+        """Page extensions are detected from the image signature."""
+        self.assertEqual(image_extension(b"\xff\xd8\xff\xe0rest"), "jpg")
+        self.assertEqual(image_extension(b"\x89PNG\r\n\x1a\nrest"), "png")
+        self.assertEqual(image_extension(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "webp")
+        self.assertEqual(image_extension(b"GIF89a"), "gif")
+
+    def test_001_writer(self):
+        """Pages are stored uncompressed, in order and unchanged."""
+        file = io.BytesIO()
+        with CbzWriter(file) as writer:
+            writer.add_page(b"\xff\xd8\xff first")
+            writer.add_page(b"\x89PNG\r\n\x1a\n second")
+            self.assertEqual(writer.page_count, 2)
+        with zipfile.ZipFile(file) as archive:
+            self.assertEqual(archive.namelist(), ["0001.jpg", "0002.png"])
+            self.assertEqual(archive.read("0002.png"), b"\x89PNG\r\n\x1a\n second")
+            self.assertEqual(archive.getinfo("0001.jpg").compress_type, zipfile.ZIP_STORED)
+
+    def test_002_empty(self):
+        """A CBZ without pages is refused."""
+        with self.assertRaises(ValueError):
+            CbzWriter(io.BytesIO()).close()
+
+
+if __name__ == "__main__":
+    unittest.main()
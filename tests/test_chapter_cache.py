@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.chapter_cache` module."""
+
+
+import os
+import tempfile
+import unittest
+
+from manga_manager.chapter_cache import ChapterCache, parse_size
+
+
+class TestChapterCache(unittest.TestCase):
+    """Tests for `ChapterCache`."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _chapter(self, name, size=100, read=False):
+        path = os.path.join(self.tmp.name, f"{name}.pdf")
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+        return {"name": name, "link": name, "path": path, "read": read}
+
+    def test_000_parse_size(self):
+        """Sizes with unit suffixes are parsed into bytes."""
+        self.assertEqual(parse_size("512"), 512)
+        self.assertEqual(parse_size("2K"), 2048)
+        self.assertEqual(parse_size("1.5mb"), 1572864)
+        self.assertEqual(parse_size("2G"), 2 * 1024 ** 3)
+        for text in ("lots", "", "-1M"):
+            with self.assertRaises(ValueError):
+                parse_size(text)
+
+    def test_001_bookkeeping(self):
+        """Chapters are tracked per manga with their total size."""
+        cache = ChapterCache()
+        first, second = self._chapter("1"), self._chapter("2", size=50)
+        cache.add("A", first)
+        cache.add("B", second)
+        cache.add("A", first)
+        self.assertEqual(cache.size, 150)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.resident("A"), ["1"])
+        cache.discard_manga("A")
+        self.assertEqual(cache.size, 50)
+        self.assertEqual(cache.resident("A"), [])
+        self.assertEqual(cache.evict(), [])
+
+    def test_002_evicts_read_then_least_recently_used(self):
+        """Read chapters are evicted before unread ones, oldest first."""
+        cache = ChapterCache(quota=250)
+        chapters = [self._chapter(str(i)) for i in range(4)]
+        for chapter in chapters:
+            cache.add("A", chapter)
+        cache.touch("A", chapters[0])
+        chapters[2]["read"] = True
+        cache.touch("A", chapters[2])
+
+        self.assertEqual(cache.evict(), [("A", "2"), ("A", "1")])
+        self.assertEqual(cache.size, 200)
+        self.assertEqual(chapters[2]["path"], "")
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "1.pdf")))
+        self.assertEqual(sorted(cache.resident("A")), ["0", "3"])
+
+    def test_003_protected(self):
+        """Protected chapters stay on disk even over the quota."""
+        cache = ChapterCache(quota=100)
+        for name in ("1", "2"):
+            cache.add("A", self._chapter(name))
+        self.assertEqual(cache.evict({("A", "1"), ("A", "2")}), [])
+        self.assertEqual(cache.evict({("A", "1")}), [("A", "2")])
+
+    def test_004_from_library(self):
+        """The cache is rebuilt from the chapters with a path, dropping missing files."""
+        present, missing = self._chapter("1"), self._chapter("2")
+        os.remove(missing["path"])
+        config = {
+            "manga": {
+                "A": {
+                    "name": "A",
+                    "chapters": [present, missing, {"name": "3", "path": "", "read": False}],
+                }
+            }
+        }
+        cache = ChapterCache.from_library(config, quota=1000)
+        self.assertEqual(cache.resident("A"), ["1"])
+        self.assertEqual(missing["path"], "")
+        self.assertEqual(cache.quota, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
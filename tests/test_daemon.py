@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.daemon` module."""
+
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from manga_manager import daemon
+from manga_manager import manga_manager as mm
+from manga_manager.provider import registry
+from manga_manager.provider.provider import Provider
+from manga_manager.store import open_store
+
+
+class _Updating(Provider):
+    name = "Updating"
+    checks = []
+    during_check = None
+
+    def new_chapters(self, manga_link, known_links):
+        self.checks.append(manga_link)
+        if self.during_check is not None and manga_link == "/slow":
+            self.during_check()
+        if manga_link == "/fast":
+            return [["3", "/fast/3"], ["4", "/fast/4"]]
+        return []
+
+
+class TestUpdateSchedule(unittest.TestCase):
+    """Tests for `UpdateSchedule`."""
+
+    def test_000_adaptive_intervals(self):
+        """Series with new chapters are checked sooner, with jitter."""
+        schedule = daemon.UpdateSchedule({}, interval=1000, min_interval=300, jitter=0.1)
+        self.assertEqual(schedule.due(["slow", "fast"], now=0), ["slow", "fast"])
+        schedule.checked("fast", 2, now=0)
+        schedule.checked("slow", 0, now=0)
+        schedule.checked("failed", None, now=0)
+        self.assertEqual(schedule.state["fast"]["interval"], 500)
+        self.assertEqual(schedule.state["slow"]["interval"], 1500)
+        self.assertEqual(schedule.state["failed"]["interval"], 1000)
+        self.assertTrue(450 <= schedule.state["fast"]["next_check"] <= 550)
+
+        self.assertEqual(schedule.due(["slow", "fast", "failed"], now=600), ["fast"])
+        self.assertEqual(
+            schedule.due(["slow", "fast", "failed"], now=2000), ["fast", "failed", "slow"]
+        )
+        schedule.forget(["fast"])
+        self.assertEqual(list(schedule.state), ["fast"])
+
+
+class TestDaemon(unittest.TestCase):
+    """Tests for `Daemon` update cycles."""
+
+    def setUp(self):
+        """Track two manga in a temporary library."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        patch = mock.patch.dict(os.environ, {"MANGA_MANAGER_HOME": self.directory.name})
+        patch.start()
+        self.addCleanup(patch.stop)
+        saved = (mm._store, mm._library, mm._chapter_cache, mm._title_index)
+        self.addCleanup(self._restore, saved, dict(registry._classes))
+        mm._store = mm._library = mm._chapter_cache = mm._title_index = None
+        registry.register(_Updating)
+        _Updating.checks, _Updating.during_check = [], None
+
+        chapter = {"name": "1", "link": "/1", "path": "", "read": False}
+        for name in ("Fast", "Slow"):
+            mm._config()["manga"][name] = {
+                "name": name,
+                "link": f"/{name.lower()}",
+                "authors": "",
+                "download_mode": "none",
+                "provider": "Updating",
+                "current_chapter": 0,
+                "chapters": [dict(chapter)],
+            }
+        mm.save()
+
+    def _restore(self, saved, classes):
+        if mm._store is not None:
+            mm._store.close()
+        mm._store, mm._library, mm._chapter_cache, mm._title_index = saved
+        registry._classes = classes
+        registry._instances.pop("Updating", None)
+
+    def test_000_run_once(self):
+        """A cycle stores new chapters and the schedule in the library."""
+        cycle = daemon.Daemon(verbose=False)
+        cycle.run_once()
+        self.assertEqual(sorted(_Updating.checks), ["/fast", "/slow"])
+
+        library = open_store(self.directory.name).load()
+        chapters = [c["name"] for c in library["manga"]["Fast"]["chapters"]]
+        self.assertEqual(chapters, ["1", "3", "4"])
+        self.assertEqual(library["updates"]["Fast"]["unseen"], 2)
+        self.assertTrue(daemon.running(library))
+
+        cycle.run_once()
+        self.assertEqual(len(_Updating.checks), 2)
+
+    def test_001_concurrent_changes(self):
+        """Changes saved by other commands during a cycle are kept."""
+
+        def read_elsewhere():
+            store = open_store(self.directory.name)
+            library = store.load()
+            library["manga"]["Fast"]["chapters"][0]["read"] = True
+            library["manga"]["Fast"]["current_chapter"] = 1
+            store.save(library)
+            store.close()
+
+        _Updating.during_check = staticmethod(read_elsewhere)
+        daemon.Daemon(verbose=False).run_once()
+        fast = open_store(self.directory.name).load()["manga"]["Fast"]
+        self.assertTrue(fast["chapters"][0]["read"])
+        self.assertEqual(fast["current_chapter"], 1)
+        self.assertEqual([c["name"] for c in fast["chapters"]], ["1", "3", "4"])
+        self.assertIn(("Fast", "3"), mm._reading_chapters({"manga": {"Fast": fast}}))
+
+    def test_002_heartbeat_during_cycle(self):
+        """A long cycle keeps the heartbeat fresh."""
+        heartbeats = []
+
+        def slow_check():
+            time.sleep(0.3)
+            heartbeats.append(open_store(self.directory.name).load()["daemon"]["heartbeat"])
+
+        _Updating.during_check = staticmethod(slow_check)
+        start = time.time()
+        with mock.patch.object(daemon, "HEARTBEAT", 0.05):
+            daemon.Daemon(verbose=False).run_once()
+        self.assertGreater(heartbeats[0], start + 0.1)
+
+    def test_003_startup_without_network(self):
+        """Startup shows the daemon's counts without checking any manga."""
+        daemon.Daemon(verbose=False).run_once()
+        _Updating.checks = []
+        mm._library = None
+        self.assertEqual(mm.updates(), {"Fast": 2})
+        self.assertEqual(mm.updates(), {})
+        self.assertEqual(_Updating.checks, [])
+
+        mm._config()["daemon"]["heartbeat"] = time.time() - 10 * daemon.HEARTBEAT
+        mm.updates()
+        self.assertEqual(sorted(_Updating.checks), ["/fast", "/slow"])
+
+
+if __name__ == "__main__":
+    unittest.main()
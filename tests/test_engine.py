@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.provider.engine` module."""
+
+
+import re
+import tempfile
+import threading
+import unittest
+import zipfile
+from unittest import mock
+from pathlib import Path
+
+from manga_manager import metrics
+from manga_manager.provider import engine
+from manga_manager.provider.journal import IncompleteChapterError
+from manga_manager.provider.progress import Progress
+from manga_manager.provider.provider import Provider
+from tests.helpers import QuietHandler, jpeg, serve
+
+
+class _Handler(QuietHandler):
+    failing = set()
+    missing = set()
+    requested = []
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        if self.path in self.failing or self.path in self.missing:
+            self.send_error(500 if self.path in self.failing else 404)
+            return
+        if self.path.startswith("/chapter/"):
+            body = "".join(
+                f'<img class="img-loading" data-src="/image/{i}.jpg">' for i in range(7)
+            ).encode()
+        elif self.path.startswith("/image/"):
+            body = jpeg(int(re.sub("[^0-9]", "", self.path)) * 30)
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _LocalProvider(Provider):
+    name = "Local"
+    cache_path = None
+
+    def __init__(self, directory, base, **kwargs):
+        super().__init__(**kwargs)
+        self.download_dir = directory
+        self.base = base
+
+    def parse_image_links(self, html):
+        return [self.base + link for link in re.findall('data-src="([^"]+)"', html)]
+
+
+class _ServerTestCase(unittest.TestCase):
+    """Base class for tests against a local chapter server."""
+
+    def setUp(self):
+        """Start a local server and a provider pointing at it."""
+        self.base = serve(self, _Handler)
+        _Handler.failing, _Handler.missing, _Handler.requested = set(), set(), []
+        self.directory = tempfile.TemporaryDirectory()
+        self.provider = _LocalProvider(self.directory.name, self.base, max_retries=0)
+        self.chapters = [
+            {"name": f"Chapter {i}", "link": f"{self.base}/chapter/{i}"}
+            for i in range(3)
+        ]
+        self.chapters.append({"name": "Missing", "link": f"{self.base}/missing"})
+
+    def tearDown(self):
+        """Remove downloads."""
+        self.provider.close()
+        self.directory.cleanup()
+
+    def _check_progress(self, progress, events):
+        self.assertEqual(
+            progress.snapshot(),
+            {
+                "chapters_total": 4,
+                "chapters": 3,
+                "failed": 1,
+                "pages": 21,
+                "bytes": sum(len(jpeg(i * 30)) for i in range(7)) * 3,
+            },
+        )
+        self.assertEqual(events.count("chapter"), 3)
+        self.assertEqual(events.count("failed"), 1)
+        self.assertEqual(events.count("page"), 21)
+
+    def _check(self, paths):
+        self.assertEqual(sorted(paths), ["Chapter 0", "Chapter 1", "Chapter 2"])
+        for path in paths.values():
+            pdf = Path(path).read_bytes()
+            self.assertIn(b"/Count 7", pdf)
+            self.assertFalse(Path(path + ".part").exists())
+
+
+class TestAsyncDownloader(_ServerTestCase):
+    """Tests for `AsyncDownloader`."""
+
+    def test_000_download(self):
+        """Chapters are downloaded and failures are skipped."""
+        progress, events = Progress(), []
+        progress.subscribe(lambda event, progress, **details: events.append(event))
+        downloader = engine.AsyncDownloader(self.provider, max_chapters=2)
+        self._check(downloader.run("Test", self.chapters, False, progress))
+        self._check_progress(progress, events)
+
+    def test_001_engine_per_call(self):
+        """The engine is chosen per download without changing the provider."""
+        download_async = self.provider.download_async
+        with mock.patch.object(self.provider, "download_async", wraps=download_async) as run:
+            self._check(self.provider.download("Test", self.chapters, False, engine="asyncio"))
+        run.assert_called_once()
+        self.assertEqual(self.provider.engine, "threads")
+
+    def test_002_cached_chapter_pages(self):
+        """Chapter pages go through the provider's response cache."""
+        self.provider.cache_path = Path(self.directory.name) / "cache.db"
+        self.provider.page_store_size = 0
+        chapters = self.chapters[:1]
+        engine.AsyncDownloader(self.provider).run("Test", chapters, False)
+        engine.AsyncDownloader(self.provider).run("Test", chapters, False)
+        self.assertEqual(_Handler.requested.count("/chapter/0"), 1)
+        self.assertEqual(_Handler.requested.count("/image/0.jpg"), 2)
+
+    @unittest.skipIf(engine.aiohttp is None, "aiohttp is not installed")
+    def test_003_retry_statuses(self):
+        """Only server errors in `retry_statuses` are retried."""
+        provider = _LocalProvider(self.directory.name, self.base, max_retries=2)
+        provider.backoff_factor, provider.page_retries = 0, 0
+        _Handler.failing, _Handler.missing = {"/image/3.jpg"}, {"/image/5.jpg"}
+        recorder = metrics.enable()
+        try:
+            engine.AsyncDownloader(provider).run("Test", self.chapters[:1], False)
+        finally:
+            metrics.disable()
+            provider.close()
+        self.assertEqual(_Handler.requested.count("/image/3.jpg"), 3)
+        self.assertEqual(_Handler.requested.count("/image/5.jpg"), 1)
+        text = recorder.prometheus()
+        self.assertIn('status="500"} 3\n', text)
+        self.assertIn('status="404"} 1\n', text)
+
+    def test_004_download_without_aiohttp(self):
+        """The requests session is used when aiohttp is unavailable."""
+        aiohttp, engine.aiohttp = engine.aiohttp, None
+        try:
+            downloader = engine.AsyncDownloader(self.provider)
+            self._check(downloader.run("Test", self.chapters, verbose=False))
+        finally:
+            engine.aiohttp = aiohttp
+
+
+class TestThreadedDownload(_ServerTestCase):
+    """Tests for the threaded `Provider.download` pipeline."""
+
+    def test_000_download(self):
+        """Chapters are resolved and downloaded through a bounded queue."""
+        progress, events = Progress(), []
+        progress.subscribe(lambda event, progress, **details: events.append(event))
+        paths = self.provider.download(
+            "Test",
+            self.chapters,
+            verbose=False,
+            resolvers=2,
+            workers=2,
+            queue_size=1,
+            progress=progress,
+        )
+        self._check(paths)
+        self._check_progress(progress, events)
+
+    def test_001_cbz(self):
+        """CBZ chapters hold the downloaded images byte for byte."""
+        paths = self.provider.download(
+            "Test", self.chapters[:1], verbose=False, output_format="cbz"
+        )
+        path = paths["Chapter 0"]
+        self.assertTrue(path.endswith(".cbz"))
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(len(archive.namelist()), 7)
+            self.assertEqual(archive.read("0003.jpg"), jpeg(60))
+            self.assertTrue(
+                all(i.compress_type == zipfile.ZIP_STORED for i in archive.infolist())
+            )
+
+
+class TestResume(_ServerTestCase):
+    """Tests for resumable chapter downloads."""
+
+    def test_000_resume(self):
+        """Failed pages keep the chapter staged and are fetched on retry."""
+        self.provider.page_retries = 0
+        links = self.provider.image_links(self.chapters[0]["link"])
+        _Handler.failing = {"/image/3.jpg"}
+        with self.assertRaises(IncompleteChapterError) as context:
+            self.provider.manga2pdf(links, "Test", "Chapter 0")
+        self.assertEqual(context.exception.missing, [3])
+        self.assertFalse(self.provider._chapter_path("Test", "Chapter 0").exists())
+
+        _Handler.failing, _Handler.requested = set(), []
+        path = self.provider.manga2pdf(links, "Test", "Chapter 0")
+        self.assertEqual(_Handler.requested, ["/image/3.jpg"])
+        self.assertIn(b"/Count 7", path.read_bytes())
+        self.assertFalse((path.parent / ".staging" / "Chapter-0").exists())
+
+
+class TestPageStore(_ServerTestCase):
+    """Tests for downloads through the content-addressed page store."""
+
+    def test_000_shared_images(self):
+        """Images shared by chapters are downloaded once."""
+        self.provider.download("Test", self.chapters[:2], verbose=False)
+        images = [path for path in _Handler.requested if path.startswith("/image/")]
+        self.assertEqual(sorted(images), [f"/image/{i}.jpg" for i in range(7)])
+
+    def test_001_repackage(self):
+        """Downloaded chapters are written in another format without requests."""
+        self.provider.download("Test", self.chapters[:1], verbose=False)
+        _Handler.requested = []
+        path = self.provider.repackage("Test", "Chapter 0", output_format="cbz")
+        self.assertEqual(_Handler.requested, [])
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.read("0003.jpg"), jpeg(60))
+        self.assertIsNone(self.provider.repackage("Test", "Chapter 1"))
+
+    def test_002_in_flight_links(self):
+        """A link is fetched once at a time without holding up other links."""
+        links = [f"{self.base}/image/1.jpg", f"{self.base}/image/2.jpg"]
+        first = self.provider._journal("Test", "First", links)
+        second = self.provider._journal("Test", "Second", links)
+        started, release, fetched = threading.Event(), threading.Event(), []
+        download_image = self.provider._download_image
+
+        def slow_download(link, rate_limiter=None):
+            fetched.append(link)
+            if link == links[0]:
+                started.set()
+                release.wait(5)
+            return download_image(link)
+
+        with mock.patch.object(self.provider, "_download_image", slow_download):
+            threads = [
+                threading.Thread(target=self.provider._fetch_page, args=(journal, 0))
+                for journal in (first, second)
+            ]
+            threads[0].start()
+            started.wait(5)
+            threads[1].start()
+            self.provider._fetch_page(first, 1)
+            self.assertEqual(fetched, links)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(fetched, links)
+        self.assertEqual(second.page_path(0).read_bytes(), jpeg(30))
+        self.assertEqual(self.provider._in_flight, {})
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.imaging` module."""
+
+
+import io
+import tempfile
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import Image
+
+from manga_manager.imaging import (
+    LOOKAHEAD,
+    active,
+    pipelined,
+    postprocess,
+    processed_pages,
+)
+from manga_manager.pdf import page_image
+
+
+def _png(size=(400, 200)):
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, (200, 40, 40, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestImaging(unittest.TestCase):
+    """Tests for page post-processing."""
+
+    def test_000_active(self):
+        """Only options that change pages trigger post-processing."""
+        self.assertFalse(active(None))
+        self.assertFalse(
+            active({"max_width": None, "grayscale": False, "image_format": "jpeg"})
+        )
+        self.assertTrue(active({"max_width": 800}))
+        self.assertTrue(active({"image_format": "webp"}))
+
+    def test_001_postprocess(self):
+        """Pages are scaled down, converted to grayscale and re-encoded."""
+        data = postprocess(_png(), max_width=100, grayscale=True)
+        im = Image.open(io.BytesIO(data))
+        self.assertEqual((im.format, im.mode, im.size), ("JPEG", "L", (100, 50)))
+
+        webp = Image.open(io.BytesIO(postprocess(_png(), image_format="webp")))
+        self.assertEqual((webp.format, webp.size), ("WEBP", (400, 200)))
+
+        small = postprocess(_png((50, 80)), max_width=100)
+        self.assertEqual(Image.open(io.BytesIO(small)).size, (50, 80))
+
+    def test_002_pdf_pages_are_jpeg(self):
+        """PDF pages are encoded as JPEGs whatever the image format option."""
+        options = {"grayscale": True, "quality": 60, "image_format": "webp"}
+        jpeg, width, height, colorspace = page_image(_png(), options)
+        self.assertEqual(Image.open(io.BytesIO(jpeg)).format, "JPEG")
+        self.assertEqual((width, height, colorspace), (400, 200, b"/DeviceGray"))
+
+        panel = page_image(_png(), None)[0]
+        self.assertIs(page_image(panel, {"image_format": "webp"})[0], panel)
+
+    def test_003_processed_pages(self):
+        """Pages are processed in worker processes, or read unchanged without options."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "0000"
+            path.write_bytes(_png())
+            self.assertEqual(list(processed_pages([path])), [_png()])
+            pooled = list(processed_pages([path, path], 2, {"max_width": 200}))
+            inline = list(processed_pages([path, path], 0, {"max_width": 200}))
+        self.assertEqual(pooled, inline)
+        self.assertEqual(Image.open(io.BytesIO(pooled[0])).size, (200, 100))
+
+
+    def test_004_bounded_lookahead(self):
+        """Only a few futures, and no finished pages, are held ahead."""
+        produced = []
+
+        def pages(finished):
+            for i in range(100):
+                produced.append(i)
+                if finished:
+                    yield i
+                else:
+                    future = Future()
+                    future.set_result(i)
+                    yield future
+
+        for finished in (True, False):
+            produced.clear()
+            for i, page in enumerate(pipelined(pages(finished), processes=64)):
+                self.assertEqual(page, i)
+                ahead = len(produced) - i - 1
+                self.assertLessEqual(ahead, 0 if finished else LOOKAHEAD)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.provider.mangakakalot` module."""
+
+
+import unittest
+from pathlib import Path
+
+from manga_manager.provider import parsing
+from manga_manager.provider.mangakakalot import Mangakakalot
+
+FIXTURES = Path(__file__).parent / "fixtures" / "mangakakalot"
+PAGES = {
+    "search": "search.html",
+    "chapter_list": "manga.html",
+    "chapter": "chapter.html",
+}
+
+
+class TestMangakakalot(unittest.TestCase):
+    """Tests for `Mangakakalot` against recorded pages."""
+
+    def setUp(self):
+        """Serve fixture pages instead of requesting them."""
+        self.provider = Mangakakalot()
+        self.provider._get_text = lambda url, kind, rate_limiter=None: (
+            FIXTURES / PAGES[kind]
+        ).read_text()
+        self.parser = parsing.PARSER
+
+    def tearDown(self):
+        """Restore the default parser."""
+        parsing.PARSER = self.parser
+
+    def _check_parser(self, parser):
+        parsing.PARSER = parser
+
+        results, pages = self.provider.search("attack on titan")
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(results), 20)
+        self.assertEqual(
+            results[0],
+            {
+                "title": "Attack On Titan",
+                "link": "https://ww.mangakakalot.tv/manga/manga-aa951409",
+                "authors": "Author(s) : Isayama Hajime",
+                "updates": "Updated : Apr-09-2021 05:37",
+            },
+        )
+
+        chapters = self.provider.chapter_list("manga")
+        self.assertEqual(len(chapters), 300)
+        self.assertEqual(
+            chapters[0],
+            [
+                "Vol.1 Chapter 1: The Walls Part 1",
+                "https://ww.mangakakalot.tv/chapter/manga-aa951409/chapter-1",
+            ],
+        )
+        new = self.provider.new_chapters("manga", {chapters[-3][1]})
+        self.assertEqual(new, chapters[-2:])
+
+        links = self.provider.image_links("chapter")
+        self.assertEqual(len(links), 45)
+        self.assertTrue(all(link.startswith("https://cm.blazefast.co/") for link in links))
+
+    def test_000_parsers(self):
+        """Every available parser extracts the same data."""
+        for parser in parsing.available_parsers():
+            with self.subTest(parser=parser):
+                self._check_parser(parser)
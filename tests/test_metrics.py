@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.metrics` module."""
+
+
+import json
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from manga_manager import metrics
+from manga_manager.provider.provider import Provider
+from manga_manager.provider.ratelimit import HostLimiter
+from tests.helpers import QuietHandler, serve
+
+
+class _Handler(QuietHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+        self.wfile.write(b"image")
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for spans, counters and their exports."""
+
+    def setUp(self):
+        """Enable metrics with a trace in a temporary directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.trace = Path(self.directory.name) / "trace.jsonl"
+        self.recorder = metrics.enable(trace_path=self.trace, port=0)
+        self.addCleanup(metrics.disable)
+
+    def test_000_disabled(self):
+        """Nothing is recorded while metrics are off."""
+        metrics.disable()
+        self.assertFalse(metrics.enabled())
+        with metrics.span("page"):
+            pass
+        self.assertEqual(list(metrics.timed([1, 2], "encode")), [1, 2])
+        self.assertEqual(self.trace.read_text(), "")
+
+    def test_001_trace_summary(self):
+        """Spans are written to the trace and summarized as percentiles."""
+        for ms in range(1, 101):
+            metrics.record("request", ms / 1000, host="a.example")
+        with metrics.span("page", chapter="1"):
+            pass
+        self.assertEqual(list(metrics.timed(iter([1, 2]), "encode", chapter="1")), [1, 2])
+        metrics.disable()
+
+        events = [json.loads(line) for line in self.trace.read_text().splitlines()]
+        self.assertEqual(len(events), 102)
+        self.assertEqual(events[-2]["chapter"], "1")
+        rows = {row["span"]: row for row in metrics.summary(self.trace)}
+        self.assertEqual(set(rows), {"request", "page", "encode"})
+        request = rows["request"]
+        self.assertEqual((request["host"], request["count"]), ("a.example", 100))
+        self.assertAlmostEqual(request["p50_ms"], 50)
+        self.assertAlmostEqual(request["p95_ms"], 95)
+
+    def test_002_provider_requests(self):
+        """Provider requests are timed per host and exported for Prometheus."""
+        base = serve(self, _Handler)
+        provider = Provider()
+        provider.host_limiter = HostLimiter()
+        self.addCleanup(provider.close)
+        url = base + "/image.jpg"
+        for _ in range(3):
+            provider._get(url)
+
+        host = urlsplit(base).netloc
+        endpoint = f"http://127.0.0.1:{self.recorder._server.server_port}/metrics"
+        with urllib.request.urlopen(endpoint) as response:
+            text = response.read().decode()
+        self.assertIn(
+            f'manga_manager_span_seconds_count{{host="{host}",span="request"}} 3', text
+        )
+        self.assertIn(f'manga_manager_requests_total{{host="{host}",status="200"}} 3', text)
+        self.assertIn(f'manga_manager_bytes_total{{host="{host}"}} 15', text)
+
+    def test_003_counter_precision(self):
+        """Counters are exported without rounding."""
+        metrics.count("bytes", 123456789, host="a.example")
+        metrics.count("waited", 0.1)
+        metrics.count("waited", 0.2)
+        text = self.recorder.prometheus()
+        self.assertIn('manga_manager_bytes_total{host="a.example"} 123456789\n', text)
+        self.assertIn(f"manga_manager_waited_total {0.1 + 0.2!r}\n", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.provider.pages` module."""
+
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from manga_manager.provider.pages import PageStore
+
+
+class TestPageStore(unittest.TestCase):
+    """Tests for `PageStore`."""
+
+    def setUp(self):
+        """Create a temporary page store."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = PageStore(Path(self.directory.name), max_bytes=10)
+
+    def test_000_deduplication(self):
+        """Identical images are stored once and found by every URL."""
+        digest = self.store.put(b"credit", "https://a/credit.jpg")
+        self.assertEqual(self.store.put(b"credit", "https://b/credit.jpg"), digest)
+        self.assertEqual(self.store.lookup("https://b/credit.jpg"), digest)
+        self.assertIsNone(self.store.lookup("https://c/credit.jpg"))
+        self.assertEqual(self.store.size, 6)
+        self.assertEqual(self.store.object_path(digest).read_bytes(), b"credit")
+
+    def test_001_manifests(self):
+        """Manifests resolve to image paths until an image is evicted."""
+        first, second = self.store.put(b"aaaa", "a"), self.store.put(b"bbbb", "b")
+        self.store.set_manifest("Test", "1", [first, second, first])
+        paths = self.store.manifest("Test", "1")
+        self.assertEqual([p.read_bytes() for p in paths], [b"aaaa", b"bbbb", b"aaaa"])
+
+        changes = self.store._connection.total_changes
+        self.store.lookup("b")
+        self.assertEqual(self.store._connection.total_changes, changes)
+        self.store.put(b"cccc", "c")
+        self.assertIsNone(self.store.lookup("a"))
+        self.assertFalse(self.store.object_path(first).exists())
+        self.assertIsNone(self.store.manifest("Test", "1"))
+        self.assertEqual(self.store.size, 8)
+
+    def test_002_link(self):
+        """Stored images are placed at other paths without changing the original."""
+        digest = self.store.put(b"page")
+        target = Path(self.directory.name) / "0000"
+        self.store.link(digest, target)
+        self.assertEqual(target.read_bytes(), b"page")
+        target.unlink()
+        self.assertTrue(self.store.object_path(digest).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.pdf` module."""
+
+
+import io
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from manga_manager.pdf import PdfWriter, encoded_pages, page_image
+
+
+def _image_bytes(mode, size, fmt):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class TestPdf(unittest.TestCase):
+    """Tests for `PdfWriter`."""
+
+    def test_000_jpeg_passthrough(self):
+        """JPEG pages are embedded without re-encoding."""
+        jpeg = _image_bytes("RGB", (40, 60), "JPEG")
+        data, width, height, colorspace = page_image(jpeg)
+        self.assertIs(data, jpeg)
+        self.assertEqual((width, height, colorspace), (40, 60, b"/DeviceRGB"))
+
+    def test_001_png_transcoded(self):
+        """Non-JPEG pages are converted to RGB JPEGs."""
+        png = _image_bytes("RGBA", (10, 20), "PNG")
+        data, width, height, colorspace = page_image(png)
+        self.assertEqual(Image.open(io.BytesIO(data)).format, "JPEG")
+        self.assertEqual((width, height, colorspace), (10, 20, b"/DeviceRGB"))
+
+    def test_002_writer_structure(self):
+        """Pages are written in order with a valid xref table."""
+        file = io.BytesIO()
+        with PdfWriter(file) as writer:
+            writer.add_page(_image_bytes("RGB", (40, 60), "JPEG"))
+            writer.add_page(_image_bytes("L", (30, 50), "PNG"))
+        pdf = file.getvalue()
+
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertTrue(pdf.endswith(b"%%EOF\n"))
+        self.assertIn(b"/Count 2", pdf)
+        self.assertEqual(
+            re.findall(rb"/MediaBox \[0 0 (\d+) (\d+)\]", pdf),
+            [(b"40", b"60"), (b"30", b"50")],
+        )
+        xref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+        self.assertTrue(pdf[xref:].startswith(b"xref"))
+        offsets = [int(o) for o in re.findall(rb"(\d{10}) 00000 n", pdf[xref:])]
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(pdf[offset:].startswith(b"%d 0 obj" % number))
+
+    def test_003_empty_writer(self):
+        """Closing a writer without pages fails."""
+        with self.assertRaises(ValueError):
+            PdfWriter(io.BytesIO()).close()
+
+    def test_004_encoded_pages(self):
+        """Pages transcoded in worker processes match in-thread transcoding."""
+        images = [
+            _image_bytes("RGB", (40, 60), "JPEG"),
+            _image_bytes("RGBA", (10, 20), "PNG"),
+            _image_bytes("P", (30, 30), "GIF"),
+            _image_bytes("L", (8, 16), "JPEG"),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i, data in enumerate(images):
+                paths.append(Path(directory) / f"{i:04d}")
+                paths[-1].write_bytes(data)
+            pooled = list(encoded_pages(paths, processes=2))
+            inline = list(encoded_pages(paths, processes=0))
+        self.assertEqual(pooled, inline)
+        self.assertEqual(pooled, [page_image(data) for data in images])
+        self.assertIs(type(pooled[0][0]), bytes)
+        self.assertEqual(
+            [page[1:3] for page in pooled], [(40, 60), (10, 20), (30, 30), (8, 16)]
+        )
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.prefetch` module."""
+
+
+import threading
+import time
+import unittest
+
+from manga_manager.prefetch import Prefetcher
+
+
+class _Provider:
+    def __init__(self, delay=0.0, failing=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.downloaded = []
+        self.lock = threading.Lock()
+
+    def download(self, manga_name, chapters, verbose=True):
+        time.sleep(self.delay)
+        chapter = chapters[0]
+        with self.lock:
+            self.downloaded.append(chapter["name"])
+        if chapter["name"] in self.failing:
+            return {}
+        return {chapter["name"]: f"/manga/{chapter['name']}.pdf"}
+
+
+def _manga(count):
+    return {
+        "name": "Test",
+        "chapters": [{"name": str(i), "path": "", "read": False} for i in range(count)],
+    }
+
+
+class TestPrefetcher(unittest.TestCase):
+    """Tests for `Prefetcher`."""
+
+    def test_000_prefetch_ahead(self):
+        """The chapters after the current one are downloaded in the background."""
+        manga = _manga(10)
+        with Prefetcher(_Provider(), manga, window=2) as prefetcher:
+            prefetcher.visit(3)
+            self.assertTrue(prefetcher.wait(3))
+            for index in (2, 4, 5):
+                self.assertTrue(prefetcher.wait(index, timeout=5))
+        self.assertEqual(
+            [c["path"] != "" for c in manga["chapters"]],
+            [False, False, True, True, True, True, False, False, False, False],
+        )
+
+    def test_001_priorities(self):
+        """Nearer chapters come first and the direction is learned."""
+        prefetcher = Prefetcher(_Provider(), _manga(20), window=3)
+        prefetcher.visit(10)
+        self.assertEqual(prefetcher.wanted, [11, 12, 13, 9])
+        prefetcher.visit(9)
+        prefetcher.visit(8)
+        self.assertLess(prefetcher.direction, 0)
+        self.assertEqual(prefetcher.wanted, [7, 6, 5, 9])
+        self.assertEqual(prefetcher.keep(), {5, 6, 7, 8, 9})
+
+    def test_002_adaptive_window(self):
+        """The window grows when downloads are slower than reading."""
+        prefetcher = Prefetcher(_Provider(), _manga(50), window=2, max_window=6)
+        prefetcher.read_time = 1.0
+        prefetcher.download_time = 3.5
+        prefetcher.visit(0)
+        self.assertEqual(prefetcher.window, 5)
+        prefetcher.download_time = 100
+        prefetcher.visit(0)
+        self.assertEqual(prefetcher.window, 6)
+
+    def test_003_failed_download(self):
+        """A failed chapter does not block the reader."""
+        manga = _manga(3)
+        with Prefetcher(_Provider(failing={"1"}), manga) as prefetcher:
+            self.assertFalse(prefetcher.wait(1))
+            self.assertTrue(prefetcher.wait(0))
+
+    def test_004_stop_without_waiting(self):
+        """Stopping does not wait for running downloads, which are still recorded."""
+        manga = _manga(5)
+        prefetcher = Prefetcher(_Provider(delay=0.5), manga, window=1).start()
+        prefetcher.visit(0)
+        time.sleep(0.1)
+        start = time.monotonic()
+        prefetcher.stop()
+        self.assertLess(time.monotonic() - start, 0.3)
+        time.sleep(0.6)
+        self.assertEqual(manga["chapters"][1]["path"], "/manga/1.pdf")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.provider` package."""
+
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from manga_manager.provider.cache import ResponseCache
+from manga_manager.provider.provider import Provider
+
+
+class TestProvider(unittest.TestCase):
+    """Tests for `Provider`."""
+
+    def test_000_session_is_shared(self):
+        """The session is created once and reused."""
+        provider = Provider()
+        self.assertIs(provider.session, provider.session)
+        provider.close()
+
+    def test_001_session_pool_size(self):
+        """The connection pool honours the configured size and retries."""
+        provider = Provider(pool_size=4, max_retries=2)
+        adapter = provider.session.get_adapter("https://example.com")
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertTrue(adapter._pool_block)
+        self.assertEqual(adapter.max_retries.total, 2)
+        provider.close()
+
+    def test_002_new_chapters(self):
+        """Only chapters with unknown links are returned, oldest first."""
+        provider = Provider()
+        provider.chapter_list = lambda link: [["1", "/1"], ["2", "/2"], ["3", "/3"]]
+        self.assertEqual(
+            provider.new_chapters("/manga", {"/1"}), [["2", "/2"], ["3", "/3"]]
+        )
+
+    def test_003_library_paths(self):
+        """Downloads and caches live in the library directory unless overridden."""
+        with mock.patch.dict(os.environ, {"MANGA_MANAGER_HOME": "/library"}):
+            provider = Provider()
+            self.assertEqual(provider.download_dir, Path("/library/manga"))
+            self.assertEqual(provider.cache_path, Path("/library/cache.db"))
+            provider.cache_path = None
+            self.assertIsNone(provider.cache)
+            self.assertEqual(Provider().cache_path, Path("/library/cache.db"))
+
+    def test_004_rate_limiter_per_call(self):
+        """A bucket passed to a request is waited for instead of the provider's."""
+        acquired = []
+        own = SimpleNamespace(acquire=lambda: acquired.append("own"))
+        passed = SimpleNamespace(acquire=lambda: acquired.append("passed"))
+        response = SimpleNamespace(
+            status_code=200, text="", headers={}, raise_for_status=lambda: None
+        )
+        provider = Provider()
+        provider.cache_path = None
+        provider.host_limiter = None
+        provider.rate_limiter = own
+        provider._session = SimpleNamespace(get=lambda url, **kwargs: response)
+        provider.parse_image_links = lambda html: []
+        provider.image_links("/chapter", passed)
+        provider.image_links("/chapter")
+        self.assertEqual(acquired, ["passed", "own"])
+
+
+class TestResponseCache(unittest.TestCase):
+    """Tests for `ResponseCache` and cached provider requests."""
+
+    def setUp(self):
+        """Create a temporary cache."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(Path(self.directory.name) / "cache.db", max_bytes=10)
+
+    def tearDown(self):
+        """Remove the temporary cache."""
+        self.directory.cleanup()
+
+    def test_000_lru_eviction(self):
+        """Least recently used responses are evicted first."""
+        self.cache.put("a", "search", b"aaaa")
+        self.cache.put("b", "search", b"bbbb")
+        self.cache.get("a")
+        self.cache.put("c", "search", b"cccc")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a").body, b"aaaa")
+        self.assertEqual(self.cache.size, 8)
+
+    def test_001_revalidation(self):
+        """Stale pages are revalidated with their ETag."""
+        requests = []
+
+        def get(url, rate_limiter=None, headers=None):
+            requests.append(headers)
+            if headers and headers.get("If-None-Match") == "v1":
+                return SimpleNamespace(status_code=304)
+            return SimpleNamespace(status_code=200, text="page", headers={"ETag": "v1"})
+
+        provider = Provider()
+        provider.cache_path = self.cache.path
+        provider.cache_ttls = {"search": 60, "chapter_list": 0}
+        provider._get = get
+
+        self.assertEqual(provider._get_text("url", "search"), "page")
+        self.assertEqual(provider._get_text("url", "search"), "page")
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(provider._get_text("url", "chapter_list"), "page")
+        self.assertEqual(requests[-1], {"If-None-Match": "v1"})
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.provider.ratelimit` module."""
+
+
+import time
+import unittest
+
+import requests
+
+from manga_manager.provider.provider import Provider
+from manga_manager.provider.ratelimit import (
+    AdaptiveBucket,
+    CircuitBreaker,
+    HostLimiter,
+    HostUnavailableError,
+    retry_after,
+)
+from tests.helpers import QuietHandler, serve
+
+
+class _Handler(QuietHandler):
+    statuses = []
+
+    def do_GET(self):
+        status = self.statuses.pop(0) if self.statuses else 200
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0.3")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+
+class TestAdaptiveLimits(unittest.TestCase):
+    """Tests for `AdaptiveBucket` and `CircuitBreaker`."""
+
+    def test_000_adaptive_rate(self):
+        """The rate grows with successes and halves when throttled."""
+        bucket = AdaptiveBucket(rate=4, max_rate=6)
+        for _ in range(5):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 6)
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 3)
+        bucket.succeeded()
+        self.assertAlmostEqual(bucket.rate, 3 + 1 / 3)
+
+    def test_001_retry_after(self):
+        """Retry-After pauses the bucket and accepts seconds or dates."""
+        self.assertEqual(retry_after("2"), 2.0)
+        self.assertEqual(retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(retry_after("soon"))
+        bucket = AdaptiveBucket(rate=100, burst=10)
+        bucket.throttled(0.5)
+        self.assertGreaterEqual(bucket.reserve(), 0.5)
+
+    def test_002_circuit_breaker(self):
+        """Repeated failures pause a host until a trial request succeeds."""
+        breaker = CircuitBreaker("a.example", threshold=2, cooldown=0.1)
+        breaker.failed()
+        breaker.check()
+        breaker.failed()
+        with self.assertRaises(HostUnavailableError):
+            breaker.check()
+        time.sleep(0.15)
+        breaker.check()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(HostUnavailableError):
+            breaker.check()
+        breaker.succeeded()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_003_lost_trial(self):
+        """A trial request that never reports back does not pause a host forever."""
+        breaker = CircuitBreaker("a.example", threshold=1, cooldown=0.1)
+        breaker.failed()
+        time.sleep(0.15)
+        breaker.check()
+        with self.assertRaises(HostUnavailableError):
+            breaker.check()
+        time.sleep(0.15)
+        breaker.check()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.failed()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(HostUnavailableError) as context:
+            breaker.check()
+        self.assertGreater(context.exception.retry_in, 0.15)
+
+
+class TestProviderLimits(unittest.TestCase):
+    """Tests for host limits on provider requests."""
+
+    def setUp(self):
+        """Start a local server and a provider with its own host limiter."""
+        self.url = serve(self, _Handler) + "/image.jpg"
+        self.provider = Provider(max_retries=0)
+        self.addCleanup(self.provider.close)
+        self.provider.host_limiter = HostLimiter(failure_threshold=2, cooldown=60)
+
+    def test_000_throttling(self):
+        """A 429 is not retried blindly; the next request waits out Retry-After."""
+        _Handler.statuses = [429]
+        with self.assertRaises(requests.HTTPError):
+            self.provider._get(self.url)
+        start = time.monotonic()
+        self.assertEqual(self.provider._get(self.url).content, b"ok")
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+        metrics = self.provider.host_limiter.metrics()
+        host = metrics[self.url.split("/")[2]]
+        self.assertEqual((host["requests"], host["throttled"]), (2, 1))
+        self.assertEqual(host["rate"], 4 + 1 / 4)
+
+    def test_001_failing_host(self):
+        """Requests to a host fail fast once its circuit is open."""
+        _Handler.statuses = [500, 500]
+        for _ in range(2):
+            with self.assertRaises(requests.RequestException):
+                self.provider._get(self.url)
+        with self.assertRaises(HostUnavailableError):
+            self.provider._get(self.url)
+        self.assertEqual(_Handler.statuses, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.reader` module."""
+
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from manga_manager.cbz import CbzWriter
+from manga_manager.pdf import PdfWriter
+from manga_manager.reader import ReaderServer
+from tests.helpers import jpeg
+
+
+class _Provider:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _staging_dir(self, dirname, chapter_name):
+        return self.directory / dirname / ".staging" / chapter_name
+
+
+class TestReaderServer(unittest.TestCase):
+    """Tests for `ReaderServer`."""
+
+    def setUp(self):
+        """Serve a PDF chapter, a CBZ chapter and a chapter still downloading."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        directory = Path(self.tmp.name)
+        self.images = [jpeg(shade) for shade in (0, 60, 120)]
+
+        pdf, cbz = directory / "0.pdf", directory / "1.cbz"
+        for path, writer in ((pdf, PdfWriter), (cbz, CbzWriter)):
+            with open(path, "wb") as file, writer(file) as chapter:
+                for image in self.images:
+                    chapter.add_page(image)
+
+        self.provider = _Provider(directory)
+        self.staging = self.provider._staging_dir("Test", "2")
+        self.staging.mkdir(parents=True)
+        (self.staging / "manifest.json").write_text(json.dumps({"links": ["a", "b"]}))
+        (self.staging / "0000").write_bytes(self.images[0])
+
+        self.manga = {
+            "name": "Test",
+            "current_chapter": 1,
+            "chapters": [
+                {"name": "0", "path": str(pdf), "read": False},
+                {"name": "1", "path": str(cbz), "read": False},
+                {"name": "2", "path": "", "read": False},
+            ],
+        }
+        self.visited, self.read = [], []
+        self.server = ReaderServer(
+            self.manga,
+            self.provider,
+            on_visit=self.visited.append,
+            on_read=self.read.append,
+            page_timeout=2,
+        ).start()
+        self.addCleanup(self.server.close)
+
+    def _get(self, path, headers=None, method="GET"):
+        request = urllib.request.Request(
+            self.server.url + path, headers=headers or {}, method=method
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers, error.read()
+
+    def test_000_finished_chapters(self):
+        """Pages of PDF and CBZ chapters are served unchanged."""
+        for index in (0, 1):
+            info = json.loads(self._get(f"/chapter/{index}.json")[2])
+            self.assertEqual((info["pages"], info["complete"]), (3, True))
+            status, headers, body = self._get(f"/page/{index}/2")
+            self.assertEqual((status, body), (200, self.images[2]))
+            self.assertEqual(headers["Content-Type"], "image/jpeg")
+        self.assertEqual(self._get("/page/0/3")[0], 404)
+
+    def test_001_streaming(self):
+        """Pages of a downloading chapter are served as soon as they arrive."""
+        info = json.loads(self._get("/chapter/2.json")[2])
+        self.assertEqual((info["pages"], info["complete"]), (2, False))
+        self.assertEqual(self._get("/page/2/0")[2], self.images[0])
+
+        def arrive():
+            time.sleep(0.2)
+            (self.staging / "0001").write_bytes(self.images[1])
+
+        threading.Thread(target=arrive).start()
+        status, headers, body = self._get("/page/2/1")
+        self.assertEqual((status, body), (200, self.images[1]))
+        self.assertEqual(headers["Cache-Control"], "no-cache")
+
+    def test_002_ranges_and_etags(self):
+        """Range requests return partial content and ETags revalidate."""
+        status, headers, body = self._get("/page/0/1", {"Range": "bytes=0-9"})
+        self.assertEqual((status, body), (206, self.images[1][:10]))
+        self.assertEqual(headers["Content-Range"], f"bytes 0-9/{len(self.images[1])}")
+        etag = headers["ETag"]
+        self.assertEqual(self._get("/page/0/1", {"If-None-Match": etag})[0], 304)
+
+        whole = Path(self.manga["chapters"][0]["path"]).read_bytes()
+        status, headers, body = self._get("/file/0", {"Range": "bytes=-20"})
+        self.assertEqual((status, body), (206, whole[-20:]))
+        self.assertEqual(headers["Content-Type"], "application/pdf")
+
+    def test_003_progress(self):
+        """Opening and finishing chapters is reported to the callbacks."""
+        status, _, body = self._get("/read/2")
+        self.assertEqual(status, 200)
+        self.assertIn(b"/page/${index}/${shown}", body)
+        self.assertEqual(self._get("/progress/1", method="POST")[0], 204)
+        self.assertEqual((self.visited, self.read), ([2], [1]))
+        self.assertEqual(self._get("/read/9")[0], 404)
+
+    def test_004_missing_pages(self):
+        """Pages that cannot arrive are answered at once."""
+        start = time.monotonic()
+        self.assertEqual(self._get("/page/2/5")[0], 404)
+        Path(self.manga["chapters"][0]["path"]).unlink()
+        self.assertEqual(self._get("/page/0/0")[0], 404)
+        self.assertEqual(self._get("/file/0")[0], 404)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_005_foreign_origin(self):
+        """Progress posted from other sites or host names is rejected."""
+        for headers in (
+            {"Origin": "https://evil.example"},
+            {"Host": "evil.example"},
+        ):
+            self.assertEqual(self._get("/progress/1", headers, "POST")[0], 403)
+        self.assertEqual(self.read, [])
+        headers = {"Origin": self.server.url}
+        self.assertEqual(self._get("/progress/1", headers, "POST")[0], 204)
+        self.assertEqual(self.read, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.provider.registry` module."""
+
+
+import unittest
+
+from manga_manager.provider import registry
+from manga_manager.provider.mangakakalot import Mangakakalot
+from manga_manager.provider.provider import Provider
+
+
+class _Plugin(Provider):
+    name = "Plugin"
+
+
+class _EntryPoint:
+    name = "Plugin"
+
+    def __init__(self):
+        self.loaded = 0
+
+    def load(self):
+        self.loaded += 1
+        return _Plugin
+
+
+class TestRegistry(unittest.TestCase):
+    """Tests for the provider registry."""
+
+    def setUp(self):
+        self.saved = (
+            dict(registry._classes),
+            dict(registry._instances),
+            registry._plugins,
+        )
+
+    def tearDown(self):
+        registry._classes, registry._instances, registry._plugins = self.saved
+
+    def test_000_builtin(self):
+        """Built-in providers resolve without an installed entry point."""
+        self.assertIs(registry.provider_class("Mangakakalot"), Mangakakalot)
+        self.assertIn("Mangakakalot", registry.available())
+        with self.assertRaises(KeyError):
+            registry.provider_class("Missing")
+
+    def test_001_shared_instance(self):
+        """Every lookup of a provider returns the same long-lived instance."""
+        registry.register(_Plugin)
+        provider = registry.get_provider("Plugin")
+        self.assertIsInstance(provider, _Plugin)
+        self.assertIs(registry.get_provider("Plugin"), provider)
+        registry.close_all()
+        self.assertIsNot(registry.get_provider("Plugin"), provider)
+
+    def test_002_entry_points(self):
+        """Plugins are found through entry points and loaded once."""
+        point = _EntryPoint()
+        registry._plugins = {"Plugin": point}
+        self.assertIn("Plugin", registry.available())
+        self.assertEqual(point.loaded, 0)
+        self.assertIs(registry.provider_class("Plugin"), _Plugin)
+        registry.provider_class("Plugin")
+        self.assertEqual(point.loaded, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
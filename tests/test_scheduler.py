@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.scheduler` module."""
+
+
+import threading
+import time
+import unittest
+
+from manga_manager.provider.progress import Progress
+from manga_manager.provider.ratelimit import TokenBucket
+from manga_manager.scheduler import Scheduler
+
+
+class _Provider:
+    def __init__(self, base_url, delay=0.0, failing=()):
+        self.base_url = base_url
+        self.delay = delay
+        self.failing = set(failing)
+        self.started = []
+        self.rate_limiters = []
+        self.active = 0
+        self.most_active = 0
+        self.lock = threading.Lock()
+
+    def image_links(self, chapter_link, rate_limiter=None):
+        self.rate_limiters.append(rate_limiter)
+        if chapter_link in self.failing:
+            raise ValueError(chapter_link)
+        return [chapter_link]
+
+    def manga2pdf(
+        self,
+        image_links,
+        dirname,
+        chapter_name,
+        workers=5,
+        progress=None,
+        rate_limiter=None,
+    ):
+        with self.lock:
+            self.rate_limiters.append(rate_limiter)
+            self.started.append((dirname, chapter_name))
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        progress.chapter_done(chapter_name, f"/{dirname}/{chapter_name}.pdf")
+        return f"/{dirname}/{chapter_name}.pdf"
+
+
+def _chapters(prefix, count):
+    return [{"name": f"{prefix}{i}", "link": f"{prefix}{i}"} for i in range(count)]
+
+
+class TestScheduler(unittest.TestCase):
+    """Tests for `Scheduler`."""
+
+    def test_000_round_robin(self):
+        """Series take turns instead of downloading one backlog after another."""
+        provider = _Provider("https://a.example")
+        scheduler = Scheduler(workers=1)
+        scheduler.add(provider, "A", _chapters("a", 3))
+        scheduler.add(provider, "B", _chapters("b", 1))
+        scheduler.add(provider, "C", _chapters("c", 2))
+        paths = scheduler.run()
+        self.assertEqual(
+            [name for _, name in provider.started], ["a0", "b0", "c0", "a1", "c1", "a2"]
+        )
+        self.assertEqual(paths["B"], {"b0": "/B/b0.pdf"})
+        self.assertEqual(len(paths["A"]), 3)
+
+    def test_001_per_host_limit(self):
+        """No more than `per_host` chapters are downloaded from one host at once."""
+        slow = _Provider("https://slow.example", delay=0.05)
+        other = _Provider("https://other.example", delay=0.05)
+        scheduler = Scheduler(workers=6, per_host=2)
+        scheduler.add(slow, "A", _chapters("a", 6))
+        scheduler.add(slow, "B", _chapters("b", 6))
+        scheduler.add(other, "C", _chapters("c", 4))
+        progress = Progress()
+        scheduler.run(progress)
+        self.assertEqual(slow.most_active, 2)
+        self.assertEqual(progress.chapters, 16)
+        self.assertEqual(progress.chapters_total, 16)
+
+    def test_002_failures(self):
+        """Failed chapters are reported and the others still download."""
+        provider = _Provider("https://a.example", failing={"a1"})
+        scheduler = Scheduler(workers=2)
+        scheduler.add(provider, "A", _chapters("a", 3))
+        progress = Progress()
+        paths = scheduler.run(progress)
+        self.assertEqual(sorted(paths["A"]), ["a0", "a2"])
+        self.assertEqual(progress.failed, 1)
+
+    def test_003_rate_limit(self):
+        """The token bucket spaces out requests beyond its burst."""
+        bucket = TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(7):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+        provider = _Provider("https://a.example")
+        provider.rate_limiter = None
+        scheduler = Scheduler(rate=10)
+        scheduler.add(provider, "A", _chapters("a", 1))
+        scheduler.run()
+        self.assertEqual(provider.rate_limiters, [scheduler.rate_limiter] * 2)
+        self.assertIsNone(provider.rate_limiter)
+
+    def test_004_one_site(self):
+        """Without a per-host limit every worker downloads from one site."""
+        provider = _Provider("https://a.example", delay=0.05)
+        scheduler = Scheduler(workers=6)
+        scheduler.add(provider, "A", _chapters("a", 6))
+        scheduler.add(provider, "B", _chapters("b", 6))
+        scheduler.run()
+        self.assertEqual(provider.most_active, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.store` module."""
+
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from manga_manager.store import JsonStore, SqliteStore, open_store
+
+
+def _library():
+    return {
+        "manga": {
+            "Berserk": {
+                "name": "Berserk",
+                "link": "https://example.com/berserk",
+                "authors": "Kentaro Miura",
+                "download_mode": "dynamic",
+                "provider": "Mangakakalot",
+                "current_chapter": 0,
+                "chapters": [
+                    {"name": f"Chapter {i}", "link": f"/c/{i}", "path": "", "read": False}
+                    for i in range(3)
+                ],
+            }
+        }
+    }
+
+
+class TestStore(unittest.TestCase):
+    """Tests for the library stores."""
+
+    def setUp(self):
+        """Create a temporary library directory."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        """Remove the temporary library directory."""
+        self.directory.cleanup()
+
+    def test_000_sqlite_roundtrip(self):
+        """A saved library loads back unchanged."""
+        store = SqliteStore(self.path / "library.db")
+        library = _library()
+        library["manga"]["Berserk"]["output"] = "pdf"
+        store.save(library)
+        self.assertEqual(SqliteStore(self.path / "library.db").load(), library)
+
+    def test_001_sqlite_incremental_save(self):
+        """Only changed rows are written."""
+        store = SqliteStore(self.path / "library.db")
+        store.save(_library())
+        library = store.load()
+        before = store._connection.total_changes
+
+        chapters = library["manga"]["Berserk"]["chapters"]
+        chapters[1]["read"] = True
+        chapters.append({"name": "Chapter 3", "link": "/c/3", "path": "", "read": False})
+        store.save(library)
+        self.assertEqual(store._connection.total_changes - before, 2)
+
+        store.save(library)
+        self.assertEqual(store._connection.total_changes - before, 2)
+
+        library["manga"].pop("Berserk")
+        store.save(library)
+        self.assertEqual(SqliteStore(self.path / "library.db").load(), {"manga": {}})
+
+    def test_002_concurrent_removal(self):
+        """Chapters another writer added do not outlive their removed manga."""
+        SqliteStore(self.path / "library.db").save(_library())
+        path = self.path / "library.db"
+        daemon, cli = SqliteStore(path), SqliteStore(path)
+        from_daemon, from_cli = daemon.load(), cli.load()
+
+        from_daemon["manga"]["Berserk"]["chapters"].append(
+            {"name": "Chapter 3", "link": "/c/3", "path": "", "read": False}
+        )
+        daemon.save(from_daemon)
+        from_cli["manga"].pop("Berserk")
+        cli.save(from_cli)
+
+        self.assertEqual(SqliteStore(self.path / "library.db").load(), {"manga": {}})
+        count = cli._connection.execute("SELECT COUNT(*) FROM chapters").fetchone()[0]
+        self.assertEqual(count, 0)
+
+        # rows orphaned by older versions are skipped instead of breaking the load
+        cli._connection.execute(
+            "INSERT INTO chapters VALUES ('Gone', 0, '1', '/1', '', 0, NULL)"
+        )
+        cli._connection.commit()
+        self.assertEqual(SqliteStore(self.path / "library.db").load(), {"manga": {}})
+
+    def test_003_json_migration(self):
+        """An existing config.json is migrated into the SQLite store."""
+        (self.path / "config.json").write_text(json.dumps(_library()))
+        store = open_store(self.path)
+        self.assertIsInstance(store, SqliteStore)
+        self.assertEqual(store.load(), _library())
+        self.assertFalse((self.path / "config.json").exists())
+        self.assertTrue((self.path / "config.json.bak").exists())
+
+    def test_004_json_store(self):
+        """The JSON backend can still be selected."""
+        store = open_store(self.path, backend="json")
+        self.assertIsInstance(store, JsonStore)
+        self.assertEqual(store.load(), {"manga": {}})
+        store.save(_library())
+        self.assertEqual(store.load(), _library())
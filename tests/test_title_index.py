@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""Tests for `manga_manager.title_index` module."""
+
+
+import unittest
+
+from manga_manager.title_index import TitleIndex, normalize
+
+TITLES = [
+    "Attack on Titan",
+    "One Piece",
+    "One-Punch Man",
+    "Kaguya-sama: Love is War",
+    "Vinland Saga",
+    "Chainsaw Man",
+]
+
+
+class TestTitleIndex(unittest.TestCase):
+    """Tests for `TitleIndex`."""
+
+    def test_000_normalize(self):
+        """Case, punctuation and spacing are ignored."""
+        self.assertEqual(
+            normalize("  Kaguya-sama:  Love is WAR! "), "kaguya sama love is war"
+        )
+
+    def test_001_search(self):
+        """Fuzzy and abbreviated queries find the right title first."""
+        index = TitleIndex(TITLES)
+        self.assertEqual(index.best("attack on titan"), "Attack on Titan")
+        self.assertEqual(index.best("atack on titna"), "Attack on Titan")
+        self.assertEqual(index.best("kaguya sama"), "Kaguya-sama: Love is War")
+        self.assertEqual(index.best("one punch"), "One-Punch Man")
+        matches = index.search("man", limit=2)
+        self.assertEqual(len(matches), 2)
+        self.assertEqual({title for title, _ in matches}, {"Chainsaw Man", "One-Punch Man"})
+
+    def test_002_incremental(self):
+        """Added and removed titles are reflected without a rebuild."""
+        index = TitleIndex(TITLES)
+        index.remove("Vinland Saga")
+        self.assertNotIn("Vinland Saga", index)
+        self.assertNotEqual(index.best("vinland saga"), "Vinland Saga")
+        index.add("Vinland Saga")
+        self.assertEqual(index.best("vinland"), "Vinland Saga")
+        self.assertEqual(len(index), len(TITLES))
+
+    def test_003_fallback(self):
+        """Queries sharing no trigram still return a title; an empty index returns None."""
+        self.assertIn(TitleIndex(TITLES).best("zz"), TITLES)
+        self.assertIsNone(TitleIndex().best("anything"))
+
+
+if __name__ == "__main__":
+    unittest.main()